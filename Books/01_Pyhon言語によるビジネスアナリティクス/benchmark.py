@@ -0,0 +1,404 @@
+# Benchmark of the Python interfaces optseq.py and scop.py
+# file name  benchmark.py
+#   The solvers are replaced by stub executables that read the model from stdin and print
+#   a well-formed (but not optimized) solution in the format of each solver,
+#   so that the time and the memory spent in the Python layer can be measured on any machine.
+#   The instances follow test1 (job shop with a budget), test2 (setup states), test3 (breaks) of optseq.py
+#   and the assignment example of scop.py, scaled to the given number of activities (variables).
+#
+#   usage: python benchmark.py [--sizes 100 1000 ...] [--max 6] [--instances jobshop setup ...] [--csv file] [--no-memory]
+
+import sys
+import os
+import time
+import random
+import tempfile
+import tracemalloc
+import contextlib
+
+import optseq
+import scop
+
+_OPTSEQ_STUB = r'''
+# stub of the optseq solver: the activities are processed one after another in the given order
+import sys
+modes={}; acts=[]; res=[]; mode=None; act=None
+for line in sys.stdin:
+    w=line.split()
+    if not w:
+        continue
+    if w[0]=="resource":
+        res.append(w[1]); mode=act=None
+    elif w[0]=="mode" and act is None and len(w)>=2 and w[1]!="duration":
+        mode=w[1]; modes[mode]=0
+    elif w[0]=="activity":
+        mode=None; act=None
+        if w[1]!="sink":
+            act=[w[1],None,0]; acts.append(act)
+    elif w[0] in ("temporal","state","nonrenewable"):
+        mode=act=None
+    elif w[0]=="duration" and mode is not None:
+        modes[mode]=int(w[1])
+    elif act is not None and act[1] is None:
+        if w[0]=="mode" and len(w)>=3 and w[1]=="duration":
+            act[1]="---"; act[2]=int(w[2])
+        elif w[0] in modes:
+            act[1]=w[0]; act[2]=modes[w[0]]
+t=0; rows=[]; lines=[]
+for (name,m,d) in acts:
+    if m is None:
+        m="---"
+    if d>0:
+        rows.append("%s,%s, %d %d--%d %d\n"%(name,m,t,t,t+d,t+d))
+    else:
+        rows.append("%s,%s, %d %d\n"%(name,m,t,t))
+    lines.append("%s %s\n"%(name,m))
+    t+=d
+out=sys.stdout
+for k in range(3):
+    out.write("objective value = %d (cpu time = 0.00(s), iteration = %d)\n"%(t+2-k,k))
+out.write("\n --- best solution ---\nsource,---, 0 0\n")
+out.write("".join(rows))
+out.write("sink,---, %d %d\n --- tardy activity ---\n --- resource residuals ---\n"%(t,t))
+for r in res:
+    out.write("%s: [0,%d] 0\n"%(r,t))
+out.write("\n --- best activity list ---\nsource ---\n")
+out.write("".join(lines))
+out.write("sink ---\n\nobjective value = %d\ncpu time = 0.00/1.00(s)\niteration = 3/3\n"%t)
+'''
+
+_SCOP_STUB = r'''
+# stub of the scop solver: each variable takes the first value of its domain
+import sys
+rows=[]
+for line in sys.stdin:
+    w=line.split()
+    if len(w)>=2 and w[0]=="variable":
+        value=line[line.index("{")+1:line.index("}")].split(",")[0].strip()
+        rows.append("%s: %s\n"%(w[1],value))
+out=sys.stdout
+out.write("# penalty = 0 (0)\n[best solution]\n")
+out.write("".join(rows))
+out.write("penalty: 0/0 (hard/soft)\n[Violated constraints]\n")
+'''
+
+def writeStubs(directory):
+        """
+        Write the stub executables "optseq" and "scop" to the directory.
+        The stubs are Python scripts run by the current interpreter (Mac and Linux).
+
+            - Arguments:
+                - directory: Directory where the stubs are written; it is made if it does not exist.
+
+            - Return value: The directory.
+
+            - Example usage:
+
+            >>> writeStubs(tempfile.mkdtemp())
+        """
+        os.makedirs(directory,exist_ok=True)
+        for (name,text) in (("optseq",_OPTSEQ_STUB),("scop",_SCOP_STUB)):
+                path=os.path.join(directory,name)
+                f=open(path,"w")
+                f.write("#!"+sys.executable+"\n"+text)
+                f.close()
+                os.chmod(path,0o755)
+        return directory
+
+def jobShop(n,seed=1):
+        """
+        Job shop instance with a budget constraint (see test1 in optseq.py) with about n activities.
+        Each job has three operations processed on three machines; the operations on machine 2
+        can be processed in the Express mode, which needs one unit of the budget.
+        """
+        rnd=random.Random(seed)
+        m1=optseq.Model("jobshop")
+        machine={}
+        for j in range(1,4):
+                machine[j]=m1.addResource("machine[%s]"%j,capacity={(0,"inf"):1})
+        manpower=m1.addResource("manpower")
+        for t in range(max(9,n//3)):
+                manpower.addCapacity(t*7,t*7+5,2)
+        budget=m1.addResource(name="budget_constraint",rhs=max(1,n//30),direction="<=")
+
+        express=optseq.Mode("Express",duration=4)
+        express.addResource(machine[2],{(0,"inf"):1},"max")
+        express.addResource(manpower,{(0,2):1})
+        express.addBreak(1,1)
+
+        for i in range(1,max(1,n//3)+1):
+                order=[1,2,3]
+                rnd.shuffle(order)
+                prev=None
+                for j in range(1,4):
+                        act=m1.addActivity("Act[%s][%s]"%(i,j))
+                        mode=optseq.Mode("Mode[%s][%s]"%(i,j),duration=rnd.randint(3,13))
+                        mode.addResource(machine[order[j-1]],{(0,"inf"):1},"max")
+                        mode.addResource(manpower,{(0,2):1})
+                        mode.addBreak(1,1)
+                        if order[j-1]==1:
+                                mode.addParallel(1,1,2)
+                        if order[j-1]==2:
+                                act.addModes(mode,express)
+                                budget.addTerms(1,act,express)
+                        else:
+                                act.addModes(mode)
+                        if prev!=None:
+                                m1.addTemporal(prev,act)
+                        prev=act
+        m1.Params.Makespan=True
+        return m1
+
+def setup(n,seed=1,types=2):
+        """
+        Instance with setup states (see test2 in optseq.py) with about n activities.
+        Each job is processed on one machine after a setup activity, whose mode (and duration)
+        is selected automatically from the product type processed before.
+        """
+        rnd=random.Random(seed)
+        m1=optseq.Model("setup")
+        rs=m1.addResource("machine",1)
+        s1=m1.addState("Setup_State")
+        s1.addValue(time=0,value=1)
+
+        mode_setup={}
+        for i in range(1,types+1):
+                for j in range(1,types+1):
+                        mode_setup[i,j]=optseq.Mode("Mode_setup%s_%s"%(i,j),1 if i==j else 5)
+                        mode_setup[i,j].addState(s1,i,j)
+                        mode_setup[i,j].addResource(rs,{(0,"inf"):1})
+
+        for k in range(1,max(1,n//2)+1):
+                j=rnd.randint(1,types)
+                act_setup=m1.addActivity("Setup%s"%k,autoselect=True)
+                act_setup.addModes(*[mode_setup[i,j] for i in range(1,types+1)])
+                act=m1.addActivity("Act%s"%k)
+                mode=optseq.Mode("Mode%s"%k,rnd.randint(1,5))
+                mode.addResource(rs,{(0,"inf"):1})
+                mode.addBreak(0,0)
+                mode.addResource(rs,{(0,"inf"):1},"break")
+                act.addModes(mode)
+                m1.addTemporal(act_setup,act,"CS")
+                m1.addTemporal(act,act_setup,"SC")
+        m1.Params.Makespan=True
+        return m1
+
+def breaks(n,seed=1):
+        """
+        Instance with breakable activities and due dates (see test3 in optseq.py) with about n activities.
+        The writer is available for three periods out of four.
+        """
+        rnd=random.Random(seed)
+        m1=optseq.Model("breaks")
+        duration=[rnd.randint(1,4) for i in range(n)]
+        horizon=sum(duration)*4//3+4
+        res=m1.addResource("writer")
+        for t in range(0,horizon,4):
+                res.addCapacity(t,t+3,1)
+        res.addCapacity(horizon,"inf",1)
+
+        for i in range(n):
+                act=m1.addActivity("Act[{0}]".format(i+1),duedate=rnd.randint(1,horizon))
+                mode=optseq.Mode("Mode[{0}]".format(i+1),duration[i])
+                mode.addResource(res,{(0,"inf"):1})
+                mode.addBreak(0,"inf",1)
+                act.addModes(mode)
+        m1.Params.Neighborhood=5
+        m1.Params.Makespan=False
+        return m1
+
+def assignment(n,seed=1):
+        """
+        Assignment instance of scop.py with n workers and three jobs.
+        """
+        rnd=random.Random(seed)
+        m=scop.Model("assignment")
+        workers=["W%s"%i for i in range(n)]
+        JOB=["Job1","Job2","Job3"]
+        LB=[n//6,n//3,n//3]
+        varlist=m.addVariables(workers,JOB)
+
+        m.addConstraint(scop.Alldiff("AD",varlist,"inf"))
+        for j in range(len(JOB)):
+                con=scop.Linear("LB%s"%j,"inf",LB[j],">=")
+                for i in range(n):
+                        con.addTerms(1,varlist[i],JOB[j])
+                m.addConstraint(con)
+
+        con1=scop.Linear("L")
+        for i in range(n):
+                for task in JOB:
+                        con1.addTerms(rnd.randint(3,30),varlist[i],task)
+        m.addConstraint(con1)
+
+        con2=scop.Quadratic("Q",100)
+        for task in JOB:
+                con2.addTerms(1,varlist[0],task,varlist[min(2,n-1)],task)
+        m.addConstraint(con2)
+        return m
+
+INSTANCES={"jobshop":jobShop,"setup":setup,"breaks":breaks,"assignment":assignment}
+
+PHASES=["build","update","io","parse","write","writeExcel","total"]
+
+class _Meter(object):
+        """
+        measures the wall time and (optionally) the memory peak of the phases of one run
+        """
+        def __init__(self,memory=True):
+                self.memory=memory
+                self.times={}
+                self.peaks={}
+
+        @contextlib.contextmanager
+        def __call__(self,phase):
+                if self.memory:
+                        tracemalloc.start()
+                begin=time.time()
+                try:
+                        yield
+                finally:
+                        self.times[phase]=time.time()-begin
+                        if self.memory:
+                                self.peaks[phase]=tracemalloc.get_traced_memory()[1]
+                                tracemalloc.stop()
+
+def benchmark(name,n,memory=True,seed=1):
+        """
+        Build the instance name with size n, optimize it with the stub solver in the current directory
+        and write the charts; returns a dictionary of the times (in seconds) and the memory peaks (in bytes) of the phases.
+
+        The time of optimize is split using model.stats into "update" (the model text),
+        "io" (writing the input file, running the solver and passing the data) and "parse" (reading the result).
+
+            - Arguments:
+                - name: Name of the instance ("jobshop," "setup," "breaks" or "assignment").
+                - n: Number of activities (variables) of the instance.
+                - memory(optional): True if the memory peaks are recorded with tracemalloc. Default=True.
+                  The times are larger when the memory is traced.
+                - seed(optional): Random seed of the instance. Default=1.
+
+            - Return value: Dictionary of the results.
+
+            - Example usage:
+
+            >>> benchmark("jobshop",1000)
+        """
+        if name not in INSTANCES:
+                print("unknown instance {0}".format(name))
+                raise NameError
+        meter=_Meter(memory)
+        with meter("build"):
+                model=INSTANCES[name](n,seed)
+        model.Params.OutputFlag=False
+        with open(os.devnull,"w") as null:
+                with contextlib.redirect_stdout(null):
+                        with meter("optimize"):
+                                model.optimize()
+        stats=model.stats
+        result={"instance":name,"size":n,"Status":model.Status,
+                "inputBytes":stats["inputBytes"],"outputBytes":stats["outputBytes"]}
+        result["update"]=stats["update"]
+        result["io"]=stats["write"]+stats["start"]+stats["solve"]
+        result["parse"]=stats["parse"]
+        if isinstance(model,optseq.Model):
+                horizon=max([act.completion for act in model.act if act.completion!=None]+[0])
+                scale=max(1,horizon//200)
+                with meter("write"):
+                        model.write("benchmark_chart.txt",bucket=scale)
+                with meter("writeExcel"):
+                        model.writeExcel("benchmark_chart.csv",scale=scale)
+        result["build"]=meter.times["build"]
+        result["write"]=meter.times.get("write")
+        result["writeExcel"]=meter.times.get("writeExcel")
+        result["total"]=sum(meter.times.values())
+        for phase in meter.peaks:
+                result["peak."+phase]=meter.peaks[phase]
+        return result
+
+def run(sizes=(100,1000,10000),instances=None,memory=True,directory=None):
+        """
+        Run the benchmark of the instances for each size with the stub solvers.
+
+            - Arguments:
+                - sizes(optional): Sizes (numbers of activities or variables) of the instances. Default=(100,1000,10000).
+                - instances(optional): Names of the instances. Default=None (all the instances).
+                - memory(optional): True if the memory peaks are recorded. Default=True.
+                - directory(optional): Directory where the stubs and the solver files are written.
+                  Default=None (a temporary directory).
+
+            - Return value: List of the dictionaries of the results (see benchmark).
+
+            - Example usage:
+
+            >>> for r in run([100,1000],["jobshop"]): print(r)
+        """
+        if instances==None:
+                instances=list(INSTANCES)
+        if directory==None:
+                directory=tempfile.mkdtemp(prefix="benchmark")
+        writeStubs(directory)
+        results=[]
+        cwd=os.getcwd()
+        os.chdir(directory) #the solvers are called as ./optseq and ./scop
+        try:
+                for name in instances:
+                        for n in sizes:
+                                results.append(benchmark(name,n,memory))
+                                report([results[-1]],header=len(results)==1)
+        finally:
+                os.chdir(cwd)
+        return results
+
+def report(results,header=True,file=None):
+        """
+        Print the results as a table; times in seconds and memory peaks in MB.
+        """
+        if file==None:
+                file=sys.stdout
+        if header:
+                title="{0:>10} {1:>8} ".format("instance","size")
+                title+=" ".join("{0:>10}".format(p) for p in PHASES)
+                title+=" {0:>8} {1:>8} {2:>8} {3:>8}".format("mem.bld","mem.opt","mem.wrt","mem.xls")
+                print(title,file=file)
+        for r in results:
+                line="{0:>10} {1:>8} ".format(r["instance"],r["size"])
+                line+=" ".join("{0:>10}".format("-" if r[p]==None else "%.4f"%r[p]) for p in PHASES)
+                for phase in ("build","optimize","write","writeExcel"):
+                        peak=r.get("peak."+phase)
+                        line+=" {0:>8}".format("-" if peak==None else "%.1f"%(peak/1048576.0))
+                print(line,file=file)
+        file.flush()
+
+def writeCsv(results,filename):
+        """
+        Write the results to a csv file (one row per run) for comparing the runs of two versions.
+        """
+        import csv
+        keys=["instance","size","Status","inputBytes","outputBytes"]+PHASES
+        keys+=["peak."+p for p in ("build","optimize","write","writeExcel")]
+        with open(filename,"w",newline="") as f:
+                w=csv.writer(f)
+                w.writerow(keys)
+                for r in results:
+                        w.writerow([r.get(k,"") if r.get(k)!=None else "" for k in keys])
+
+def main(argv=None):
+        import argparse
+        parser=argparse.ArgumentParser(description="benchmark of optseq.py and scop.py with stub solvers")
+        parser.add_argument("--sizes",type=int,nargs="+",help="sizes of the instances (default: 10^2 ... 10^max)")
+        parser.add_argument("--max",type=int,default=4,help="largest power of 10 of the default sizes (up to 6)")
+        parser.add_argument("--instances",nargs="+",choices=sorted(INSTANCES),help="instances (default: all)")
+        parser.add_argument("--csv",help="csv file of the results")
+        parser.add_argument("--dir",help="directory of the stubs and the solver files (default: temporary)")
+        parser.add_argument("--no-memory",dest="memory",action="store_false",help="do not trace the memory peaks")
+        args=parser.parse_args(argv)
+        sizes=args.sizes
+        if sizes==None:
+                sizes=[10**k for k in range(2,min(args.max,6)+1)]
+        results=run(sizes,args.instances,args.memory,args.dir)
+        if args.csv:
+                writeCsv(results,args.csv)
+
+if __name__=="__main__":
+        main()
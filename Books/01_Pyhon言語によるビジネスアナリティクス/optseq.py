@@ -10,8 +10,17 @@
 #   add neighborhood parameter 
 
 import sys
+import os
+import array
+import bisect
+import heapq
+import itertools
+import contextlib
+import gc
 import copy
 import platform
+import time
+import hashlib
 
 if int(sys.version_info[0])<=2:
         import string
@@ -19,6 +28,376 @@ if int(sys.version_info[0])<=2:
 else:
         _trans = str.maketrans("-+*/'(){} ^=<>$&#?,","_"*19)
 
+@contextlib.contextmanager
+def _noGC():
+        """
+        suspends the cyclic garbage collector while many model objects are made
+        """
+        enabled=gc.isenabled()
+        gc.disable()
+        try:
+                yield
+        finally:
+                if enabled:
+                        gc.enable()
+
+def _filepath(workdir,filename):
+        """
+        returns the path of a solver file placed in workdir (the current directory if workdir is None)
+        """
+        if workdir:
+                return os.path.join(workdir,filename)
+        return filename
+
+def _popen(cmd):
+        """
+        starts the solver process; on Mac and Linux the solver is started without a shell
+        so that killing the process stops the solver itself.
+        If the process is started by a job of a Scheduler, it is attached to the job.
+        """
+        import subprocess
+        import threading
+        if platform.system() == "Windows":
+                pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+        else:
+                pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+        job = getattr(threading.current_thread(),"job",None)
+        if job!=None:
+                job._attach(pipe)
+        return pipe
+
+async def _popenAsync(cmd):
+        """
+        starts the solver process as an asyncio subprocess
+        """
+        import asyncio
+        import subprocess
+        PIPE=asyncio.subprocess.PIPE
+        if platform.system() == "Windows":
+                return await asyncio.create_subprocess_shell(subprocess.list2cmdline(cmd), stdout=PIPE, stdin=PIPE, stderr=PIPE)
+        return await asyncio.create_subprocess_exec(*cmd, stdout=PIPE, stdin=PIPE, stderr=PIPE)
+
+def _remove(filename):
+        """
+        removes a temporary file (if any)
+        """
+        if filename!=None and os.path.exists(filename):
+                os.remove(filename)
+
+def _modeName(mode):
+        """
+        returns the name of a selected mode (Activity.selected is a mode name or, for a single mode activity, a mode object)
+        """
+        if isinstance(mode,str):
+                return mode
+        return mode.name
+
+def _objective(out):
+        """
+        returns the last objective value reported in the solver output (None if there is none)
+        """
+        pos=out.rfind("objective value =")
+        if pos<0:
+                return None
+        try:
+                return int(out[pos+len("objective value ="):].split()[0])
+        except (ValueError,IndexError):
+                return None
+
+def _cacheGet(directory,key,maxAge=None):
+        """
+        returns the solver output stored in the solve cache under the key (None if it is not stored or is too old)
+        """
+        path=os.path.join(directory,key+".out")
+        try:
+                if maxAge!=None and time.time()-os.path.getmtime(path)>maxAge:
+                        os.remove(path)
+                        return None
+                with open(path,"rb") as f:
+                        out=f.read()
+                os.utime(path,None) #recently used entries are evicted last
+                return out
+        except (IOError,OSError):
+                return None
+
+def _readChunks(f,size=1<<16):
+        """
+        yields the contents of a binary file in chunks of "size" bytes and closes the file
+        """
+        try:
+                while True:
+                        chunk=f.read(size)
+                        if not chunk:
+                                break
+                        yield chunk
+        finally:
+                f.close()
+
+def _cachePut(directory,key,out,maxSize=None,maxAge=None):
+        """
+        stores the solver output in the solve cache and evicts the entries that are too old
+        or least recently used ones until the cache is not larger than maxSize bytes
+        """
+        import tempfile
+        if not os.path.isdir(directory):
+                os.makedirs(directory)
+        (fd,tmp)=tempfile.mkstemp(dir=directory,suffix=".tmp")
+        with os.fdopen(fd,"wb") as f:
+                f.write(out)
+        os.replace(tmp,os.path.join(directory,key+".out"))
+        entries=[]
+        for name in os.listdir(directory):
+                if name.endswith(".out"):
+                        path=os.path.join(directory,name)
+                        try:
+                                entries.append((os.path.getmtime(path),os.path.getsize(path),path))
+                        except OSError:
+                                pass
+        entries.sort()
+        total=sum(size for (mtime,size,path) in entries)
+        now=time.time()
+        for (mtime,size,path) in entries:
+                if (maxAge!=None and now-mtime>maxAge) or (maxSize!=None and total>maxSize):
+                        _remove(path)
+                        total-=size
+
+def _typecode(values):
+        """
+        returns the narrowest array type code that holds the integers
+        """
+        (low,high)=(min(values),max(values)) if len(values) else (0,0)
+        for code in ("b","h","i"):
+                bound=1<<(8*array.array(code).itemsize-1)
+                if -bound<=low and high<bound:
+                        return code
+        return "q"
+
+def _saveSections(filename,magic,texts,arrays):
+        """
+        writes text sections (dictionary that maps names to strings) and integer sections
+        (dictionary that maps names to arrays of integers) to a binary file;
+        each integer section is written in the narrowest type code that holds its values, and
+        a header line gives the names, type codes ("t" for text) and sizes of the sections, which start at multiples of 8 bytes
+        """
+        sections=[(key,"t",texts[key].encode("utf-8")) for key in sorted(texts)]
+        for key in sorted(arrays):
+                code=_typecode(arrays[key])
+                sections.append((key,code,array.array(code,arrays[key]).tobytes()))
+        index=" ".join("{0}:{1}:{2}".format(key,code,len(data)) for (key,code,data) in sections)
+        header="{0} {1} {2}\n".format(magic,sys.byteorder,index).encode("utf-8")
+        with open(filename,"wb") as f:
+                f.write(header)
+                f.write(b"\0"*(-len(header)%8))
+                for (key,code,data) in sections:
+                        f.write(data)
+                        f.write(b"\0"*(-len(data)%8))
+
+def _loadSections(filename,magic):
+        """
+        reads a file written by _saveSections through a memory map;
+        returns the dictionary that maps section names to strings or arrays of integers
+        """
+        import mmap
+        with open(filename,"rb") as f:
+                mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+        try:
+                end=mm.find(b"\n")
+                words=mm[:end].decode("utf-8").split()
+                if end<0 or len(words)<2 or words[0]!=magic:
+                        print("{0} is not a file saved by {1}".format(filename,magic))
+                        raise TypeError
+                swap=words[1]!=sys.byteorder
+                pos=end+1
+                pos+=-pos%8
+                sections={}
+                for word in words[2:]:
+                        (key,kind,size)=word.split(":")
+                        size=int(size)
+                        if kind=="t":
+                                sections[key]=mm[pos:pos+size].decode("utf-8")
+                        else:
+                                data=array.array(kind)
+                                with memoryview(mm) as view:
+                                        with view[pos:pos+size] as chunk:
+                                                data.frombytes(chunk)
+                                if swap:
+                                        data.byteswap()
+                                sections[key]=data
+                        pos+=size+(-size%8)
+        finally:
+                mm.close()
+        return sections
+
+_stamps=itertools.count(1) #time stamps of the changes of the model objects
+
+class _Cached(object):
+        """
+        base class of the model objects that keeps the text of the object in the OptSeq input format
+
+        The text is made again only after the object is changed; setting an attribute marks the object as changed
+        and the methods that change a container in place call _touch().
+        Attributes in _results are set from the solver output and do not change the text.
+        """
+        __slots__=()
+        _results=()
+
+        def __setattr__(self,name,value):
+                object.__setattr__(self,name,value)
+                if name[0]!="_" and name not in self._results:
+                        object.__setattr__(self,"_stamp",next(_stamps))
+
+        def _touch(self):
+                object.__setattr__(self,"_stamp",next(_stamps))
+
+        def _key(self):
+                return self._stamp
+
+        def _str(self):
+                """
+                returns the text of the object, which is cached until the object is changed
+                """
+                key=self._key()
+                cache=getattr(self,"_cache",None)
+                if cache==None or cache[0]!=key:
+                        cache=(key,self.__str__())
+                        object.__setattr__(self,"_cache",cache)
+                return cache[1]
+
+def _order(interval):
+        """
+        returns the sort key of an interval; "inf" is placed after all the integers
+        """
+        (s,t)=interval
+        return (float("inf") if s=="inf" else s, float("inf") if t=="inf" else t)
+
+class IntervalProfile(object):
+        """
+        Dictionary that maps intervals (pairs of start time and finish time) to amounts,
+        used for the requirements, breaks and parallel executions of modes and the capacities of resources.
+
+        The intervals are kept sorted by (start,finish), so that an interval is found by a binary search,
+        added without copying the whole dictionary and iterated in time order.
+        If merge is True, adjacent intervals with the same amount, e.g., (0,5):2 and (5,10):2,
+        are written in the OptSeq input as one interval (0,10):2; the dictionary itself keeps them as they were set.
+
+            - Example usage:
+
+            >>> cap=IntervalProfile({(0,5):2})
+            >>> cap[(5,10)]=2
+            >>> list(cap.intervals())
+            [(0, 10, 2)]
+        """
+        __slots__=("_orders","_keys","_values","merge","_stamp")
+
+        def __init__(self,data=None,merge=True):
+                self._orders=[]
+                self._keys=[]
+                self._values=[]
+                self.merge=merge
+                self._stamp=next(_stamps)
+                if data:
+                        self.update(data)
+
+        def __setitem__(self,interval,amount):
+                order=_order(interval)
+                i=bisect.bisect_left(self._orders,order)
+                if i<len(self._orders) and self._orders[i]==order:
+                        self._values[i]=amount
+                else:
+                        self._orders.insert(i,order)
+                        self._keys.insert(i,tuple(interval))
+                        self._values.insert(i,amount)
+                self._stamp=next(_stamps)
+
+        def _find(self,interval):
+                order=_order(interval)
+                i=bisect.bisect_left(self._orders,order)
+                if i<len(self._orders) and self._orders[i]==order:
+                        return i
+                raise KeyError(interval)
+
+        def __getitem__(self,interval):
+                return self._values[self._find(interval)]
+
+        def __delitem__(self,interval):
+                i=self._find(interval)
+                del self._orders[i],self._keys[i],self._values[i]
+                self._stamp=next(_stamps)
+
+        def __contains__(self,interval):
+                try:
+                        self._find(interval)
+                except (KeyError,TypeError,ValueError):
+                        return False
+                return True
+
+        def __len__(self):
+                return len(self._keys)
+
+        def __iter__(self):
+                return iter(self._keys)
+
+        def __eq__(self,other):
+                if not isinstance(other,(dict,IntervalProfile)):
+                        return False
+                return dict(self.items())==dict(other.items())
+
+        def __ne__(self,other):
+                return not self==other
+
+        def __repr__(self):
+                return "{"+", ".join("{0!r}: {1!r}".format(k,v) for (k,v) in self.items())+"}"
+
+        def get(self,interval,default=None):
+                if interval in self:
+                        return self[interval]
+                return default
+
+        def keys(self):
+                return list(self._keys)
+
+        def values(self):
+                return list(self._values)
+
+        def items(self):
+                return list(zip(self._keys,self._values))
+
+        def update(self,data):
+                for (interval,amount) in data.items():
+                        self[interval]=amount
+
+        def copy(self):
+                return IntervalProfile(self,self.merge)
+
+        def intervals(self):
+                """
+                yields the triplets (start,finish,amount) in time order, merging adjacent intervals with the same amount if merge is True
+                """
+                last=None
+                for ((s,t),amount) in zip(self._keys,self._values):
+                        if last!=None and self.merge and last[1]==s and last[2]==amount and s!="inf":
+                                last=(last[0],t,amount)
+                                continue
+                        if last!=None:
+                                yield last
+                        last=(s,t,amount)
+                if last!=None:
+                        yield last
+
+def _stampOf(data):
+        """
+        returns the stamp of an IntervalProfile (0 for a dictionary set by the user)
+        """
+        return getattr(data,"_stamp",0)
+
+def _intervals(data):
+        """
+        returns the triplets (start,finish,amount) of an interval dictionary (IntervalProfile or dict)
+        """
+        if isinstance(data,IntervalProfile):
+                return data.intervals()
+        return [(s,t,amount) for ((s,t),amount) in data.items()]
+
 class Parameters():
         """
         OptSeq parameter class to control the operation of OptSeq.
@@ -31,12 +410,29 @@ class Parameters():
         @param  MaxIteration: Sets the maximum numbers of iterations. Default=1073741823.
         @param  Initial: =True if the user wants to set an initial activity list. Default = False.
                 Note that the file name of the activity list must be "optseq_best_act_data.txt."
+                Model.setInitial passes an activity list without the file; it has priority over Initial.
         @param  Tenure: Controls a parameter of tabu search (initial tabu tenure). Default=0.
         @param  Neighborhood: Controls a parameter of tabu search (neighborhood size). Default=20.
         @param  Makespan: Sets the objective function.
                 Makespan is True if the objective is to minimize the makespan (maximum completion time),
                 is False otherwise, i.e., to minimize the total weighted tardiness of activities.
                 Default=False.
+        @param  Target: Stops the solver when a schedule whose objective value is at most Target is found.
+                Default=None (no target).
+        @param  StallTime: Stops the solver when the objective value is not improved for StallTime seconds.
+                Default=None (no limit).
+                Target and StallTime use the objective values in the solver log; set ReportInterval small enough.
+        @param  Echo: Prints the activities with their modes, start and completion times after solving. Boolean. Default=True.
+        @param  Cache: Directory of the solve cache. If it is set, the output of the solver is stored there and reused
+                when the same model is solved with the same parameters (and initial activity list) again. Default=None (no cache).
+        @param  CacheSize: Largest total size (in bytes) of the solve cache; least recently used outputs are removed. Default=256MB.
+        @param  CacheAge: Largest age (in seconds) of the outputs in the solve cache. Default=None (no limit).
+        @param  Monitor: Function called as Monitor(model.stats) after each optimize,
+                or a logger (an object with an info method, e.g., logging.getLogger("optseq")). Default=None.
+        @param  Fallback: Finds a schedule by the built-in heuristic (Model.optimizeHeuristic) if the solver cannot be executed. Boolean. Default=False.
+        @param  Stream: Writes the model to the solver in chunks while it is prepared (see Model.updateChunks)
+                instead of preparing the whole input first, so that the memory used by optimize does not grow with the input. Boolean. Default=False.
+        @param  Tee: Writes the streamed input to "optseq_input.txt" as well. Boolean. Default=True.
         """
         def __init__(self):
                 self.TimeLimit=600
@@ -49,8 +445,20 @@ class Parameters():
                 self.Tenure=1
                 self.Neighborhood = 20
                 self.Makespan=False
+                self.Target=None
+                self.StallTime=None
+                self.Echo=True
+                self.Fallback=False
+                self.Monitor=None
+                self.Cache=None
+                self.CacheSize=1<<28
+                self.CacheAge=None
+                self.Stream=False
+                self.Tee=True
+
+class Mode(_Cached):
+        __slots__=("name","duration","requirement","breakable","parallel","state","_stamp","_cache")
 
-class Mode():
         def __init__(self,name="",duration=0):
                 """
                 OptSeq mode class.
@@ -63,10 +471,10 @@ class Mode():
 
                     - Attbibutes:
                         - requirement: Dictionary that maps a pair of resource name and resource type (rtype) to requirement dictionary.
-                        Requirement dictionary maps intervals (pairs of start time and finish time) to amounts of requirement.
+                        Requirement dictionary (IntervalProfile) maps intervals (pairs of start time and finish time) to amounts of requirement.
                         Resource type (rtype) is None (standard resource type), "break" or "max."
-                        - breakable: Dictionary that maps breakable intervals to maximum brek times.
-                        - paralel:  Dictionary that maps parallelable intervals to maximum parallel numbers.
+                        - breakable: Dictionary (IntervalProfile) that maps breakable intervals to maximum brek times.
+                        - paralel:  Dictionary (IntervalProfile) that maps parallelable intervals to maximum parallel numbers.
                         - state: Dictionary that maps states to the tuples of values.
                 """
                 if name=="dummy":
@@ -75,8 +483,8 @@ class Mode():
                 self.name=str(name).translate( _trans )
                 self.duration=duration
                 self.requirement={}
-                self.breakable={}
-                self.parallel={}
+                self.breakable=IntervalProfile(merge=False)
+                self.parallel=IntervalProfile(merge=False)
                 self.state={}
 
         def __str__(self):
@@ -84,8 +492,7 @@ class Mode():
 
                 if self.requirement:
                         for (r,rtype) in self.requirement:
-                                for (interval,cap) in self.requirement[(r,rtype)].items():
-                                        (s,t)=interval
+                                for (s,t,cap) in _intervals(self.requirement[(r,rtype)]):
                                         if rtype=="max":
                                                 ret.append(" {0} max interval {1} {2} requirement {3} ".format(r,s,t,cap))
                                         elif rtype=="break":
@@ -98,8 +505,7 @@ class Mode():
 
                 #break
                 if self.breakable:
-                        for (interval,cap) in self.breakable.items():
-                                (s,t)=interval
+                        for (s,t,cap) in _intervals(self.breakable):
                                 if cap=="inf":
                                         ret.append(" break interval {0} {1} ".format(s,t))
                                 else:
@@ -107,8 +513,7 @@ class Mode():
 
                 #parallel
                 if self.parallel:
-                        for (interval,cap) in self.parallel.items():
-                                (s,t)=interval
+                        for (s,t,cap) in _intervals(self.parallel):
                                 if cap=="inf":
                                         ret.append(" parallel interval {0} {1} ".format(s,t))
                                 else:
@@ -145,6 +550,7 @@ class Mode():
                         raise TypeError
                 else:
                         self.state[state.name]=(fromValue,toValue)
+                        self._touch()
 
         def addResource(self,resource,requirement=None,rtype=None):
                 """
@@ -176,15 +582,16 @@ class Mode():
                 if type(requirement)==type(1):
                         requirement={(0,"inf"):requirement }
 
-                if type(resource.name)!=type("") or type(requirement)!=type({}):
+                if type(resource.name)!=type("") or not isinstance(requirement,(dict,IntervalProfile)):
                         print("type error in adding a resource {0} to activity".format(resource.name,self.name))
                         raise TypeError
                 elif rtype ==None or rtype=="break" or rtype =="max":
-                        if (resource.name,rtype) not in self.requirement:
-                                self.requirement[(resource.name,rtype)]={} #generate an empty dic.
-                        data=copy.deepcopy(self.requirement[(resource.name,rtype)])
+                        data=self.requirement.get((resource.name,rtype))
+                        if not isinstance(data,IntervalProfile):
+                                data=IntervalProfile(data) #generate an empty profile (or convert a dictionary set by the user)
+                                self.requirement[(resource.name,rtype)]=data
                         data.update( requirement )
-                        self.requirement[(resource.name,rtype)]=data
+                        self._touch()
                 else:
                         print("rtype must be None or break or max")
                         raise NameError
@@ -205,9 +612,10 @@ class Mode():
 
                     defines a break between (0,10) for one period.
                 """
-                data=copy.deepcopy(self.breakable)
-                data.update({ (start,finish):maxtime }  )
-                self.breakable=data
+                if not isinstance(self.breakable,IntervalProfile):
+                        self.breakable=IntervalProfile(self.breakable,merge=False)
+                self.breakable[(start,finish)]=maxtime
+                self._touch()
 
         def addParallel(self,start=1,finish=1,maxparallel="inf"):
                 """
@@ -222,12 +630,47 @@ class Mode():
 
                     >>> mode.addParallel(1,1,2}
                 """
-                data=copy.deepcopy(self.parallel)
-                data.update({ (start,finish):maxparallel }  )
-                self.parallel=data
+                if not isinstance(self.parallel,IntervalProfile):
+                        self.parallel=IntervalProfile(self.parallel,merge=False)
+                self.parallel[(start,finish)]=maxparallel
+                self._touch()
 
-class Activity():
+        def _key(self):
+                #the interval dictionaries are changed in place; their stamps are a part of the key
+                return (self._stamp,_stampOf(self.breakable),_stampOf(self.parallel),
+                        tuple(map(_stampOf,self.requirement.values())))
+
+def _result(name):
+        """
+        returns the property of an activity result that is filled from the solution when it is first used
+        """
+        def get(self):
+                if self._row!=None:
+                        self._fill()
+                return getattr(self,"_"+name)
+        def set(self,value):
+                if self._row!=None:
+                        self._fill()
+                object.__setattr__(self,"_"+name,value)
+        return property(get,set)
+
+def _loaded(name):
+        """
+        returns the property of an activity made by Model.load, which is read from the file when it is first used
+        """
+        def get(self):
+                self._source.fill()
+                return getattr(self,name)
+        def set(self,value):
+                self._source.fill()
+                setattr(self,name,value)
+        return property(get,set)
+
+class Activity(_Cached):
+        __slots__=("name","duedate","weight","autoselect","modes",
+                   "_start","_completion","_execute","_selected","_row","_stamp","_cache","_source")
         ID=0
+        _results=("start","completion","execute","selected")
         def __init__(self,name="",duedate="inf",weight=1,autoselect=False):
                 """
                 OptSeq activity class.
@@ -249,6 +692,7 @@ class Activity():
                 if name=="" or name==None:
                         name ="__a{0}".format(Activity.ID)
                         Activity.ID +=1
+                self._row=None #(solution,position) of the results not yet copied to the activity
                 #convert illegal characters into _ (underscore)
                 self.name   = str(name).translate( _trans )
                 self.duedate=duedate
@@ -278,6 +722,25 @@ class Activity():
                         ret.append(" no mode ")
                 return " \n".join(ret)
 
+        start=_result("start")
+        completion=_result("completion")
+        execute=_result("execute")
+        selected=_result("selected")
+
+        def _fill(self):
+                """
+                copies the results of the activity from the solution object
+                """
+                (sol,i)=self._row
+                object.__setattr__(self,"_row",None)
+                self.start=sol.start[i]
+                self.completion=sol.completion[i]
+                if sol.modes[i]!="---":
+                        self.selected=sol.modes[i]
+                else:
+                        self.selected=self.modes[0]
+                self.execute=sol.execute(i)
+
         def addModes(self,*modes):
                 """
                 Adds a mode or modes to the activity.
@@ -291,9 +754,108 @@ class Activity():
                 """
                 for mode in modes:
                         self.modes.append(mode)
+                self._touch()
 
-class Resource():
+        def _key(self):
+                #the text of the activity includes the text of its (single) mode and its interval dictionaries
+                return (self._stamp,tuple(m._key() for m in self.modes))
+
+class _LoadedActivity(Activity):
+        """
+        activity made by Model.load; the duedates, weights, autoselect flags and modes of the loaded activities
+        are read from the file when one of them is first used, and the activities become Activity objects
+        """
+        __slots__=()
+        duedate=_loaded("duedate")
+        weight=_loaded("weight")
+        autoselect=_loaded("autoselect")
+        modes=_loaded("modes")
+
+        def __reduce_ex__(self,protocol):
+                #copies are made from the filled activity
+                self._source.fill()
+                return self.__reduce_ex__(protocol)
+
+class _Loader(object):
+        """
+        sections of a file read by Model.load, from which the modes of the loaded activities are made when they are first used
+        """
+        def __init__(self,data,strings):
+                self.strings=strings
+                (self.acts,self.actModes)=(data["acts"],data["actModes"])
+                (self.modeData,self.req,self.breaks,self.parallel,self.modeStates)=(data["modes"],data["req"],data["breaks"],
+                                                                                   data["parallel"],data["modeStates"])
+                self.loaded=[] #activities made by load in the order of the file
+                self.modes=[None]*(len(self.modeData)//6)
+
+        def profile(self,values,begin,end,width,merge):
+                #the intervals were saved in time order, so that the sorted lists are set directly
+                prof=object.__new__(IntervalProfile)
+                if begin==end:
+                        (prof._orders,prof._keys,prof._values)=([],[],[])
+                elif begin+width==end: #one interval
+                        (s,t,amount)=values[begin:begin+3]
+                        prof._keys=[("inf" if s==-1 else s,"inf" if t==-1 else t)]
+                        prof._orders=[(float("inf") if s==-1 else s,float("inf") if t==-1 else t)]
+                        prof._values=["inf" if amount==-1 else amount]
+                else:
+                        keys=[("inf" if values[k]==-1 else values[k],"inf" if values[k+1]==-1 else values[k+1]) for k in range(begin,end,width)]
+                        prof._keys=keys
+                        prof._orders=[_order(key) for key in keys]
+                        prof._values=["inf" if values[k+2]==-1 else values[k+2] for k in range(begin,end,width)]
+                prof.merge=merge
+                prof._stamp=next(_stamps)
+                return prof
+
+        def mode(self,k):
+                mode=self.modes[k]
+                if mode!=None:
+                        return mode
+                (m,req,strings)=(self.modeData,self.req,self.strings)
+                (name,duration,r1,b1,p1,s1)=m[6*k:6*k+6]
+                (r0,b0,p0,s0)=m[6*k-4:6*k] if k>0 else (0,0,0,0)
+                requirement={}
+                i=r0
+                while i<r1: #the intervals of a requirement are saved one after another
+                        j=i+5
+                        while j<r1 and req[j]==req[i] and req[j+1]==req[i+1]:
+                                j+=5
+                        requirement[(strings[req[i]],(None,"break","max")[req[i+1]])]=self.profile(req,i+2,j+2,5,True)
+                        i=j
+                mode=object.__new__(Mode)
+                put=object.__setattr__
+                put(mode,"name",strings[name])
+                put(mode,"duration",duration)
+                put(mode,"requirement",requirement)
+                put(mode,"breakable",self.profile(self.breaks,b0,b1,3,False))
+                put(mode,"parallel",self.profile(self.parallel,p0,p1,3,False))
+                mst=self.modeStates
+                put(mode,"state",dict((strings[mst[i]],(mst[i+1],mst[i+2])) for i in range(s0,s1,3)) if s0<s1 else {})
+                put(mode,"_stamp",next(_stamps))
+                self.modes[k]=mode
+                return mode
+
+        def fill(self):
+                #all the activities are filled at once, as the cyclic garbage collector would scan the growing model again and again
+                (acts,actModes,mode)=(self.acts,self.actModes,self.mode)
+                put=object.__setattr__
+                begin=0
+                with _noGC():
+                        for (k,act) in enumerate(self.loaded):
+                                end=acts[5*k+4]
+                                if type(act) is _LoadedActivity:
+                                        put(act,"__class__",Activity)
+                                        put(act,"duedate","inf" if acts[5*k+1]==-1 else acts[5*k+1])
+                                        put(act,"weight",acts[5*k+2])
+                                        put(act,"autoselect",acts[5*k+3]==1)
+                                        put(act,"modes",[mode(i) for i in actModes[begin:end]])
+                                        put(act,"_source",None)
+                                begin=end
+                self.loaded=[]
+
+class Resource(_Cached):
         ID=0
+        _results=("residual",)
         def __init__(self,name="",capacity=None,rhs=0,direction="<=",weight="inf"):
                 """
                 OptSeq resource class.
@@ -309,7 +871,7 @@ class Resource():
                         - weight (optional): Weight of nonrenewable resource to compute the penalty for violating the constraint. Non-negative integer or "inf" (default).
 
                     - Attbibutes:
-                        - capacity: Capacity dictionary of the renewable (standard) resource.
+                        - capacity: Capacity dictionary (IntervalProfile) of the renewable (standard) resource.
                         - rhs: Right-hand-side constant of nonrenewable resource constraint.
                         - direction: Rirection (or sense) of nonrenewable resource constraint; "<=" (default) or ">=".
                         - terms: List of terms in left-hand-side of nonrenewable resource.
@@ -328,7 +890,7 @@ class Resource():
                 if type(capacity)==type(1):
                         capacity={(0,"inf"):capacity }
 
-                self.capacity=capacity
+                self.capacity=IntervalProfile(capacity)
                 self.rhs = rhs
                 self.direction = direction
                 self.terms = []
@@ -338,16 +900,14 @@ class Resource():
                 ret=[]
                 if self.capacity:
                         ret.append("resource {0} ".format(self.name))
-                        capList=[]
-                        for (interval,cap) in self.capacity.items():
-                                (s,t)=interval
-                                capList.append((s,t,cap))
-                        capList.sort()
-                        for (s,t,cap) in capList:
+                        for (s,t,cap) in sorted(_intervals(self.capacity),key=lambda x:_order(x[:2])):
                                 ret.append(" interval {0} {1} capacity {2} ".format(s,t,cap))
                         #ret.append("\n")
                 return " \n".join(ret)
 
+        def _key(self):
+                return (self._stamp,_stampOf(self.capacity))
+
         def addCapacity(self,start=0,finish=0,amount=1):
                 """
                 Adds a capacity to the resource.
@@ -363,9 +923,10 @@ class Resource():
                     >>> manpower.addCapacity(0,5,2)
                 """
 
-                data=copy.deepcopy(self.capacity)
-                data.update({ (start,finish):amount }  )
-                self.capacity=data
+                if not isinstance(self.capacity,IntervalProfile):
+                        self.capacity=IntervalProfile(self.capacity)
+                self.capacity[(start,finish)]=amount
+                self._touch()
 
         def printConstraint(self):
                 """
@@ -394,6 +955,16 @@ class Resource():
 
                 return "".join(f)
 
+        def _constraint(self):
+                """
+                returns the text of printConstraint, which is cached until the resource is changed
+                """
+                cache=getattr(self,"_constraintCache",None)
+                if cache==None or cache[0]!=self._stamp:
+                        cache=(self._stamp,self.printConstraint())
+                        self._constraintCache=cache
+                return cache[1]
+
         def addTerms(self,coeffs=None,vars=None,values=None):
                 """
                 Add new terms into left-hand-side of nonrenewable resource constraint.
@@ -414,6 +985,7 @@ class Resource():
 
                 """
 
+                self._touch()
                 if type(coeffs) !=type([]): #need a check whether coeffs is numeric ...
                         self.terms.append( (coeffs,vars,values))
                 elif type(coeffs)!=type([]) or type(vars)!=type([]) or type(values)!=type([]):
@@ -448,7 +1020,9 @@ class Resource():
                         raise NameError
 
 
-class Temporal():
+class Temporal(_Cached):
+        __slots__=("pred","succ","type","delay","_stamp","_cache")
+
         def __init__(self,pred,succ,tempType,delay):
                 """
                 OptSeq temporal class.
@@ -506,7 +1080,7 @@ class Temporal():
 
                 return " ".join(ret)
 
-class State():
+class State(_Cached):
         ID=0
         def __init__(self,name=""):
                 """
@@ -547,11 +1121,500 @@ class State():
                 """
                 if type(time)==type(1) and type(value)==type(1):
                         self.Value[time]=value
+                        self._touch()
                 else:
                         print("time and value of the state {0} must be integer".format(self.name))
                         raise TypeError
 
 
+class Solution():
+        """
+        OptSeq solution class that keeps the schedule read from the solver output in arrays.
+
+        A solution object is made by Model.optimize (model.solution);
+        the results of each activity are copied to the activity object when they are first used.
+
+            - Attributes:
+                - names: List of activity names (including "source" and "sink") in the order of the solver output.
+                - index: Dictionary that maps activity names to their positions in names.
+                - modes: List of selected mode names ("---" for single mode activities).
+                - start: Array of start times.
+                - completion: Array of completion times.
+                - offset: Array of positions; the execution intervals of the i-th activity are
+                  the entries offset[i], ..., offset[i+1]-1 of exeStart, exeFinish and exeParallel.
+                - exeStart, exeFinish, exeParallel: Arrays of the starts and finishes of the execution intervals
+                  and the numbers of parallel executions.
+        """
+        def __init__(self):
+                self.names=[]
+                self.index={}
+                self.modes=[]
+                self.start=array.array("l")
+                self.completion=array.array("l")
+                self.offset=array.array("l")
+                self.exeStart=array.array("l")
+                self.exeFinish=array.array("l")
+                self.exeParallel=array.array("l")
+
+        def _add(self,line):
+                """
+                adds a line "activity,mode, start s--c s--c[parallel] ... completion" of the solver output;
+                returns False if the line has no start time
+                """
+                current=line.split(",",2)
+                if len(current)==3:
+                        current=[current[0].strip(),current[1].strip()]+current[2].split()
+                else:
+                        current=line.replace(","," ").split()
+                if len(current)<=1:
+                        return None
+                if len(current)==2:
+                        return False
+                self.index[current[0]]=len(self.names)
+                self.names.append(current[0])
+                self.modes.append(current[1])
+                self.start.append(int(current[2]))
+                self.completion.append(int(current[-1]))
+                self.offset.append(len(self.exeStart))
+                for exe in current[3:-1]: #list for breakable activity
+                        (start,sep,completion)=exe.partition("--")
+                        idx=completion.find("[")
+                        #for parallel execution
+                        if idx>0:
+                                self.exeParallel.append(int(completion[idx+1:-1]))
+                                completion=completion[:idx]
+                        else:
+                                self.exeParallel.append(1)
+                        self.exeStart.append(int(start))
+                        self.exeFinish.append(int(completion))
+                return True
+
+        def execute(self,i):
+                """
+                returns the dictionary that maps the execution intervals of the i-th activity to the numbers of parallel executions
+                """
+                exeDic={}
+                for k in range(self.offset[i],self.offset[i+1]):
+                        exeDic[(self.exeStart[k],self.exeFinish[k])]=self.exeParallel[k]
+                return exeDic
+
+def _readOutput(out):
+        """
+        reads the solver output in one pass and returns the schedule (Solution object; None if an activity has no start time),
+        the dictionary that maps resource names to their residual capacities and the lines of the best activity list
+        """
+        sol=Solution()
+        residual={}
+        bestact=[]
+        section=None
+        for line in out.split("\n"):
+                if "--- " in line:
+                        if "--- best solution ---" in line:
+                                section=1 #job data
+                                continue
+                        elif "--- tardy activity ---" in line:
+                                section=2
+                                continue
+                        elif "--- resource residuals ---" in line:
+                                section=3
+                                continue
+                        elif "--- best activity list ---" in line: #added for optseq 3.0
+                                section=4
+                                continue
+                if section==1:
+                        if sol._add(line)==False:
+                                return None, residual, bestact
+                elif section==3:
+                        if len(line)<=1:
+                                continue
+                        current=line.split()
+                        resname=current[0][:-1]
+                        resDic={} #residual capacity
+                        for count in range(1,len(current)-1,2):
+                                (int1,int2)=current[count][1:-1].split(",")
+                                resDic[(int(int1),int(int2))]=int(current[count+1])
+                        residual[resname]=resDic
+                elif section==4:
+                        if line.find("objective value =")>=0:
+                                section=None
+                        else:
+                                bestact.append(line)
+        sol.offset.append(len(sol.exeStart))
+        return sol, residual, bestact
+
+def _override(profile,start,finish,amount):
+        """
+        returns the dictionary of the intervals of the profile in which the amount in [start,finish) is replaced with the given amount
+        """
+        (s0,t0)=_order((start,finish))
+        data={}
+        for ((s,t),value) in profile.items():
+                (s1,t1)=_order((s,t))
+                if t1<=s0 or s1>=t0:
+                        data[s,t]=value
+                        continue
+                if s1<s0:
+                        data[s,start]=value
+                if t1>t0:
+                        data[finish,t]=value
+        data[start,finish]=amount
+        return data
+
+def _endName(end):
+        """
+        returns the name of an end (activity object, activity name, "source" or "sink") of a temporal constraint
+        """
+        if isinstance(end,str):
+                return end
+        return end.name
+
+class Scenario(object):
+        def __init__(self,name=""):
+                """
+                OptSeq what-if scenario class.
+
+                A scenario is a small set of changes of a base model (due dates, capacities and temporal constraints).
+                The scenarios of a model are solved by Model.optimizeScenarios without copying the base model;
+                the solver input of a scenario is made from the text of the base model and the text of the changed objects.
+                You can create a scenario object by adding a scenario to a model (using Model.addScenario).
+
+                    - Arguments:
+                        - name: Name of the scenario.
+
+                    - Attributes:
+                        - name: Name of the scenario.
+                        - duedates: Dictionary that maps activity names to new due dates.
+                        - capacities: Dictionary that maps resource names to lists of (start,finish,amount) of new capacities, applied in order.
+                        - added: List of added temporal objects.
+                        - removed: List of (predecessor name, successor name, temporal type) of removed temporal constraints
+                          (type None removes the constraints of all types).
+                        - Status: Status of the scenario; 0 (optimized), -1 (infeasible), 7 (execution failed), 10 (unsolved) or 11 (stopped early).
+                        - ObjVal: Objective value of the best schedule of the scenario (None if unsolved).
+                        - solution: Solution object of the best schedule of the scenario (None if unsolved).
+                        - residual: Dictionary that maps resource names to their residual capacities in the best schedule.
+                        - bestActList: Best activity list of the scenario.
+                """
+                self.name=name
+                self.duedates={}
+                self.capacities={}
+                self.added=[]
+                self.removed=[]
+                self.Status=10 # unsolved
+                self.ObjVal=None
+                self.solution=None
+                self.residual={}
+                self.bestActList=[]
+
+        def __str__(self):
+                ret=["Scenario:{0}".format(self.name)]
+                for a in self.duedates:
+                        ret.append(" duedate {0} {1}".format(a,self.duedates[a]))
+                for r in self.capacities:
+                        for (s,t,amount) in self.capacities[r]:
+                                ret.append(" capacity {0} interval {1} {2} capacity {3}".format(r,s,t,amount))
+                for t in self.added:
+                        ret.append(" add {0} {1} type {2} delay {3}".format(_endName(t.pred),_endName(t.succ),t.type,t.delay))
+                for (pred,succ,tempType) in self.removed:
+                        ret.append(" remove {0} {1} type {2}".format(pred,succ,tempType))
+                return "\n".join(ret)
+
+        def setDuedate(self,act,duedate="inf"):
+                """
+                Changes the due date of an activity in the scenario.
+
+                    - Arguments:
+                        - act: Activity object or activity name.
+                        - duedate(optional): New due date. A non-negative integer or string "inf." Default="inf."
+
+                    - Example usage:
+
+                    >>> rush.setDuedate(act,10)
+                """
+                self.duedates[_endName(act)]=duedate
+
+        def setCapacity(self,res,start=0,finish="inf",amount=0):
+                """
+                Replaces the capacity of a resource in an interval in the scenario.
+                The capacity of the base model in [start,finish) is replaced with the amount; the capacity outside the interval is kept.
+
+                    - Arguments:
+                        - res: Resource object or resource name.
+                        - start(optional): Start time. Non-negative integer. Default=0.
+                        - finish(optional): Finish time. Non-negative integer or "inf." Default="inf."
+                        - amount(optional): New capacity. Non-negative integer. Default=0.
+
+                    - Example usage:
+
+                    >>> down.setCapacity(machine[1],24,48,0)   # machine 1 is down for a day
+
+                    >>> overtime.setCapacity(manpower,5,7,1)
+                """
+                self.capacities.setdefault(_endName(res),[]).append((start,finish,amount))
+
+        def addTemporal(self,pred,succ,tempType="CS",delay=0):
+                """
+                Adds a temporal constraint in the scenario (see Model.addTemporal).
+
+                    - Arguments:
+                        - pred: Predecessor (an activity object or an activity name) or string "source."
+                        - succ: Successor (an activity object or an activity name) or string "source."
+                        - tempType(optional): "CS" (default), "SS", "SC" or "CC."
+                        - delay(optional): Time lag between the completion (start) times of two activities. Default=0.
+
+                    - Return value: New temporal object.
+
+                    - Example usage:
+
+                    >>> rush.addTemporal("source",act,"SS",5)
+                """
+                t=Temporal(pred,succ,tempType,delay)
+                self.added.append(t)
+                return t
+
+        def removeTemporal(self,pred,succ,tempType=None):
+                """
+                Removes the temporal constraints between two activities in the scenario.
+
+                    - Arguments:
+                        - pred: Predecessor (an activity object or an activity name) or string "source."
+                        - succ: Successor (an activity object or an activity name) or string "source."
+                        - tempType(optional): Temporal type of the removed constraints. Default=None (all types).
+
+                    - Example usage:
+
+                    >>> relaxed.removeTemporal(act1,act2)
+                """
+                self.removed.append((_endName(pred),_endName(succ),tempType))
+
+        def _read(self,out):
+                """
+                reads the solver output of the scenario
+                """
+                if out.find("no feasible schedule found")>0:
+                        self.Status = -1  # infeasible
+                        return
+                if out.find("--- best solution ---")<0:
+                        self.ObjVal=_objective(out)
+                        self.Status = 11 #stopped before reporting the schedule
+                        return
+                (sol,residual,bestact)=_readOutput(out)
+                if sol==None:
+                        self.Status = -1  # infeasible
+                        return
+                self.Status = 0
+                self.ObjVal=_objective(out)
+                self.solution=sol
+                self.residual=residual
+                self.bestActList=[tuple(line.split()[:2]) for line in bestact if len(line.split())>=2]
+
+def _sweep(horizon,*profiles):
+        """
+        returns the step functions of interval dictionaries (e.g. capacity and residual) up to the horizon
+        as a list of (start,finish,values), where values is the tuple of the sums of the amounts of each dictionary;
+        the dictionaries are swept once over their change points instead of period by period
+        """
+        diff={0:[0]*len(profiles)}
+        for (i,profile) in enumerate(profiles):
+                for ((s,c),amount) in profile.items():
+                        if c=="inf":
+                                c=horizon
+                        s=min(s,horizon)
+                        c=min(c,horizon)
+                        if s<c:
+                                diff.setdefault(s,[0]*len(profiles))[i]+=amount
+                                diff.setdefault(c,[0]*len(profiles))[i]-=amount
+        steps=[]
+        values=[0]*len(profiles)
+        points=sorted(diff)
+        for (t,nxt) in zip(points,points[1:]+[horizon]):
+                values=[v+d for (v,d) in zip(values,diff[t])]
+                if t>=horizon:
+                        break
+                if steps and steps[-1][2]==tuple(values):
+                        steps[-1]=(steps[-1][0],nxt,steps[-1][2])
+                else:
+                        steps.append((t,nxt,tuple(values)))
+        return steps
+
+def _runs(steps):
+        """
+        returns the steps (start,finish,value) with the adjacent steps of the same value merged
+        """
+        runs=[]
+        for (s,t,value) in steps:
+                if runs and runs[-1][1]==s and runs[-1][2]==value:
+                        runs[-1]=(runs[-1][0],t,value)
+                else:
+                        runs.append((s,t,value))
+        return runs
+
+def _activitySteps(act,horizon):
+        """
+        returns the states of an activity up to the horizon as a list of (start,finish,state);
+        the state is (2,parallel) during execution, (1,0) during a break and (0,0) otherwise
+        """
+        exe=sorted((s,c,int(para)) for ((s,c),para) in act.execute.items())
+        points=set([0,horizon,min(act.start,horizon),min(act.completion,horizon)])
+        for (s,c,para) in exe:
+                points.add(min(s,horizon))
+                points.add(min(c,horizon))
+        points=sorted(points)
+        steps=[]
+        i=0
+        for (t0,t1) in zip(points,points[1:]):
+                while i<len(exe) and exe[i][1]<=t0:
+                        i+=1
+                if i<len(exe) and exe[i][0]<=t0 and exe[i][2]>=1:
+                        state=(2,exe[i][2])
+                elif t0>=act.start and t0<act.completion:
+                        state=(1,0)
+                else:
+                        state=(0,0)
+                steps.append((t0,t1,state))
+        return steps
+
+def _bucket(steps,bucket,horizon,combine=max):
+        """
+        maps the steps (start,finish,value) in periods to runs (first,last+1,value) in columns of bucket periods;
+        a column that meets several steps shows the value combined by the combine function
+        """
+        runs=[]
+        def push(k0,k1,value):
+                if runs and runs[-1][1]==k0 and runs[-1][2]==value:
+                        runs[-1]=(runs[-1][0],k1,value)
+                else:
+                        runs.append((k0,k1,value))
+        columns=(horizon+bucket-1)//bucket
+        last=None #value of the column that is not yet complete
+        for (t0,t1,value) in steps:
+                k=t0//bucket
+                if last!=None: #the step starts inside the incomplete column k
+                        value0=combine(last,value)
+                        end=(k+1)*bucket
+                        if t1<end and t1<horizon:
+                                last=value0
+                                continue
+                        push(k,k+1,value0)
+                        last=None
+                        t0=end
+                        k+=1
+                        if t0>=t1:
+                                continue
+                if t1>=horizon:
+                        full=columns
+                else:
+                        full=t1//bucket
+                if full>k:
+                        push(k,full,value)
+                if t1<horizon and t1%bucket!=0:
+                        last=value
+        if last!=None:
+                push(columns-1,columns,last)
+        return runs
+
+def _selectedMode(act):
+        """
+        returns the mode object selected for an activity (None if the activity is not scheduled)
+        """
+        if act.selected==None:
+                return None
+        name=_modeName(act.selected)
+        for m in act.modes:
+                if m.name==name:
+                        return m
+        return None
+
+def _usage(execute,mode):
+        """
+        yields the resource usages (resource name,start,finish,amount) of an activity executed in a mode
+        in the execution intervals (dictionary that maps intervals to parallel numbers).
+
+        Requirement intervals are measured by the processed time of the activity:
+        standard requirements are used during execution (multiplied by the parallel number),
+        "max" requirements during execution (not multiplied) and "break" requirements during the breaks.
+        """
+        exe=sorted((s,c,int(para)) for ((s,c),para) in execute.items() if int(para)>=1)
+        for ((r,rtype),data) in mode.requirement.items():
+                for ((rs,rt),amount) in data.items():
+                        if rt=="inf":
+                                rt=float("inf")
+                        done=0 #processed time at the start of the execution interval
+                        last=None #finish time of the previous execution interval
+                        for (s,c,para) in exe:
+                                if rtype=="break":
+                                        if last!=None and last<s and rs<=done<rt:
+                                                yield (r,last,s,amount)
+                                else:
+                                        a=max(rs,done)
+                                        b=min(rt,done+c-s)
+                                        if a<b:
+                                                yield (r,s+a-done,s+b-done,amount*para if rtype==None else amount)
+                                done+=c-s
+                                last=c
+
+class _Availability(object):
+        """
+        remaining capacity of a renewable resource as a step function (used by the built-in heuristic)
+
+        Adjacent periods with the same remaining capacity are merged; events keeps all the times
+        at which the capacity was given or used, which are the decision times of the parallel scheme.
+        """
+        def __init__(self,capacity):
+                diff={0:0}
+                for ((s,c),amount) in capacity.items():
+                        diff[s]=diff.get(s,0)+amount
+                        if c!="inf":
+                                diff[c]=diff.get(c,0)-amount
+                self.events=sorted(diff)
+                self.times=[]
+                self.values=[]
+                for (t,value) in zip(self.events,itertools.accumulate(diff[t] for t in self.events)):
+                        if not self.values or self.values[-1]!=value:
+                                self.times.append(t)
+                                self.values.append(value)
+
+        def conflict(self,start,finish,amount):
+                """
+                returns None if amount is available during (start,finish),
+                the finish time of the first run of periods without enough capacity otherwise ("inf" if it never ends)
+                """
+                times=self.times
+                values=self.values
+                n=len(times)
+                i=max(bisect.bisect_right(times,start)-1,0)
+                while i<n and times[i]<finish:
+                        if values[i]<amount:
+                                i+=1
+                                while i<n and values[i]<amount:
+                                        i+=1
+                                if i<n:
+                                        return times[i]
+                                return "inf"
+                        i+=1
+                return None
+
+        def _split(self,t):
+                i=bisect.bisect_right(self.times,t)-1
+                if self.times[i]!=t:
+                        self.times.insert(i+1,t)
+                        self.values.insert(i+1,self.values[i])
+                        i+=1
+                k=bisect.bisect_left(self.events,t)
+                if k==len(self.events) or self.events[k]!=t:
+                        self.events.insert(k,t)
+                return i
+
+        def use(self,start,finish,amount):
+                if start>=finish:
+                        return
+                i=self._split(start)
+                j=self._split(finish)
+                for k in range(i,j):
+                        self.values[k]-=amount
+                for k in (j,i): #merge the periods at both ends with their neighbors
+                        if 0<k<len(self.times) and self.values[k]==self.values[k-1]:
+                                del self.times[k],self.values[k]
+
 class Model(object):
         def __init__(self,name=""):
                 """
@@ -560,12 +1623,26 @@ class Model(object):
                         - activities: Dictionary that maps activity names to activity objects in the model.
                         - modes: Dictionary that maps mode names to mode objects in the model.
                         - resources:  Dictionary that maps resource names to resource objects in the model.
-                        - temporals: Dictionary that maps pairs of activity names to temporal constraint objects in the model.
+                        - temporals: Dictionary that maps pairs of activity names to lists of temporal constraint objects in the model.
                         - Params: Object including all the parameters of the model.
+                        - ObjVal: Objective value of the best schedule found by the solver (None if unsolved).
+                        - solution: Solution object that keeps the schedule of the last solve in arrays (None if unsolved).
+                        - bestActList: Best activity list of the last solve; list of tuples of activity name and mode name ("---" for single mode).
+                        - initial: Initial activity list set by setInitial (None if not set).
+                        - stats: Dictionary of the wall times (in seconds) of the phases of the last optimize
+                          ("update," "write," "start," "solve," "parse" and "total"), the sizes (in bytes) of the solver input and output
+                          ("inputBytes" and "outputBytes") and the size of the model ("activities," "modes," "intervals," "resources,"
+                          "terms," "temporals" and "states"); see also Params.Monitor.
+                        - Status: 0 (optimized), -1 (infeasible), 7 (execution failed), 9 (deadline reached), 10 (unsolved) or 11 (stopped early).
 
                         - act: List of all the activity objects in the model.
                         - res: List of all the resource objects in the model.
                         - tempo: List of all the tamporal constraint objects in the model.
+                        - scenarios: List of the what-if scenario objects of the model (see addScenario).
+
+                    The dictionaries activities, resources, states and temporals are kept up to date by the add and remove methods;
+                    objects appended to the lists act, res, state and tempo directly are indexed by the next update.
+                    The dictionary modes is made by update.
                 """
                 self.name = name
                 self.activities={}  #set of activities maintained by a dictionary
@@ -577,10 +1654,17 @@ class Model(object):
                 self.act=[]         #list of activity objects
                 self.res=[]         #list of resource objects
                 self.tempo=[]       #list of temporal constraint's objects
+                self._ntempo=0      #number of temporal constraints in temporals
                 self.state=[]       #list of state objects
 
                 self.Params=Parameters() #controal parameters' class
                 self.Status = 10      # unsolved
+                self.ObjVal = None    # objective value of the best schedule
+                self.solution = None  # schedule of the last solve (Solution object)
+                self.bestActList = [] # best activity list of the last solve
+                self.initial = None   # initial activity list set by setInitial
+                self.stats = {}       # times and sizes of the last optimize
+                self.scenarios=[]     #list of what-if scenarios
 
         def __str__(self):
                 ret=["Model:{0}".format(self.name)]
@@ -646,8 +1730,12 @@ class Model(object):
                     >>> a = model.addActivity("act1",20,100)
                 """
                 activity=Activity(name,duedate,weight,autoselect)
+                self._index()
+                if activity.name in self.activities:
+                        print("duplicate activity name {0}".format(activity.name))
+                        raise NameError
                 self.act.append(activity)
-                #self.activities[activity.name]=activity
+                self.activities[activity.name]=activity
                 return activity
 
         def addResource(self,name="",capacity=None,rhs=0,direction="<=",weight="inf"):
@@ -676,8 +1764,12 @@ class Model(object):
                 if capacity==None:
                         capacity={}
                 res=Resource(name,capacity,rhs,direction,weight)
+                self._index()
+                if res.name in self.resources:
+                        print("duplicate resource name {0}".format(res.name))
+                        raise NameError
                 self.res.append(res)
-                #self.resources[res.name]=res
+                self.resources[res.name]=res
                 return res
 
         def addTemporal(self,pred,succ,tempType="CS",delay=0):
@@ -716,8 +1808,10 @@ class Model(object):
                     >>> t=model.addTemporal(act,"source",type="SS",delay=50)
                 """
                 t=Temporal(pred,succ,tempType,delay)
+                self._index()
                 self.tempo.append(t)
-                #self.temporals[pred.name,succ.name]=None
+                self.temporals.setdefault((_endName(pred),_endName(succ)),[]).append(t)
+                self._ntempo+=1
                 return t
 
         def addState(self, name=""):
@@ -735,132 +1829,1044 @@ class Model(object):
 
                 """
                 s=State(name)
+                self._index()
+                if s.name in self.states:
+                        print("duplicate state name {0}".format(s.name))
+                        raise NameError
                 self.state.append(s)
-                #self.states[name]=s
+                self.states[s.name]=s
                 return s
 
 
-        def update(self):
-                """
-                prepare a string representing the current model in the OptSeq input format
+        def addActivities(self,names,durations=None,duedates=None,weights=None,requirements=None,autoselect=False):
                 """
-                makespan=self.Params.Makespan
+                Add many activities, each with one mode, to the model at once.
 
-                f=[]
-
-                self.resources={} #dictionary of resources that maps res-name to res-object
-                for r in self.res:
-                        self.resources[r.name]=r
-                        f.append(str(r))
-
-                self.states={}  #dictionary of activities that maps state-name to state-object
-                for s in self.state:
-                        self.states[s.name]=s
-                        f.append(str(s))
+                The arguments are sequences of the same length (lists, tuples, NumPy arrays, ...).
+                The mode of an activity is named "Mode_" followed by the activity name.
 
-                self.modes={}       #dictionary of modes that maps mode-name to mode-object
-                for a in self.act:
-                        if len(a.modes)>=2:
-                                for m in a.modes:
-                                        self.modes[m.name]=m
+                    - Arguments:
+                        - names: Names of the activities.
+                        - durations(optional): Durations of the modes. Default=None (activities without modes).
+                        - duedates(optional): Duedates of the activities (non-negative integers or "inf"). Default=None ("inf").
+                        - weights(optional): Weights of the activities. Default=None (1).
+                        - requirements(optional): Dictionary that maps resource objects to the sequences of the amounts
+                          required by the modes during their whole processing times (0 for no requirement). Default=None.
+                        - autoselect(optional): True or False flag of the activities. Default=False.
 
-                for m in self.modes:  #print mode information
-                        f.append("mode {0} ".format(m))
-                        f.append(str(self.modes[m]))
+                    - Return value: List of new activity objects.
 
-                self.activities={}  #dictionary of activities that maps activity-name to activity-object
-                for a in self.act:
-                        self.activities[a.name]=a
-                        f.append(str(a))
+                    - Example usage:
 
-                self.temporals={} #dictionary of temporal constraints that maps activity name pair to temporal-object
-                for t in self.tempo:
-                        if t.pred=="source":
-                                pred="source"
-                        elif t.pred=="sink":
-                                pred="sink"
-                        else:
-                                pred=t.pred.name
+                    >>> acts = model.addActivities(["a1","a2","a3"],durations=[3,5,2],duedates=[10,"inf",8],requirements={machine:[1,1,2]})
+                """
+                if requirements==None:
+                        requirements={}
+                n=len(names)
+                for seq in [durations,duedates,weights]+list(requirements.values()):
+                        if seq is not None and len(seq)!=n:
+                                print("length of names and the other arguments must be identical")
+                                raise TypeError
+                #the objects are made without calling the constructors, which check and stamp every attribute
+                new=object.__new__
+                put=object.__setattr__
+                def profile(amount=None,merge=True):
+                        #IntervalProfile of the whole horizon (empty if amount is None)
+                        data=new(IntervalProfile)
+                        (data._orders,data._keys,data._values)=([],[],[]) if amount==None else ([(0,float("inf"))],[(0,"inf")],[amount])
+                        data.merge=merge
+                        data._stamp=next(_stamps)
+                        return data
+                acts=[]
+                with _noGC():
+                        for i in range(n):
+                                duedate="inf"
+                                if duedates is not None and not isinstance(duedates[i],str):
+                                        duedate=int(duedates[i])
+                                weight=1
+                                if weights is not None:
+                                        weight=int(weights[i])
+                                name=str(names[i])
+                                if name in ("","source","sink"):
+                                        act=Activity(name,duedate,weight,autoselect) #named or rejected by the constructor
+                                else:
+                                        act=new(Activity)
+                                        for (key,value) in (("name",name.translate(_trans)),("duedate",duedate),("weight",weight),
+                                                            ("autoselect",autoselect),("modes",[]),("_start",0),("_completion",0),
+                                                            ("_execute",{}),("_selected",None),("_row",None),("_stamp",next(_stamps))):
+                                                put(act,key,value)
+                                if durations is not None:
+                                        requirement={}
+                                        for res in requirements:
+                                                amount=int(requirements[res][i])
+                                                if amount!=0:
+                                                        requirement[(res.name,None)]=profile(amount)
+                                        mode=new(Mode)
+                                        for (key,value) in (("name","Mode_"+act.name),("duration",int(durations[i])),("requirement",requirement),
+                                                            ("breakable",profile(merge=False)),("parallel",profile(merge=False)),
+                                                            ("state",{}),("_stamp",next(_stamps))):
+                                                put(mode,key,value)
+                                        act.modes.append(mode)
+                                acts.append(act)
+                self._index()
+                names=set()
+                for act in acts:
+                        if act.name in self.activities or act.name in names:
+                                print("duplicate activity name {0}".format(act.name))
+                                raise NameError
+                        names.add(act.name)
+                self.act.extend(acts)
+                for act in acts:
+                        self.activities[act.name]=act
+                return acts
+
+        def addTemporals(self,preds,succs,tempType="CS",delay=0):
+                """
+                Add many temporal constraints to the model at once.
 
-                        if t.succ=="source":
-                                succ="source"
-                        elif t.succ=="sink":
-                                succ="sink"
-                        else:
-                                succ=t.succ.name
+                    - Arguments:
+                        - preds: Predecessors; sequence of activity objects, activity names or "source" (and "sink").
+                        - succs: Successors; sequence of the same length as preds.
+                        - tempType(optional): Temporal type ("CS", "SS", "SC" or "CC") or sequence of temporal types. Default="CS".
+                        - delay(optional): Time lag or sequence of time lags. Default=0.
 
-                        self.temporals[(pred,succ)]=t
-                        f.append(str(t))
+                    - Return value: List of new temporal objects.
 
-                #non-renewable constraint
-                for r in self.res:
-                        self.resources[r.name]=r
-                        if len(r.terms)>0:
-                                f.append(r.printConstraint())
+                    - Example usage:
 
-                if makespan:
-                        f.append("activity sink duedate 0 \n")
-                return " \n".join(f)
+                    >>> model.addTemporals(["a1","a2"],["a2","a3"])
 
-        def optimize(self):
+                    >>> model.addTemporals(acts[:-1],acts[1:],"SS",[1]*(len(acts)-1))
                 """
-                Optimize the model using optseq.exe in the same directory.
-
-                    - Example usage:
+                if len(preds)!=len(succs):
+                        print("length of preds and succs must be identical")
+                        raise TypeError
+                self._index()
+                new=object.__new__
+                put=object.__setattr__
+                temps=[]
+                with _noGC():
+                        for i in range(len(preds)):
+                                ends=[preds[i],succs[i]]
+                                for k in range(2):
+                                        if isinstance(ends[k],str) and ends[k]!="source" and ends[k]!="sink":
+                                                ends[k]=self.activities[ends[k]]
+                                if isinstance(tempType,str):
+                                        t=tempType
+                                else:
+                                        t=tempType[i]
+                                if hasattr(delay,"__len__"):
+                                        d=int(delay[i])
+                                else:
+                                        d=int(delay)
+                                temp=new(Temporal) #made without the constructor as in addActivities
+                                for (key,value) in (("pred",ends[0]),("succ",ends[1]),("type",t),("delay",d),("_stamp",next(_stamps))):
+                                        put(temp,key,value)
+                                temps.append(temp)
+                self.tempo.extend(temps)
+                for t in temps:
+                        self.temporals.setdefault((_endName(t.pred),_endName(t.succ)),[]).append(t)
+                self._ntempo+=len(temps)
+                return temps
+
+        def getActivity(self,name):
+                """
+                Returns the activity object of the name (None if the model has no activity of the name).
+
+                    - Example usage:
+
+                    >>> act=model.getActivity("Act[1][1]")
+                """
+                self._index()
+                return self.activities.get(name)
+
+        def getResource(self,name):
+                """
+                Returns the resource object of the name (None if the model has no resource of the name).
+
+                    - Example usage:
+
+                    >>> res=model.getResource("machine[1]")
+                """
+                self._index()
+                return self.resources.get(name)
+
+        def removeActivity(self,act):
+                """
+                Removes an activity from the model together with its temporal constraints,
+                its terms of the nonrenewable resources and its entry of the initial activity list.
+
+                    - Arguments:
+                        - act: Activity object or activity name.
+
+                    - Example usage:
+
+                    >>> model.removeActivity("Act[1][1]")
+                """
+                self._index()
+                name=_endName(act)
+                if self.activities.get(name) is None or (not isinstance(act,str) and self.activities[name] is not act):
+                        print("no activity named {0} in the model".format(name))
+                        raise NameError
+                act=self.activities.pop(name)
+                for (i,a) in enumerate(self.act):
+                        if a is act:
+                                del self.act[i]
+                                break
+                self._dropTemporals([t for t in self.tempo if t.pred is act or t.succ is act])
+                for r in self.res:
+                        if len(r.terms)>0 and any(term[1] is act for term in r.terms):
+                                r.terms=[term for term in r.terms if term[1] is not act]
+                if self.initial!=None:
+                        self.initial=[entry for entry in self.initial if entry[0]!=name] or None
+
+        def removeTemporal(self,pred,succ=None,tempType=None):
+                """
+                Removes temporal constraints from the model.
+
+                    - Arguments:
+                        - pred: Temporal object, or predecessor (an activity object, an activity name, "source" or "sink").
+                        - succ(optional): Successor (an activity object, an activity name, "source" or "sink") if pred is not a temporal object.
+                        - tempType(optional): Temporal type of the removed constraints. Default=None (all types).
+
+                    - Return value: List of the removed temporal objects.
+
+                    - Example usage:
+
+                    >>> model.removeTemporal(t)
+
+                    >>> model.removeTemporal(act1,act2,"CS")
+                """
+                self._index()
+                if isinstance(pred,Temporal):
+                        temps=self.temporals.get((_endName(pred.pred),_endName(pred.succ)),[])
+                        removed=[t for t in temps if t is pred]
+                else:
+                        temps=self.temporals.get((_endName(pred),_endName(succ)),[])
+                        removed=[t for t in temps if tempType==None or t.type==tempType]
+                if not removed:
+                        print("no temporal constraint to remove in the model")
+                        raise NameError
+                self._dropTemporals(removed)
+                return removed
+
+        def _dropTemporals(self,temps):
+                """
+                removes the temporal objects from the list tempo and the dictionary temporals in one pass
+                """
+                if not temps:
+                        return
+                ids=set(id(t) for t in temps)
+                self.tempo[:]=[t for t in self.tempo if id(t) not in ids]
+                for t in temps:
+                        pair=(_endName(t.pred),_endName(t.succ))
+                        rest=[u for u in self.temporals.get(pair,[]) if u is not t]
+                        if rest:
+                                self.temporals[pair]=rest
+                        else:
+                                self.temporals.pop(pair,None)
+                self._ntempo=len(self.tempo)
+                if getattr(self,"_horizon",None) is not None and id(self._horizon) in ids:
+                        self._horizon=None
+
+        def removeResource(self,res):
+                """
+                Removes a resource from the model together with the requirements of the modes for the resource.
+
+                    - Arguments:
+                        - res: Resource object or resource name.
+
+                    - Example usage:
+
+                    >>> model.removeResource("manpower")
+                """
+                self._index()
+                name=_endName(res)
+                if self.resources.get(name) is None or (not isinstance(res,str) and self.resources[name] is not res):
+                        print("no resource named {0} in the model".format(name))
+                        raise NameError
+                res=self.resources.pop(name)
+                for (i,r) in enumerate(self.res):
+                        if r is res:
+                                del self.res[i]
+                                break
+                done=set()
+                for a in self.act:
+                        for m in a.modes:
+                                if id(m) in done:
+                                        continue
+                                done.add(id(m))
+                                keys=[key for key in m.requirement if key[0]==name]
+                                if keys:
+                                        for key in keys:
+                                                del m.requirement[key]
+                                        m._touch()
+
+        def addScenario(self,name=""):
+                """
+                Add a what-if scenario to the model.
+
+                    - Arguments:
+                        - name: Name of the scenario.
+
+                    - Return value: New scenario object.
+
+                    - Example usage:
+
+                    >>> down=model.addScenario("machine 1 down")
+                    >>> down.setCapacity(machine[1],24,48,0)
+                """
+                scenario=Scenario(name)
+                self.scenarios.append(scenario)
+                return scenario
+
+        def analyzeTemporals(self,horizon=None):
+                """
+                Analyzes the temporal constraints before solving.
+
+                The earliest start times are the longest paths from the source in the network of the temporal constraints
+                between the start and completion times of the activities (the completion is at least the shortest and,
+                if the activity cannot break, at most the longest duration of its modes after the start), and the latest start times are computed backward from the sink so that all activities complete by the horizon.
+                Positive cycles, e.g., temporal constraints with negative delays that cannot be satisfied together,
+                mean that no feasible schedule exists; they are found without launching the solver.
+
+                    - Arguments:
+                        - horizon(optional): Planning horizon (latest completion time). Default=None (the lower bound of the makespan).
+
+                    - Return value:
+                        - Dictionary with the keys
+                          "earliest" and "latest" (dictionaries that map activity names to the earliest and latest start times),
+                          "slack" (dictionary that maps activity names to the latest minus earliest start times),
+                          "critical" (list of the activity names on a longest path from the source to the sink),
+                          "makespan" (lower bound of the makespan), "horizon" (horizon used for the latest start times)
+                          and "cycles" (list of positive cycles, each a list of activity names).
+                          If there are positive cycles, the other entries are empty (None for makespan and horizon).
+
+                    - Example usage:
+
+                    >>> info=model.analyzeTemporals()
+                    >>> if info["cycles"]:
+                    ...     print("infeasible",info["cycles"])
+                    ... else:
+                    ...     model.setHorizon(info["makespan"]+10)
+                """
+                #node 0 is the source, nodes 2i-1 and 2i are the start and completion of the i-th activity and node 2n+1 is the sink
+                names=["source"]+[act.name for act in self.act for k in (0,1)]+["sink"]
+                n=len(names)
+                sink=n-1
+                index={"source":(0,0),"sink":(sink,sink)}
+                #adjacency index of the arcs time(u)+weight<=time(v)
+                forward=[[] for i in range(n)]
+                backward=[[] for i in range(n)]
+                def arc(u,v,weight):
+                        forward[u].append((v,weight))
+                        backward[v].append((u,weight))
+                for (i,act) in enumerate(self.act):
+                        (s,c)=(2*i+1,2*i+2)
+                        index[act.name]=(s,c)
+                        modes=act.modes or [Mode("dummy",0)]
+                        #a mode with breaks may take longer, a mode with parallel executions may take shorter than its duration
+                        arc(0,s,0)
+                        arc(s,c,min(0 if m.parallel else m.duration for m in modes))
+                        if not any(m.breakable for m in modes):
+                                arc(c,s,-max(m.duration for m in modes))
+                        arc(c,sink,0)
+                for temp in self.tempo:
+                        u=index.get(getattr(temp.pred,"name",temp.pred))
+                        v=index.get(getattr(temp.succ,"name",temp.succ))
+                        if u==None or v==None:
+                                continue
+                        arc(u[1] if temp.type in ("CS","CC") else u[0],v[0] if temp.type in ("CS","SS") else v[1],temp.delay)
+
+                def longestPaths(root,adjacency):
+                        #Bellman-Ford (with a queue) for the longest paths; returns (distances,predecessors,cycle)
+                        import collections
+                        dist=[None]*n
+                        pred=[None]*n
+                        count=[0]*n
+                        dist[root]=0
+                        queue=collections.deque([root])
+                        queued=[False]*n
+                        queued[root]=True
+                        while queue:
+                                u=queue.popleft()
+                                queued[u]=False
+                                for (v,weight) in adjacency[u]:
+                                        if dist[v]==None or dist[u]+weight>dist[v]:
+                                                dist[v]=dist[u]+weight
+                                                pred[v]=u
+                                                if not queued[v]:
+                                                        count[v]+=1
+                                                        if count[v]>=n: #v is reached from a positive cycle
+                                                                return (dist,pred,self._cycle(pred,v,names))
+                                                        queued[v]=True
+                                                        queue.append(v)
+                        return (dist,pred,None)
+
+                info={"earliest":{},"latest":{},"slack":{},"critical":[],"makespan":None,"horizon":None,"cycles":[]}
+                (dist,pred,cycle)=longestPaths(0,forward)
+                if cycle!=None:
+                        info["cycles"].append(cycle)
+                        return info
+                (tail,succ,cycle)=longestPaths(sink,backward)
+                makespan=dist[sink]
+                if horizon==None:
+                        horizon=makespan
+                for i in range(1,n-1,2):
+                        if dist[i]!=None:
+                                info["earliest"][names[i]]=dist[i]
+                        if tail[i]!=None:
+                                info["latest"][names[i]]=horizon-tail[i]
+                        if dist[i]!=None and tail[i]!=None:
+                                info["slack"][names[i]]=horizon-tail[i]-dist[i]
+                path=[]
+                v=pred[sink]
+                while v!=None and v!=0:
+                        if not path or path[-1]!=names[v]:
+                                path.append(names[v])
+                        v=pred[v]
+                info["critical"]=path[::-1]
+                info["makespan"]=makespan
+                info["horizon"]=horizon
+                return info
+
+        def _cycle(self,pred,v,names):
+                """
+                returns the names on the cycle of the predecessor pointers reached from node v
+                """
+                seen=set()
+                while v not in seen:
+                        seen.add(v)
+                        v=pred[v]
+                cycle=[names[v]]
+                u=pred[v]
+                while u!=v:
+                        if cycle[-1]!=names[u]:
+                                cycle.append(names[u])
+                        u=pred[u]
+                if len(cycle)>1 and cycle[0]==cycle[-1]:
+                        cycle.pop()
+                return cycle[::-1]
+
+        def setHorizon(self,horizon=None):
+                """
+                Limits the makespan by the temporal constraint sink + (-horizon) <= source,
+                which narrows the time windows searched by the solver.
+
+                    - Arguments:
+                        - horizon: Latest completion time of all the activities. None removes the limit set before. Default=None.
+
+                    - Return value: Temporal object of the limit (None if the limit is removed).
+
+                    - Example usage:
+
+                    >>> model.setHorizon(model.analyzeTemporals()["makespan"]*2)
+                """
+                old=getattr(self,"_horizon",None)
+                if old!=None and old in self.tempo:
+                        self.removeTemporal(old)
+                self._horizon=None
+                if horizon!=None:
+                        self._horizon=self.addTemporal("sink","source","CS",-horizon)
+                return self._horizon
+
+        def update(self):
+                """
+                prepare a string representing the current model in the OptSeq input format
+
+                The text of each resource, state, mode, activity and temporal constraint is kept on the object
+                and is made again only for the objects changed since the last call.
+                Changes in place of the IntervalProfile objects are detected: the profiles of mode.requirement
+                (e.g. mode.requirement[("worker",None)][(0,5)]=2, or a profile added to or removed from mode.requirement),
+                mode.breakable, mode.parallel and resource.capacity.
+                Changes in place of the other containers are not detected: mode.state, state.Value, resource.terms
+                and a plain dictionary set by the user as a profile (e.g. mode.breakable={(0,5):"inf"});
+                use the add methods (addState, addValue, addTerms, addBreak, ...) or set the attribute again.
+                """
+                return " \n".join(self._texts())
+
+        def updateChunks(self,size=1<<16):
+                """
+                Prepare the model in the OptSeq input format as update does, in chunks of bytes.
+
+                The texts of the objects are encoded and yielded in chunks of about "size" bytes,
+                so that the whole input is never held as one string; b"".join(model.updateChunks()) equals update().encode().
+
+                    - Arguments:
+                        - size(optional): Size (in characters) of the chunks. Default=65536.
+
+                    - Example usage:
+
+                    >>> with open("optseq_input.txt","wb") as f:
+                    ...     for chunk in model.updateChunks():
+                    ...         f.write(chunk)
+                """
+                batch=[]
+                length=0
+                first=True
+                for text in self._texts():
+                        if not first:
+                                batch.append(" \n") #separator of update
+                        first=False
+                        batch.append(text)
+                        length+=len(text)+2
+                        if length>=size:
+                                yield "".join(batch).encode()
+                                batch=[]
+                                length=0
+                if batch:
+                        yield "".join(batch).encode()
+
+        def _texts(self):
+                """
+                yields the texts of the resources, states, modes, activities, temporal and non-renewable constraints (see update)
+                """
+                makespan=self.Params.Makespan
+
+                self._index()
+                for r in self.res:
+                        yield r._str()
+
+                for s in self.state:
+                        yield s._str()
+
+                self.modes={}       #dictionary of modes that maps mode-name to mode-object
+                for a in self.act:
+                        if len(a.modes)>=2:
+                                for m in a.modes:
+                                        self.modes[m.name]=m
+
+                for m in self.modes:  #print mode information
+                        yield "mode {0} ".format(m)
+                        yield self.modes[m]._str()
+
+                for a in self.act:
+                        yield a._str()
+
+                for t in self.tempo:
+                        yield t._str()
+
+                #non-renewable constraint
+                for r in self.res:
+                        if len(r.terms)>0:
+                                yield r._constraint()
+
+                if makespan:
+                        yield "activity sink duedate 0 \n"
+
+        def _index(self):
+                """
+                indexes the objects appended to the lists act, res, state and tempo directly;
+                the add and remove methods keep the dictionaries up to date
+                """
+                if len(self.activities)!=len(self.act):
+                        self.activities=dict((a.name,a) for a in self.act)
+                if len(self.resources)!=len(self.res):
+                        self.resources=dict((r.name,r) for r in self.res)
+                if len(self.states)!=len(self.state):
+                        self.states=dict((s.name,s) for s in self.state)
+                if self._ntempo!=len(self.tempo):
+                        self.temporals={}
+                        for t in self.tempo:
+                                self.temporals.setdefault((_endName(t.pred),_endName(t.succ)),[]).append(t)
+                        self._ntempo=len(self.tempo)
+
+        def setInitial(self,actList=None):
+                """
+                Sets the initial activity list used by the next solves.
+
+                The list is kept on the model (model.initial) and is passed to the solver through a temporary file
+                that is removed after the solve, so that Params.Initial and optseq_best_act_data.txt are not needed.
+
+                    - Argument:
+                        - actList(optional): List of activities in the order to be scheduled.
+                          Each entry is an activity object, an activity name or a tuple of an activity and a mode (object or name).
+                          Default=None (the best activity list of the last solve, model.bestActList).
+                          Set [] to stop the warm start.
+
+                    - Example usage:
 
                     >>> model.optimize()
+                    >>> model.setInitial()  # warm start from the last solve
+
+                    >>> model.setInitial([(act1,mode1),act2,"act3"])
                 """
-                LOG=self.Params.OutputFlag
-                f = self.update()
-                f2 = open("optseq_input.txt","w")
-                f2.write(f)
-                f2.close()
+                if actList==None:
+                        actList=self.bestActList
+                initial=[]
+                for entry in actList:
+                        if type(entry)==type(()):
+                                (act,mode)=entry
+                        else:
+                                (act,mode)=(entry,"---")
+                        if not isinstance(act,str):
+                                if len(act.modes)<=1:
+                                        mode="---" #single mode activity
+                                act=act.name
+                        if not isinstance(mode,str):
+                                mode=mode.name
+                        initial.append((act,mode))
+                if initial:
+                        self.initial=initial
+                else:
+                        self.initial=None
 
-                import subprocess
+        def _writeInitial(self,workdir=None,actList=None):
+                """
+                writes model.initial (or the activity list of tuples of activity name and mode name) to a new temporary file
+                and returns its name (None if there is no initial list)
+                """
+                if actList==None:
+                        actList=self.initial
+                if not actList:
+                        return None
+                import tempfile
+                (fd,filename)=tempfile.mkstemp(prefix="optseq_initial_",suffix=".txt",dir=workdir)
+                names=[act for (act,mode) in actList]
+                f=os.fdopen(fd,"w")
+                if "source" not in names:
+                        f.write("source ---\n")
+                for (act,mode) in actList:
+                        f.write("{0} {1}\n".format(act,mode))
+                if "sink" not in names:
+                        f.write("sink ---\n")
+                f.write("\n")
+                f.close()
+                return filename
+
+        def _command(self,params=None,workdir=None,initial=None):
+                """
+                returns the argument list of the optseq call for the parameters (model.Params if params is None)
+                and the file of the initial activity list
+                """
+                if params==None:
+                        params=self.Params
                 if platform.system() == "Windows":
-                        cmd = "optseq -time "+str(self.Params.TimeLimit)+ \
-                                " -backtrack  "+str(self.Params.Backtruck) +\
-                                " -iteration  "+str(self.Params.MaxIteration)+\
-                                " -report     "+str(self.Params.ReportInterval)+\
-                                " -seed      "+str(self.Params.RandomSeed)+\
-                                " -tenure    "+str(self.Params.Tenure) + \
-                                " -neighborhood   "+ str(self.Params.Neighborhood)
+                        cmd = ["optseq"]
                 else:
-                        cmd = "./optseq -time "+str(self.Params.TimeLimit)+ \
-                                " -backtrack  "+str(self.Params.Backtruck) +\
-                                " -iteration  "+str(self.Params.MaxIteration)+\
-                                " -report     "+str(self.Params.ReportInterval)+\
-                                " -seed      "+str(self.Params.RandomSeed)+\
-                                " -tenure    "+str(self.Params.Tenure) + \
-                                " -neighborhood   "+ str(self.Params.Neighborhood)                        
-                        
-
-                if self.Params.Initial:
-                        cmd += " -initial optseq_best_act_data.txt"
+                        cmd = ["./optseq"]
+                cmd += ["-time",str(params.TimeLimit),
+                        "-backtrack",str(params.Backtruck),
+                        "-iteration",str(params.MaxIteration),
+                        "-report",str(params.ReportInterval),
+                        "-seed",str(params.RandomSeed),
+                        "-tenure",str(params.Tenure),
+                        "-neighborhood",str(params.Neighborhood)]
+                if initial!=None:
+                        cmd += ["-initial",initial]
+                elif params.Initial:
+                        cmd += ["-initial",_filepath(workdir,"optseq_best_act_data.txt")]
+                return cmd
+
+        def optimize(self,workdir=None,callback=None,deadline=None):
+                """
+                Optimize the model using optseq.exe in the same directory.
+
+                The solver output is read line by line while the solver runs.
+                Each improved objective value reported by the solver is passed to the callback,
+                and the solver is stopped early when the callback returns True or when Params.Target or Params.StallTime is reached.
+                If the solver is stopped early, Status is set to 11.
+
+                If a deadline is given, the time spent to write the model is measured and the same time is kept for reading the results;
+                the time limit of the solver is set to the time left (if it is shorter than Params.TimeLimit),
+                and the solver is interrupted and then killed so that optimize returns by the deadline.
+                If the solver is stopped by the deadline, Status is set to 9 and the best schedule (or objective value) reported so far is kept.
+
+                If Params.Stream is True, the model is written to the solver in chunks while it is prepared,
+                so that the whole input is not kept in memory; the time to prepare it is then counted in the "solve" phase of model.stats.
+                If Params.Cache is also set, the chunks are hashed for the solve cache as they are prepared and kept in a temporary file,
+                from which the solver reads them when the output is not in the cache (the time is then in the "update" phase);
+                optseq_input.txt is written in both cases if Params.Tee is True.
+
+                    - Arguments:
+                        - workdir(optional): Directory where the input, output and activity list files are written.
+                          Default=None (current directory).
+                        - callback(optional): Function called as callback(elapsed,objective) for each improved objective value,
+                          where elapsed is the time (in seconds) since the solver started. Default=None.
+                        - deadline(optional): Seconds within which optimize returns, including writing the model,
+                          starting the solver and reading the results. Default=None (no deadline).
+
+                    - Example usage:
+
+                    >>> model.optimize()
+
+                    >>> model.optimize(workdir="job1")
+
+                    >>> model.optimize(callback=lambda elapsed,obj: print(elapsed,obj))
+
+                    >>> model.optimize(deadline=30)
+                """
+                self._startStats()
+                try:
+                        self._optimize(workdir,callback,deadline)
+                finally:
+                        self._endStats()
+
+        def _optimize(self,workdir=None,callback=None,deadline=None):
+                """
+                optimizes the model (see optimize), marking the phases in model.stats
+                """
+                begin = time.time()
+                spool = None
+                if self.Params.Stream:
+                        f = None
+                        data = self._stream(workdir)
+                        if self.Params.Cache!=None:
+                                #the key is computed from the chunks as they are streamed; the solver reads them back from the file
+                                f, spool = self._spool(data)
+                                data = _readChunks(spool)
+                                self._mark("update")
+                else:
+                        f = self.update()
+                        self._mark("update")
+                        f2 = open(_filepath(workdir,"optseq_input.txt"),"w")
+                        f2.write(f)
+                        f2.close()
+                        data = f.encode()
+                        self.stats["inputBytes"] = len(data)
+
+                initial = self._writeInitial(workdir)
+                self._mark("write")
+                params, stopAt, grace = self._budget(begin,deadline)
+                if params==None:
+                        _remove(initial)
+                        if spool!=None:
+                                spool.close()
+                        print("no time is left for the solver before the deadline")
+                        self.Status = 9 #deadline reached
+                        return
+                cmd = self._command(params,workdir=workdir,initial=initial)
                 #print ("cmd=",cmd)
+                key = self._cacheKey(f,cmd)
+                if key!=None:
+                        out = _cacheGet(self.Params.Cache,key,self.Params.CacheAge)
+                        if out!=None:
+                                _remove(initial)
+                                if spool!=None:
+                                        spool.close()
+                                self.stats["outputBytes"] = len(out)
+                                self.stats["cached"] = True
+                                self._mark("solve")
+                                self._finish(cmd,out,b"",workdir)
+                                self._mark("parse")
+                                return
+                try:
+                        try:
+                                pipe = _popen(cmd)
+                                self._mark("start")
+                                print("\n ================ Now solving the problem ================ \n")
+                        except OSError:
+                                print("error: could not execute command '%s'" % " ".join(cmd))
+                                print("please check that the solver is in the path")
+                                self.Status = 7  #execution falied
+                                if self.Params.Fallback:
+                                        print("the built-in heuristic is used instead")
+                                        self.optimizeHeuristic()
+                                return
+
+                        out, err, stopped = self._communicate(pipe,data,callback,grace,stopAt)   #get the result
+                finally:
+                        _remove(initial)
+                self.stats["outputBytes"] = len(out)
+                self._mark("solve")
+                #print("out", out)
+                #print("error", err)
+                late = stopped and stopAt!=None and time.time()>=stopAt
+                if stopped and out.find(b"--- best solution ---")<0:
+                        print("the solver was stopped before reporting the schedule")
+                        self.ObjVal=_objective(out.decode('utf-8'))
+                        self.Status = 9 if late else 11 #deadline reached or stopped early
+                        return
+                self._finish(cmd,out,err,workdir)
+                self._mark("parse")
+                if stopped and self.Status==0:
+                        self.Status = 9 if late else 11 #deadline reached or stopped early
+                elif key!=None and self.Status in (0,-1):
+                        _cachePut(self.Params.Cache,key,out,self.Params.CacheSize,self.Params.CacheAge)
+
+        def _stream(self,workdir=None,size=1<<16):
+                """
+                yields the chunks of the input of the solver (see updateChunks), writing them to optseq_input.txt if Params.Tee is True
+                and counting them in model.stats["inputBytes"]; the time to prepare them is part of the "solve" phase
+                """
+                tee = open(_filepath(workdir,"optseq_input.txt"),"wb") if self.Params.Tee else None
+                try:
+                        for chunk in self.updateChunks(size):
+                                if tee!=None:
+                                        tee.write(chunk)
+                                self.stats["inputBytes"] += len(chunk)
+                                yield chunk
+                finally:
+                        if tee!=None:
+                                tee.close()
+
+        def _spool(self,chunks):
+                """
+                writes the streamed chunks to a temporary file, hashing them for the solve cache;
+                returns the hash and the file, positioned at its beginning
+                """
+                import tempfile
+                digest = hashlib.sha256()
+                spool = tempfile.TemporaryFile()
                 try:
-                        if platform.system() == "Windows":
-                                pipe = subprocess.Popen(cmd.split(), stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)
+                        for chunk in chunks:
+                                digest.update(chunk)
+                                spool.write(chunk)
+                        spool.seek(0)
+                except:
+                        spool.close()
+                        raise
+                return digest, spool
+
+        def _startStats(self):
+                """
+                starts recording the times and sizes of an optimize in model.stats
+                """
+                self.stats = {"update":0.0,"write":0.0,"start":0.0,"solve":0.0,"parse":0.0,"inputBytes":0,"outputBytes":0}
+                self._begin = self._last = time.time()
+
+        def _mark(self,phase):
+                """
+                adds the time since the last mark to the phase
+                """
+                now = time.time()
+                self.stats[phase] = self.stats.get(phase,0.0)+now-self._last
+                self._last = now
+
+        def _endStats(self):
+                """
+                completes model.stats with the total time and the size of the model and passes it to Params.Monitor
+                """
+                stats = self.stats
+                stats["total"] = time.time()-self._begin
+                stats["Status"] = self.Status
+                stats["activities"] = len(self.act)
+                stats["modes"] = sum(len(act.modes) for act in self.act)
+                intervals = 0
+                for act in self.act:
+                        for mode in act.modes:
+                                intervals += len(mode.breakable)+len(mode.parallel)
+                                intervals += sum(len(data) for data in mode.requirement.values())
+                intervals += sum(len(res.capacity) for res in self.res)
+                stats["intervals"] = intervals
+                stats["resources"] = len(self.res)
+                stats["terms"] = sum(len(res.terms) for res in self.res)
+                stats["temporals"] = len(self.tempo)
+                stats["states"] = len(self.state)
+                monitor = self.Params.Monitor
+                if monitor!=None:
+                        if hasattr(monitor,"info"):
+                                monitor.info("optseq %s",stats)
                         else:
-                                pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE, stderr=subprocess.PIPE, shell=True)		
+                                monitor(stats)
 
-                        print("\n ================ Now solving the problem ================ \n")
-                except OSError:
-                        print("error: could not execute command '%s'" % cmd)
-                        print("please check that the solver is in the path")
-                        exit(0)
+        def _budget(self,begin,deadline,grace=1):
+                """
+                returns the parameters of the solver, the time to interrupt the solver and the grace time to kill it
+                for a deadline (seconds from begin); the parameters are None if no time is left for the solver
+                """
+                if deadline==None:
+                        return self.Params, None, grace
+                now = time.time()
+                reserve = max(now-begin,0.05) #reading the results takes about as long as writing the model
+                grace = min(grace,max(deadline*0.05,0.05))
+                stopAt = begin+deadline-reserve-grace
+                if stopAt<=now:
+                        return None, None, grace
+                params = copy.copy(self.Params)
+                params.TimeLimit = max(1,min(self.Params.TimeLimit,int(stopAt-now)))
+                return params, stopAt, grace
+
+        def _communicate(self,pipe,data,callback=None,grace=1,stopAt=None):
+                """
+                sends the input (bytes or an iterable of chunks of bytes) to the solver and reads its output line by line
 
-                out, err = pipe.communicate(f.encode())                 #get the result
-                #print("out", out)
-                #print("error", err)
+                The solver is interrupted when the callback returns True, the objective value reaches Params.Target,
+                it is not improved for Params.StallTime seconds or the time reaches stopAt;
+                it is killed if it is still running "grace" seconds later.
+                Returns the output, the error output and True if the solver was stopped.
+                """
+                import queue
+                import signal
+                import threading
+
+                lines=queue.Queue()
+                errors=[]
+                failures=[]
+                def write():
+                        try:
+                                if isinstance(data,bytes):
+                                        pipe.stdin.write(data)
+                                else:
+                                        for chunk in data:
+                                                pipe.stdin.write(chunk)
+                        except (IOError,OSError): #the solver has already exited
+                                pass
+                        except Exception as e: #the model could not be written
+                                failures.append(e)
+                        finally:
+                                if hasattr(data,"close"):
+                                        data.close()
+                                try:
+                                        pipe.stdin.close()
+                                except (IOError,OSError):
+                                        pass
+                def read():
+                        for line in iter(pipe.stdout.readline,b""):
+                                lines.put(line)
+                        lines.put(None)
+                def readError():
+                        errors.append(pipe.stderr.read())
+                def kill():
+                        if pipe.poll()==None:
+                                pipe.kill()
+                threads=[threading.Thread(target=g) for g in (write,read,readError)]
+                for t in threads:
+                        t.daemon=True
+                        t.start()
+
+                target=self.Params.Target
+                stall=self.Params.StallTime
+                start=time.time()
+                improved=start
+                best=None
+                stopped=False
+                out=[]
+                while True:
+                        try:
+                                line=lines.get(timeout=0.1)
+                        except queue.Empty:
+                                line=b"" #no new line yet
+                        if line==None: #end of the output
+                                break
+                        now=time.time()
+                        stop=False
+                        if line:
+                                out.append(line)
+                                obj=_objective(line.decode('utf-8','replace'))
+                                if obj!=None and (best==None or obj<best):
+                                        best=obj
+                                        improved=now
+                                        if callback!=None and callback(now-start,obj):
+                                                stop=True
+                                        if target!=None and obj<=target:
+                                                stop=True
+                        if stall!=None and best!=None and now-improved>=stall:
+                                stop=True
+                        if stopAt!=None and now>=stopAt:
+                                stop=True
+                        if stop and not stopped:
+                                stopped=True
+                                if pipe.poll()==None:
+                                        if platform.system() == "Windows":
+                                                pipe.terminate()
+                                        else:
+                                                pipe.send_signal(signal.SIGINT) #let the solver report its best schedule
+                                        timer=threading.Timer(grace,kill)
+                                        timer.daemon=True
+                                        timer.start()
+                for t in threads:
+                        t.join()
+                pipe.wait()
+                if failures:
+                        raise failures[0]
+                return b"".join(out), b"".join(errors), stopped
+
+        async def optimizeAsync(self,workdir=None):
+                """
+                Optimize the model as optimize() does, using an asyncio subprocess.
 
+                The event loop is not blocked while optseq is running, so that many models can be solved at once.
+                If the task is cancelled, the solver process is killed.
+
+                    - Argument:
+                        - workdir(optional): Directory where the input, output and activity list files are written.
+                          Default=None (current directory).
+
+                    - Example usage:
+
+                    >>> await model.optimizeAsync()
+
+                    >>> await asyncio.gather(m1.optimizeAsync(workdir="job1"),m2.optimizeAsync(workdir="job2"))
+                """
+                import asyncio
+                f = self.update()
+                f2 = open(_filepath(workdir,"optseq_input.txt"),"w")
+                f2.write(f)
+                f2.close()
+
+                initial = self._writeInitial(workdir)
+                cmd = self._command(workdir=workdir,initial=initial)
+                key = self._cacheKey(f,cmd)
+                if key!=None:
+                        out = _cacheGet(self.Params.Cache,key,self.Params.CacheAge)
+                        if out!=None:
+                                _remove(initial)
+                                self._finish(cmd,out,b"",workdir)
+                                return
+                try:
+                        try:
+                                pipe = await _popenAsync(cmd)
+                                print("\n ================ Now solving the problem ================ \n")
+                        except OSError:
+                                print("error: could not execute command '%s'" % " ".join(cmd))
+                                print("please check that the solver is in the path")
+                                self.Status = 7  #execution falied
+                                if self.Params.Fallback:
+                                        print("the built-in heuristic is used instead")
+                                        self.optimizeHeuristic()
+                                return
+
+                        try:
+                                out, err = await pipe.communicate(f.encode())   #get the result
+                        except asyncio.CancelledError:
+                                if pipe.returncode==None:
+                                        pipe.kill()
+                                        await pipe.wait()
+                                raise
+                finally:
+                        _remove(initial)
+                self._finish(cmd,out,err,workdir)
+                if key!=None and self.Status in (0,-1):
+                        _cachePut(self.Params.Cache,key,out,self.Params.CacheSize,self.Params.CacheAge)
+
+        def _cacheKey(self,f,cmd):
+                """
+                returns the key of the solve cache for the model text (or the hash of its bytes, see _spool) and the solver arguments
+                (None if the cache is not used); the file name of the initial activity list is replaced with its contents
+                """
+                if self.Params.Cache==None:
+                        return None
+                if isinstance(f,str):
+                        key=hashlib.sha256(f.encode("utf-8"))
+                else:
+                        key=f.copy()
+                args=list(cmd[1:])
+                parts=[]
+                if "-initial" in args:
+                        i=args.index("-initial")
+                        try:
+                                with open(args[i+1]) as g:
+                                        parts.append(g.read())
+                        except (IOError,OSError):
+                                parts.append("")
+                        del args[i:i+2]
+                parts+=args
+                for part in parts:
+                        key.update(("\0"+part).encode("utf-8"))
+                return key.hexdigest()
+
+        def _finish(self,cmd,out,err,workdir=None):
+                """
+                checks the error output of the solver and reads the results
+                """
                 if err!=b"":
                         #if int(sys.version_info[0])>=3:
                         #    err = err.decode('utf-8')
-                        f2 = open("optseq_error.txt","w")
+                        f2 = open(_filepath(workdir,"optseq_error.txt"),"w")
                         f2.write("error: could not execute command")
                         f2.close()
-                        print("error: could not execute command '%s'" % cmd)
+                        print("error: could not execute command '%s'" % " ".join(cmd))
                         print("please check that the solver is in the path")
                         self.Status = 7  #execution falied
                         return 
@@ -869,16 +2875,638 @@ class Model(object):
                 if int(sys.version_info[0])>=3:
                         out = str(out, encoding='utf-8')
 
+                self._parse(out,workdir)
+
+        def optimizePortfolio(self,params=None,workdir=None,grace=1):
+                """
+                Optimize the model by several optseq processes that run at once with different parameters
+                and keep the best schedule found among them.
+
+                All the processes share model.Params.TimeLimit; the processes still running
+                "grace" seconds after the time limit are killed.
+
+                    - Arguments:
+                        - params(optional): Number of processes or list of parameter settings.
+                          A parameter setting is a Parameters object or a dictionary that maps parameter names to values;
+                          the parameters not in the dictionary are taken from model.Params.
+                          If params is a number K, K processes with the random seeds RandomSeed, RandomSeed+1, ..., RandomSeed+K-1 are started.
+                          Default=None (number of processors).
+                        - workdir(optional): Directory where the input, output and activity list files are written. Default=None (current directory).
+                        - grace(optional): Seconds to wait after the time limit before killing the processes. Default=1.
+
+                    - Return value: Parameters object of the process that found the best schedule (None if no schedule is found).
+
+                    - Example usage:
+
+                    >>> model.optimizePortfolio(8)
+
+                    >>> model.optimizePortfolio([{"RandomSeed":1},{"RandomSeed":2,"Tenure":5,"Neighborhood":10}])
+                """
+                import threading
+
+                if params==None:
+                        params=os.cpu_count() or 1
+                if type(params)==type(1):
+                        params=[{"RandomSeed":self.Params.RandomSeed+k} for k in range(params)]
+                settings=[]
+                for p in params:
+                        if isinstance(p,Parameters):
+                                q=copy.copy(p)
+                        else:
+                                q=copy.copy(self.Params)
+                                for key in p:
+                                        if not hasattr(q,key):
+                                                print("no parameter named {0}".format(key))
+                                                raise NameError
+                                        setattr(q,key,p[key])
+                        q.TimeLimit=self.Params.TimeLimit
+                        settings.append(q)
+
+                f = self.update()
+                f2 = open(_filepath(workdir,"optseq_input.txt"),"w")
+                f2.write(f)
+                f2.close()
+                data=f.encode()
+
+                initial = self._writeInitial(workdir)
+                pipes=[]
+                try:
+                        for q in settings:
+                                cmd = self._command(q,workdir,initial)
+                                try:
+                                        pipes.append(_popen(cmd))
+                                except OSError:
+                                        for pipe in pipes:
+                                                pipe.kill()
+                                        print("error: could not execute command '%s'" % " ".join(cmd))
+                                        print("please check that the solver is in the path")
+                                        self.Status = 7  #execution falied
+                                        return None
+                        print("\n ================ Now solving the problem ({0} processes) ================ \n".format(len(pipes)))
+
+                        results=[(None,None)]*len(pipes)
+                        def run(k):
+                                results[k]=pipes[k].communicate(data)
+                        threads=[threading.Thread(target=run,args=(k,)) for k in range(len(pipes))]
+                        deadline=time.time()+self.Params.TimeLimit+grace
+                        for t in threads:
+                                t.start()
+                        for t in threads:
+                                t.join(max(0,deadline-time.time()))
+                        for pipe in pipes:
+                                if pipe.poll()==None:
+                                        pipe.kill() #time is over
+                        for t in threads:
+                                t.join()
+                finally:
+                        _remove(initial)
+
+                best=None
+                infeasible=False
+                for k,(out,err) in enumerate(results):
+                        if out==None or err!=b"":
+                                continue
+                        if int(sys.version_info[0])>=3:
+                                out = str(out, encoding='utf-8')
+                        if out.find("no feasible schedule found")>0:
+                                infeasible=True
+                                continue
+                        if out.find("--- best solution ---")<0:
+                                continue #killed before reporting the schedule
+                        obj=_objective(out)
+                        if obj!=None and (best==None or obj<best[0]):
+                                best=(obj,k,out)
+
+                if best==None:
+                        if infeasible:
+                                print("infeasible solution (実行不能）")
+                                self.Status = -1  # infeasible
+                        else:
+                                print("error: no schedule is returned by the solver processes")
+                                self.Status = 7  #execution falied
+                        return None
+                (obj,k,out)=best
+                self._parse(out,workdir)
+                return settings[k]
+
+        def optimizeScenarios(self,scenarios=None,workers=None,workdir=None,warm=True):
+                """
+                Optimize what-if scenarios of the model and compare them with the base model.
+
+                The base model is solved first if it has no schedule. The solver input of each scenario is made from the text
+                of the base model, in which only the changed activities, resources and temporal constraints are written again,
+                and the scenarios are solved by solver processes running at once.
+                Each solve starts from the best activity list of the base model (warm start).
+                The results are kept in the scenario objects; the base model is not changed.
+
+                    - Arguments:
+                        - scenarios(optional): List of scenario objects. Default=None (model.scenarios).
+                        - workers(optional): Maximum number of solver processes running at the same time.
+                          Default=None (number of processors).
+                        - workdir(optional): Directory where the activity list file for the warm start is written.
+                          Default=None (system temporary directory).
+                        - warm(optional): True if the scenarios start from the best activity list of the base model. Default=True.
+
+                    - Return value: List of dictionaries (one for each scenario) with the keys
+                        - "name": Name of the scenario.
+                        - "Status": Status of the scenario.
+                        - "ObjVal": Objective value of the scenario.
+                        - "base": Objective value of the base model.
+                        - "difference": ObjVal-base (None if either is None).
+                        - "changed": Dictionary that maps the names of the activities whose start time, completion time or mode differ from the base schedule
+                          to the pairs of (start,completion,mode) in the base schedule and in the scenario.
+
+                    - Example usage:
+
+                    >>> down=model.addScenario("machine 1 down")
+                    >>> down.setCapacity(machine[1],24,48,0)
+                    >>> rush=model.addScenario("rush order")
+                    >>> rush.setDuedate(act,10)
+                    >>> for row in model.optimizeScenarios(workers=4):
+                    ...     print(row["name"],row["ObjVal"],row["difference"],len(row["changed"]))
+                """
+                from concurrent.futures import ThreadPoolExecutor
+
+                if scenarios==None:
+                        scenarios=self.scenarios
+                if workers==None:
+                        workers=os.cpu_count() or 1
+                if self.solution==None:
+                        self.optimize(workdir=workdir) #base schedule for the comparison and the warm start
+
+                self.update()
+                texts=[self._scenarioText(scenario) for scenario in scenarios]
+                initial=None
+                if warm:
+                        initial=self._writeInitial(workdir,self.bestActList)
+
+                def solve(k):
+                        scenario=scenarios[k]
+                        cmd=self._command(self.Params,workdir,initial)
+                        key=self._cacheKey(texts[k],cmd)
+                        out=None
+                        if key!=None:
+                                out=_cacheGet(self.Params.Cache,key,self.Params.CacheAge)
+                        if out==None:
+                                try:
+                                        pipe=_popen(cmd)
+                                except OSError:
+                                        print("error: could not execute command '%s'" % " ".join(cmd))
+                                        scenario.Status = 7  #execution falied
+                                        return
+                                out,err,stopped=self._communicate(pipe,texts[k].encode())
+                                if err!=b"":
+                                        print("error: could not execute command '%s'" % " ".join(cmd))
+                                        scenario.Status = 7  #execution falied
+                                        return
+                                scenario._read(out.decode("utf-8"))
+                                if stopped and scenario.Status==0:
+                                        scenario.Status = 11 #stopped early
+                                elif key!=None and scenario.Status in (0,-1):
+                                        _cachePut(self.Params.Cache,key,out,self.Params.CacheSize,self.Params.CacheAge)
+                        else:
+                                scenario._read(out.decode("utf-8"))
+
+                print("\n ================ Now solving {0} scenarios ================ \n".format(len(scenarios)))
+                pool=ThreadPoolExecutor(max_workers=workers)
+                try:
+                        list(pool.map(solve,range(len(scenarios))))
+                finally:
+                        pool.shutdown()
+                        _remove(initial)
+
+                base=self.solution
+                rows=[]
+                for scenario in scenarios:
+                        changed={}
+                        sol=scenario.solution
+                        if base!=None and sol!=None:
+                                for (i,name) in enumerate(base.names):
+                                        j=sol.index.get(name)
+                                        if name in ("source","sink") or j==None:
+                                                continue
+                                        before=(base.start[i],base.completion[i],base.modes[i])
+                                        after=(sol.start[j],sol.completion[j],sol.modes[j])
+                                        if before!=after:
+                                                changed[name]=(before,after)
+                        difference=None
+                        if scenario.ObjVal!=None and self.ObjVal!=None:
+                                difference=scenario.ObjVal-self.ObjVal
+                        rows.append({"name":scenario.name,"Status":scenario.Status,"ObjVal":scenario.ObjVal,
+                                     "base":self.ObjVal,"difference":difference,"changed":changed})
+                return rows
+
+        def _scenarioText(self,scenario):
+                """
+                returns the solver input of a scenario; the texts of the objects not changed by the scenario are those kept by update()
+                """
+                for a in scenario.duedates:
+                        if a not in self.activities:
+                                print("no activity named {0} in scenario {1}".format(a,scenario.name))
+                                raise NameError
+                for r in scenario.capacities:
+                        if r not in self.resources:
+                                print("no resource named {0} in scenario {1}".format(r,scenario.name))
+                                raise NameError
+                def end(x):
+                        if isinstance(x,str) and x!="source" and x!="sink":
+                                if x not in self.activities:
+                                        print("no activity named {0} in scenario {1}".format(x,scenario.name))
+                                        raise NameError
+                                return self.activities[x]
+                        return x
+
+                f=[]
+                for r in self.res:
+                        if r.name in scenario.capacities:
+                                res=copy.copy(r) #the base resource is not changed
+                                capacity=r.capacity
+                                for (start,finish,amount) in scenario.capacities[r.name]:
+                                        capacity=_override(capacity,start,finish,amount)
+                                res.capacity=IntervalProfile(capacity)
+                                f.append(res.__str__())
+                        else:
+                                f.append(r._str())
+                for s in self.state:
+                        f.append(s._str())
+                for m in self.modes:
+                        f.append("mode {0} ".format(m))
+                        f.append(self.modes[m]._str())
+                for a in self.act:
+                        if a.name in scenario.duedates:
+                                act=copy.copy(a)
+                                act.duedate=scenario.duedates[a.name]
+                                f.append(act.__str__())
+                        else:
+                                f.append(a._str())
+
+                removed=[False]*len(scenario.removed)
+                for t in self.tempo:
+                        pair=(_endName(t.pred),_endName(t.succ))
+                        skip=False
+                        for (k,(pred,succ,tempType)) in enumerate(scenario.removed):
+                                if (pred,succ)==pair and (tempType==None or tempType==t.type):
+                                        removed[k]=skip=True
+                        if not skip:
+                                f.append(t._str())
+                for k in range(len(removed)):
+                        if not removed[k]:
+                                print("no temporal constraint {0} in the model of scenario {1}".format(scenario.removed[k],scenario.name))
+                                raise NameError
+                for t in scenario.added:
+                        f.append(Temporal(end(t.pred),end(t.succ),t.type,t.delay).__str__())
+
+                for r in self.res:
+                        if len(r.terms)>0:
+                                f.append(r._constraint())
+                if self.Params.Makespan:
+                        f.append("activity sink duedate 0 \n")
+                return " \n".join(f)
+
+        def optimizeRolling(self,size=1000,key="duedate",timeLimit=None,workdir=None):
+                """
+                Optimize a large model by a rolling horizon: the activities are split into windows
+                and the windows are solved one by one with the earlier windows frozen.
+
+                Activities are ordered by due date or by precedence depth and cut into windows of about "size" activities;
+                an activity that must precede an activity of an earlier window by a temporal constraint is moved to that window.
+                In each window, temporal constraints from frozen activities become temporal constraints from "source",
+                the capacities of the renewable resources are the residual capacities after the earlier windows
+                and the right-hand sides of the nonrenewable resources are reduced by the frozen activities.
+                The results are written to the activities and resources of the model.
+                Nonrenewable terms of later windows and state values changed by earlier windows are not taken into account.
+
+                    - Arguments:
+                        - size(optional): Number of activities in a window. Default=1000.
+                        - key(optional): "duedate" (earliest due date first) or "depth" (number of predecessors on the longest precedence path). Default="duedate".
+                        - timeLimit(optional): Time limit of each window (in seconds). Default=None (Params.TimeLimit divided by the number of windows).
+                        - workdir(optional): Directory where the input, output and activity list files are written. Default=None (current directory).
+
+                    - Return value: List of the lists of activities in the windows.
+
+                    - Example usage:
+
+                    >>> model.optimizeRolling(size=500,key="depth")
+                """
+                acts=list(self.act)
+                position=dict((id(a),i) for (i,a) in enumerate(acts))
+                edges=[(position[id(t.pred)],position[id(t.succ)]) for t in self.tempo
+                       if isinstance(t.pred,Activity) and isinstance(t.succ,Activity)]
+
+                #order of the activities
+                if key=="duedate":
+                        order=sorted(range(len(acts)),
+                                     key=lambda i: (acts[i].duedate=="inf",acts[i].duedate if acts[i].duedate!="inf" else 0,i))
+                elif key=="depth":
+                        succs=[[] for a in acts]
+                        indegree=[0]*len(acts)
+                        for (i,j) in edges:
+                                succs[i].append(j)
+                                indegree[j]+=1
+                        depth=[0]*len(acts)
+                        queue=[i for i in range(len(acts)) if indegree[i]==0]
+                        for i in queue: #topological order; activities on cycles are left at depth 0
+                                for j in succs[i]:
+                                        depth[j]=max(depth[j],depth[i]+1)
+                                        indegree[j]-=1
+                                        if indegree[j]==0:
+                                                queue.append(j)
+                        order=sorted(range(len(acts)),key=lambda i: (depth[i],i))
+                else:
+                        print("key must be duedate or depth")
+                        raise NameError
+
+                window=[0]*len(acts)
+                for (k,i) in enumerate(order):
+                        window[i]=k//max(size,1)
+                changed=True
+                while changed: #a predecessor must not be in a later window than its successor
+                        changed=False
+                        for (i,j) in edges:
+                                if window[i]>window[j]:
+                                        window[i]=window[j]
+                                        changed=True
+                numbers=sorted(set(window))
+                windows=[[acts[i] for i in order if window[i]==w] for w in numbers]
+                if timeLimit==None:
+                        timeLimit=max(1,self.Params.TimeLimit//max(len(windows),1))
+
+                self.update()
+                capacity=dict((r.name,r.capacity) for r in self.res)
+                frozen={} #activity name -> activity object of the solved windows
+                for w in windows:
+                        sub=Model("{0}_window".format(self.name))
+                        sub.Params=copy.copy(self.Params)
+                        sub.Params.TimeLimit=timeLimit
+                        sub.act=w
+                        sub.state=self.state
+                        member=set(id(a) for a in w)
+                        for r in self.res:
+                                res=Resource(r.name,capacity[r.name],r.rhs,r.direction,r.weight)
+                                for (coeff,act,mode) in r.terms:
+                                        if id(act) in member:
+                                                res.terms.append((coeff,act,mode))
+                                        elif act.name in frozen and _modeName(act.selected)==mode.name:
+                                                res.rhs-=coeff #used by a frozen activity
+                                sub.res.append(res)
+                        for t in self.tempo:
+                                inPred=t.pred in ("source","sink") or id(t.pred) in member
+                                inSucc=t.succ in ("source","sink") or id(t.succ) in member
+                                if inPred and inSucc:
+                                        sub.tempo.append(t)
+                                elif inSucc and id(t.succ) in member and getattr(t.pred,"name",None) in frozen:
+                                        #fixed time of the frozen predecessor
+                                        if t.type in ("CS","CC"):
+                                                time=t.pred.completion+t.delay
+                                        else:
+                                                time=t.pred.start+t.delay
+                                        if t.type in ("CS","SS"):
+                                                sub.tempo.append(Temporal("source",t.succ,"SS",time))
+                                        else:
+                                                sub.tempo.append(Temporal("source",t.succ,"SC",time))
+                        sub.optimize(workdir=workdir)
+                        if sub.Status!=0:
+                                self.Status=sub.Status
+                                return windows
+                        for res in sub.res:
+                                residual=getattr(res,"residual",None)
+                                if residual:
+                                        #residual capacity up to the end of the window, and the capacity after it
+                                        end=max(t for (s,t) in residual)
+                                        cap=dict(residual)
+                                        for ((s,t),amount) in capacity[res.name].items():
+                                                if t=="inf" or t>end:
+                                                        cap[(max(s,end),t)]=cap.get((max(s,end),t),0)+amount
+                                        capacity[res.name]=cap
+                                        self.resources[res.name].residual=residual
+                        for a in w:
+                                frozen[a.name]=a
+
+                self.Status=0
+                if self.Params.Makespan:
+                        self.ObjVal=max([a.completion for a in self.act]+[0])
+                else:
+                        self.ObjVal=sum(a.weight*max(a.completion-a.duedate,0) for a in self.act if a.duedate!="inf")
+                return windows
+
+        def optimizeHeuristic(self,rule="EST",scheme="serial"):
+                """
+                Finds a schedule by the built-in schedule generation scheme (without the solver).
+
+                The activities are scheduled one by one in the order of a priority rule, each in the mode that completes earliest,
+                respecting the temporal constraints and the capacities of the renewable resources;
+                breaks, parallel executions, states and nonrenewable resources are not considered.
+                The serial scheme starts each activity as early as possible;
+                the parallel scheme advances the time and starts the activities that can start at that time.
+                The results are written to Activity.start/completion/execute/selected as in optimize;
+                Status is 0 if model.evaluate finds no violation and -1 otherwise, and ObjVal is the objective value.
+                optimize calls this method if Params.Fallback is True and the solver cannot be executed.
+
+                    - Arguments:
+                        - rule(optional): Priority rule; "EST" (earliest possible start; default), "SPT" (shortest processing time),
+                          "LPT" (longest processing time), "EDD" (earliest duedate), "ORDER" (order of addition to the model)
+                          or a function that maps an activity to a sort key.
+                        - scheme(optional): "serial" (default) or "parallel."
+
+                    - Return value:
+                        - Activity list (list of tuples of activity name and mode name) in the order of the start times,
+                          which can be passed to setInitial as a warm start.
+
+                    - Example usage:
+
+                    >>> model.optimizeHeuristic()
+
+                    >>> model.setInitial(model.optimizeHeuristic("LPT","parallel"))
+                    >>> model.optimize()
+                """
+                if scheme not in ("serial","parallel"):
+                        print("scheme must be serial or parallel")
+                        raise NameError
+                order=dict((act.name,i) for (i,act) in enumerate(self.act))
+                if callable(rule):
+                        priority=rule
+                elif rule in ("EST","ORDER"):
+                        priority=lambda act:0
+                elif rule=="SPT":
+                        priority=lambda act:min([m.duration for m in act.modes] or [0])
+                elif rule=="LPT":
+                        priority=lambda act:-max([m.duration for m in act.modes]+[0])
+                elif rule=="EDD":
+                        priority=lambda act:float("inf") if act.duedate=="inf" else act.duedate
+                else:
+                        print("unknown priority rule {0}".format(rule))
+                        raise NameError
+
+                avail=dict((res.name,_Availability(res.capacity)) for res in self.res if len(res.terms)==0)
+                preds=dict((act.name,[]) for act in self.act) #temporal constraints whose successor is the activity
+                succs=dict((act.name,[]) for act in self.act) #temporal constraints whose predecessor is the activity
+                for temp in self.tempo:
+                        if temp.succ not in ("source","sink") and temp.succ.name in preds:
+                                preds[temp.succ.name].append(temp)
+                        if temp.pred not in ("source","sink") and temp.pred.name in succs:
+                                succs[temp.pred.name].append(temp)
+                done={} #activity name -> (start,completion)
+
+                def bounds(act,mode):
+                        #earliest and latest start times of the activity in the mode allowed by the scheduled activities
+                        (lb,ub)=(0,float("inf"))
+                        for temp in preds[act.name]:
+                                if temp.pred=="source":
+                                        t=0
+                                elif temp.pred=="sink" or temp.pred.name not in done:
+                                        continue
+                                else:
+                                        t=done[temp.pred.name][1 if temp.type in ("CS","CC") else 0]
+                                t+=temp.delay
+                                lb=max(lb,t if temp.type in ("CS","SS") else t-mode.duration)
+                        for temp in succs[act.name]:
+                                if temp.succ in ("source","sink") or temp.succ.name not in done:
+                                        continue
+                                t=done[temp.succ.name][0 if temp.type in ("CS","SS") else 1]-temp.delay
+                                ub=min(ub,t-mode.duration if temp.type in ("CS","CC") else t)
+                        return (lb,ub)
+
+                required={} #mode -> requirements of the renewable resources
+                def requirements(mode):
+                        req=required.get(mode)
+                        if req!=None:
+                                return req
+                        req=[]
+                        for ((r,rtype),data) in mode.requirement.items():
+                                if rtype!="break" and r in avail:
+                                        for ((rs,rt),amount) in data.items():
+                                                rt=mode.duration if rt=="inf" else min(rt,mode.duration)
+                                                if rs<rt:
+                                                        req.append((r,rs,rt,amount))
+                        required[mode]=req
+                        return req
+
+                def earliest(start,req):
+                        #earliest time from start at which the requirements fit into the remaining capacities (None if never)
+                        while True:
+                                later=start
+                                for (r,rs,rt,amount) in req:
+                                        t=avail[r].conflict(start+rs,start+rt,amount)
+                                        if t=="inf":
+                                                return None
+                                        if t!=None:
+                                                later=max(later,t-rs)
+                                if later==start:
+                                        return start
+                                start=later
+
+                def place(act,at=None):
+                        #schedules the activity in its best mode (at the given time in the parallel scheme); returns True if placed
+                        best=None
+                        for mode in act.modes:
+                                (lb,ub)=bounds(act,mode)
+                                req=requirements(mode)
+                                if at!=None:
+                                        if at<lb or any(avail[r].conflict(at+rs,at+rt,amount)!=None for (r,rs,rt,amount) in req):
+                                                continue
+                                        start=at
+                                else:
+                                        start=earliest(lb,req)
+                                        if start==None:
+                                                start=lb #the capacity is never enough; the violation is left to the schedule
+                                key=(start>ub,start+mode.duration)
+                                if best==None or key<best[0]:
+                                        best=(key,mode,start,req)
+                        if best==None:
+                                return False
+                        (key,mode,start,req)=best
+                        for (r,rs,rt,amount) in req:
+                                avail[r].use(start+rs,start+rt,amount)
+                        done[act.name]=(start,start+mode.duration)
+                        selected[act.name]=mode
+                        return True
+
+                selected={}
+                todo=[act for act in self.act if act.modes]
+                def entry(act):
+                        #(sort key, index, earliest start) of the activity; the earliest start is fixed once the predecessors are scheduled
+                        lb=min(bounds(act,m)[0] for m in act.modes)
+                        return ((priority(act),lb,order[act.name]) if rule!="ORDER" else (order[act.name],),order[act.name],lb)
+
+                #The activities whose predecessors are all scheduled are ready, and the one with the smallest key
+                #(priority, earliest start, order of addition) is scheduled first: at its earliest start in the serial scheme,
+                #and at the current time if it fits in the parallel scheme.
+                #If none is ready (a cycle of temporal constraints), those with the fewest unscheduled predecessors are taken.
+                waiting=dict((act.name,sum(1 for temp in preds[act.name] if temp.pred not in ("source","sink"))) for act in todo)
+                ready=[entry(act) for act in todo if waiting[act.name]==0] #heap
+                heapq.heapify(ready)
+                now=0
+                while len(done)<len(todo):
+                        if ready:
+                                candidates=ready
+                        else:
+                                fewest=min(waiting[act.name] for act in todo if act.name not in done)
+                                candidates=[entry(act) for act in todo if act.name not in done and waiting[act.name]==fewest]
+                        if scheme=="serial":
+                                chosen=ready[0] if ready else min(candidates)
+                                place(self.act[chosen[1]])
+                        else:
+                                chosen=None
+                                for e in sorted(candidates):
+                                        if place(self.act[e[1]],now):
+                                                chosen=e
+                                                break
+                                if chosen==None:
+                                        #advance the time to the next earliest start or capacity change
+                                        nxt=[e[2] for e in candidates]
+                                        nxt+=[t for r in avail.values() for t in r.events[bisect.bisect_right(r.events,now):bisect.bisect_right(r.events,now)+1]]
+                                        nxt=[t for t in nxt if t>now]
+                                        if nxt:
+                                                now=min(nxt)
+                                                continue
+                                        chosen=min(candidates) #none fits any more; it is placed anyway
+                                        place(self.act[chosen[1]])
+                        if candidates is ready:
+                                if chosen==ready[0]:
+                                        heapq.heappop(ready)
+                                else:
+                                        ready.remove(chosen)
+                                        heapq.heapify(ready)
+                        for temp in succs[self.act[chosen[1]].name]:
+                                if temp.succ in ("source","sink") or temp.succ.name not in waiting:
+                                        continue
+                                waiting[temp.succ.name]-=1
+                                if waiting[temp.succ.name]==0 and temp.succ.name not in done:
+                                        heapq.heappush(ready,entry(temp.succ))
+
+                for act in self.act:
+                        if act.name in done:
+                                (start,completion)=done[act.name]
+                                mode=selected[act.name]
+                                object.__setattr__(act,"_row",None)
+                                act.start=start
+                                act.completion=completion
+                                act.execute={(start,completion):1} if completion>start else {}
+                                act.selected=mode.name if len(act.modes)>=2 else mode
+                acts=dict((act.name,act) for act in self.act)
+                actList=[(name,selected[name].name if len(acts[name].modes)>=2 else "---")
+                         for name in sorted(done,key=lambda name:(done[name][0],order[name]))]
+                (self.ObjVal,violations)=self.evaluate()
+                self.Status=0 if not violations else -1
+                self.bestActList=actList
+                return actList
+
+        def _parse(self,out,workdir=None):
+                """
+                reads the solver output and sets the results to the activities and resources
+
+                The output is read in one pass. The schedule is kept in arrays of a Solution object (model.solution)
+                and the start, completion, execute and selected attributes of each activity are filled when they are first used.
+                """
+                LOG=self.Params.OutputFlag
                 if LOG:
                         print("\noutput:")
                         print(out)
 
-                print("\nSolutions:")
-
                 """
         optseq output file
         """
-                f3 = open("optseq_output.txt","w")
+                f3 = open(_filepath(workdir,"optseq_output.txt"),"w")
                 f3.write(out)
                 f3.close()
 
@@ -897,110 +3525,58 @@ class Model(object):
                         self.Status = -1  # infeasible 
                         return
                 self.Status = 0       # optimized 
-                s0="--- best solution ---"
-                s1="--- tardy activity ---"
-                s2="--- resource residuals ---"
-                s3="--- best activity list ---" #added for optseq 3.0
-                s4="objective value ="
-                pos0=out.find(s0)+len(s0) #job data start position
-                pos1=out.find(s1,pos0)    #data end position
-                pos2=out.find(s2,pos1)
-                pos3=out.find(s3,pos2)
-                pos4=out.find(s4,pos3)
-                #print("data positions",pos0,pos1,pos2,pos3,pos4)
-                data=out[pos0:pos1]
-                resdata=out[pos2+len(s2):pos3]
-                data=data.splitlines()
-                reslines=resdata.splitlines()
+                self.ObjVal=_objective(out)
+
+                (sol,residual,bestact)=_readOutput(out)
+                if sol==None:
+                        print("Problem is infeasible")
+                        self.Status = -1  # infeasible
+                        return
+                for resname in residual:
+                        self.resources[resname].residual=residual[resname]
+
+                self.bestActList=[tuple(line.split()[:2]) for line in bestact if len(line.split())>=2]
 
                 #save the best activity list
-                bestactdata=out[pos3+len(s3):pos4]
-                f3 = open("optseq_best_act_data.txt","w")
-                f3.write(bestactdata.lstrip())
+                f3 = open(_filepath(workdir,"optseq_best_act_data.txt"),"w")
+                f3.write(("\n".join(bestact)+"\n").lstrip())
                 f3.close()
 
-                for line in reslines:
-                        if len(line)<=1:
-                                continue
-                        current=line.split()
-                        resname=current[0][:-1]
-                        residual=current[1:]
-                        count=0
-                        resDic={} #residual capacity
-                        while count<len(residual):
-                                interval=residual[count].split(",")
-                                int1=int(interval[0][1:])
-                                int2=int(interval[1][:-1])
-                                count+=1
-                                num=int(residual[count])
-                                count+=1
-                                resDic[(int1,int2)]=num
-                        #print(resname,residual)
-                        self.resources[resname].residual=resDic
-
-                #job data conversion
-                execute=[]
-                for i in range(len(data)):
-                        replaced=data[i].replace(","," ")
-                        current=replaced.split() #split by space
-                        #print(current)
-                        if len(current)>1:
-                                execute.append(current)
-                for line in execute:
-                        #print("line=",line)
-                        actname=line[0]
-                        mode=line[1]
-                        try:
-                                start=line[2]
-                        except:
-                                print("Problem is infeasible")
-                                exit(0)
-
-                        execute=line[3:-1] #list for breakable activity
-                        completion=line[-1]
-                        print("{0:>10} {1:>5} {2:>5} {3:>5}".format(actname,mode,start,completion))
-                        #print("execute=",execute)
-                        if actname=="source":
-                                pass
-                        elif actname=="sink":
-                                pass
-                        else:
-                                self.activities[actname].start=int(start)
-                                self.activities[actname].completion=int(completion)
-                                if mode !="---":
-                                        self.activities[actname].selected=mode
-                                else:
-                                        self.activities[actname].selected=self.activities[actname].modes[0]
-                                exeDic={}
-                                for exe in execute:
-                                        exedata=exe.split("--")
-                                        start=exedata[0]
-                                        completion=exedata[1]
-                                        idx=completion.find("[")
-                                        #for parallel execution
-                                        if idx>0:
-                                                parallel=completion[idx+1:-1]
-                                                completion=completion[:idx]
-                                                #print(completion,idx,parallel)
-                                        else:
-                                                parallel=1
-                                        exeDic[(int(start),int(completion))]=parallel
-                                self.activities[actname].execute=exeDic
+                self.solution=sol
+                if self.Params.Echo:
+                        print("\nSolutions:")
+                        for i in range(len(sol.names)):
+                                print("{0:>10} {1:>5} {2:>5} {3:>5}".format(sol.names[i],sol.modes[i],sol.start[i],sol.completion[i]))
+                for i in range(len(sol.names)):
+                        actname=sol.names[i]
+                        if actname!="source" and actname!="sink":
+                                object.__setattr__(self.activities[actname],"_row",(sol,i))
                 return
 
-        def write(self,filename="optseq_chart.txt"):
+        def write(self,filename="optseq_chart.txt",bucket=1):
                 """
                 Output the gantt's chart as a text file.
 
+                The rows are made from the change points of the schedule and of the resource profiles
+                and are written through a buffered file, so that long planning horizons can be written quickly.
+
                     - Argument:
                         - filename: Output file name. Default="optseq_chart.txt."
+                        - bucket(optional): Number of periods shown in one column. Positive integer. Default=1.
+                          If bucket>1, a column shows the largest parallel number of an activity,
+                          the largest resource usage and the smallest capacity in its periods,
+                          and is numbered by its last period.
 
                     - Example usage:
 
                     >>> model.write("sample.txt")
 
+                    >>> model.write("sample.txt",bucket=10)
+
                 """
-                f=open(filename,"w")
+                if type(bucket)!=type(1) or bucket<=0:
+                        print("bucket must be a positive integer")
+                        raise TypeError
 
                 horizon=0
                 actList=[]
@@ -1010,56 +3586,45 @@ class Model(object):
                         horizon=max(act.completion,horizon)
                 #print("planning horizon=",horizon)
                 actList.sort()
-                title=" activity    mode".center(20)+" duration |"
+                columns=(horizon+bucket-1)//bucket
 
                 width=len(str(horizon)) #period width =largest index of time
-                for t in range(horizon):
-                        num=str(t+1)
-                        title+=num.rjust(width)+"|"
+                cells={(0,0):"|"+" "*width, (1,0):"|"+"."*width, (2,1):"|"+"="*width}
+                def cell(state):
+                        if state not in cells:
+                                cells[state]="|*"+str(state[1]).rjust(width-1)
+                        return cells[state]
+                def number(value):
+                        return "|"+str(value).rjust(width)
+
+                f=open(filename,"w",1<<16)
+                title=[" activity    mode".center(20)+" duration |"]
+                for k in range(columns):
+                        num=str(min((k+1)*bucket,horizon))
+                        title.append(num.rjust(width)+"|")
                 #print(title)
-                f.write(title+"\n")
-                f.write("-"*(30+(width+1)*horizon)+"|\n")
+                f.write("".join(title)+"\n")
+                line="-"*(30+(width+1)*columns)
+                f.write(line+"|\n")
                 for a in actList: #sorted order
                         act=self.activities[a] #act: activity object
-                        actstring=act.name.center(10)[:10]
+                        actstring=[act.name.center(10)[:10]]
                         if len(act.modes)>=2:
-                                actstring+= str(act.selected).center(10)
-                                actstring+=str(self.modes[act.selected].duration).center(10)
-                                #print(" executed on resource:")
-                                #print(self.modes[act.selected].requirement,m1.modes[act.selected].rtype)
+                                actstring.append(str(act.selected).center(10))
+                                actstring.append(str(self.modes[act.selected].duration).center(10))
                         else:
-                                #print("executed on resource:")
-                                #print(act.modes[0].requirement,act.modes[0].rtype)
-                                actstring+= str(act.modes[0].name).center(10)[:10]
-                                actstring+=str(act.modes[0].duration).center(10)
-                        execute=[0 for t in range(horizon)]
-                        for (s,c) in act.execute:
-                                para=act.execute[s,c]
-                                for t in range(s,c):
-                                        execute[t]=int(para)
-
-                        for t in range(horizon):
-                                if execute[t]>=2:
-                                        #for res_name in self.modes[act.selected].requirement:
-                                                #print(res_name)
-                                        #print(m1.modes[act.selected].rtype)
-                                        #print(self.modes[act.selected])
-                                        actstring+="|*"+str(execute[t]).rjust(width-1)
-                                elif execute[t]==1:
-                                        actstring+="|"+"="*(width)
-                                elif t>=act.start and t<act.completion:
-                                        actstring+="|"+"."*(width)
-                                else:
-                                        actstring+="|"+" "*width
-                        actstring+="|"
-                        #print(actstring)
-                        f.write(actstring+"\n")
+                                actstring.append(str(act.modes[0].name).center(10)[:10])
+                                actstring.append(str(act.modes[0].duration).center(10))
+                        for (k0,k1,state) in _bucket(_activitySteps(act,horizon),bucket,horizon):
+                                actstring.append(cell(state)*(k1-k0))
+                        actstring.append("|\n")
+                        f.write("".join(actstring))
 ##    ##        print(act.name +"  starts at "+str(act.start)+" and finish at " +str(act.completion))
 ##    ##        print("  and is executed :"+str(act.execute)])
 
-                f.write("-"*(30+(width+1)*horizon)+"\n")
+                f.write(line+"\n")
                 f.write("resource usage/capacity".center(30)+"| \n")
-                f.write("-"*(30+(width+1)*horizon)+"\n")
+                f.write(line+"\n")
                 resList=[]
                 for r in self.resources:
                         resList.append(r)
@@ -1067,40 +3632,343 @@ class Model(object):
                 for r in resList:
                         res=self.resources[r]
                         if len(res.terms)==0: #output residual and capacity
-                                rstring=res.name.center(30)
-                                cap=[0 for t in range(horizon)]
-                                residual=[0 for t in range(horizon)]
-                                for (s,c) in res.residual:
-                                        amount=res.residual[(s,c)]
-                                        if c=="inf":
-                                                c=horizon
-                                        s=min(s,horizon)
-                                        c=min(c,horizon)
-                                        for t in range(s,c):
-                                                residual[t]+=amount
+                                steps=_sweep(horizon,res.capacity,res.residual)
+                                used=[(s,t,cap-residual) for (s,t,(cap,residual)) in steps]
+                                cap=[(s,t,cap) for (s,t,(cap,residual)) in steps]
+
+                                rstring=[res.name.center(30)]
+                                for (k0,k1,value) in _bucket(used,bucket,horizon,max):
+                                        rstring.append(number(value)*(k1-k0))
+                                rstring.append("|\n")
+                                f.write("".join(rstring))
+
+                                rstring=[str(" ").center(30)]
+                                for (k0,k1,value) in _bucket(cap,bucket,horizon,min):
+                                        rstring.append(number(value)*(k1-k0))
+                                rstring.append("|\n")
+                                f.write("".join(rstring))
+                                f.write(line+"\n")
+                f.close()
 
-                                for (s,c) in res.capacity:
-                                        amount=res.capacity[(s,c)]
-                                        if c=="inf":
-                                                c=horizon
-                                        s=min(s,horizon)
-                                        c=min(c,horizon)
-                                        for t in range(s,c):
-                                                cap[t]+=amount
+        def resourceProfile(self,name=None):
+                """
+                Returns the usage, capacity and slack of a renewable resource over time as step functions.
 
-                                for t in range(horizon):
-                                        num=str(cap[t]-residual[t])
-                                        rstring+="|"+num.rjust(width)
-                                f.write(rstring+"|\n")
+                The usages are computed from the execution intervals of the activities and the requirements of the selected modes
+                (standard, "max" and "break" requirements); the capacities from Resource.capacity.
+                Both are summed up at their change points only, up to the completion time of the last activity.
 
-                                rstring= str(" ").center(30)
+                    - Arguments:
+                        - name(optional): Name of a resource (or a resource object). Default=None (all renewable resources).
 
-                                for t in range(horizon):
-                                        num=str(cap[t])
-                                        rstring+="|"+num.rjust(width)
-                                f.write(rstring+"|\n")
-                                f.write("-"*(30+(width+1)*horizon)+"\n")
-                f.close()
+                    - Return value:
+                        - Tuple (times,usage,capacity,slack) of arrays; usage[i], capacity[i] and slack[i] hold in the interval (times[i],times[i+1]).
+                          If name is None, a dictionary that maps the resource names to the tuples.
+
+                    - Example usage:
+
+                    >>> (times,usage,capacity,slack)=model.resourceProfile("worker")
+
+                """
+                horizon=0
+                for act in self.act:
+                        horizon=max(act.completion,horizon)
+                resources=[res for res in self.res if len(res.terms)==0]
+                if name!=None:
+                        if not isinstance(name,str):
+                                name=name.name
+                        resources=[res for res in resources if res.name==name]
+                        if not resources:
+                                print("no renewable resource {0}".format(name))
+                                raise NameError
+                diff=dict((res.name,{}) for res in resources) #change of (usage,capacity) at each time
+                def add(r,s,c,amount,i):
+                        s=min(s,horizon)
+                        c=horizon if c=="inf" else min(c,horizon)
+                        if s<c:
+                                d=diff[r]
+                                d.setdefault(s,[0,0])[i]+=amount
+                                d.setdefault(c,[0,0])[i]-=amount
+                for res in resources:
+                        for ((s,c),amount) in res.capacity.items():
+                                add(res.name,s,c,amount,1)
+                for act in self.act:
+                        mode=_selectedMode(act)
+                        if mode!=None:
+                                for (r,s,c,amount) in _usage(act.execute,mode):
+                                        if r in diff:
+                                                add(r,s,c,amount,0)
+                profiles={}
+                for res in resources:
+                        d=diff[res.name]
+                        d.setdefault(0,[0,0])
+                        d.setdefault(horizon,[0,0])
+                        times=sorted(d)
+                        usage=array.array("l",itertools.accumulate(d[t][0] for t in times[:-1]))
+                        capacity=array.array("l",itertools.accumulate(d[t][1] for t in times[:-1]))
+                        slack=array.array("l",(c-u for (u,c) in zip(usage,capacity)))
+                        profiles[res.name]=(array.array("l",times),usage,capacity,slack)
+                if name!=None:
+                        return profiles[name]
+                return profiles
+
+        def evaluate(self,schedule=None):
+                """
+                Checks a schedule against the constraints of the model and computes its objective value without the solver.
+
+                The temporal constraints, the capacities of the renewable resources, the breaks and parallel executions of the modes,
+                the state transitions and the nonrenewable resource constraints are checked.
+                The objective value is the makespan if Params.Makespan is True and the total weighted tardiness otherwise,
+                plus the penalties of the violated nonrenewable resource constraints with finite weights.
+
+                    - Arguments:
+                        - schedule(optional): Dictionary that maps activity names to tuples (start,completion,mode,execute);
+                          mode is a mode name or a mode object (None for a single mode activity) and
+                          execute is a dictionary that maps execution intervals to parallel numbers (None for the interval (start,completion)).
+                          Default=None (the start and completion times, selected modes and execution intervals of the activities).
+
+                    - Return value:
+                        - Tuple (objective value, list of the violated constraints). The schedule is feasible if the list is empty.
+
+                    - Example usage:
+
+                    >>> (obj,violations)=model.evaluate({"act1":(0,3,"Mode1",None),"act2":(3,5,None,None)})
+
+                """
+                return self.evaluateMany([schedule])[0]
+
+        def evaluateMany(self,schedules):
+                """
+                Checks many schedules and computes their objective values (see evaluate).
+
+                The capacities, temporal constraints and states of the model are prepared once for all the schedules.
+
+                    - Arguments:
+                        - schedules: List of schedules (dictionaries that map activity names to tuples (start,completion,mode,execute)).
+
+                    - Return value:
+                        - List of tuples (objective value, list of the violated constraints).
+
+                """
+                capacity={} #change of capacity at each time for each renewable resource
+                for res in self.res:
+                        if len(res.terms)==0:
+                                d=capacity[res.name]={}
+                                for ((s,c),amount) in res.capacity.items():
+                                        d[s]=d.get(s,0)+amount
+                                        if c!="inf":
+                                                d[c]=d.get(c,0)-amount
+                fixed=dict((s.name,sorted(s.Value.items())) for s in self.state)
+
+                results=[]
+                for schedule in schedules:
+                        violations=[]
+                        rows={} #activity name -> (start,completion,mode,execute)
+                        for act in self.act:
+                                if schedule==None:
+                                        row=(act.start,act.completion,act.selected,act.execute)
+                                elif act.name in schedule:
+                                        row=schedule[act.name]
+                                else:
+                                        violations.append("activity {0} is not scheduled".format(act.name))
+                                        continue
+                                (start,completion,mode,execute)=row
+                                if mode==None and len(act.modes)==1:
+                                        mode=act.modes[0]
+                                else:
+                                        mode=[m for m in act.modes if mode!=None and m.name==_modeName(mode)]
+                                        if not mode:
+                                                violations.append("activity {0} has no mode {1}".format(act.name,row[2]))
+                                                continue
+                                        mode=mode[0]
+                                if not execute:
+                                        execute={(start,completion):1}
+                                rows[act.name]=(start,completion,mode,execute)
+                                violations.extend(self._checkMode(act.name,start,completion,mode,execute))
+
+                        makespan=max([row[1] for row in rows.values()]+[0])
+                        for temp in self.tempo:
+                                times=[]
+                                for a in (temp.pred,temp.succ):
+                                        if a=="source":
+                                                times.append((0,0))
+                                        elif a=="sink":
+                                                times.append((makespan,makespan))
+                                        elif a.name in rows:
+                                                times.append(rows[a.name][:2])
+                                if len(times)<2:
+                                        continue
+                                ((ps,pc),(ss,sc))=times
+                                t=temp.type
+                                pred=pc if t in ("CS","CC") else ps
+                                succ=ss if t in ("CS","SS") else sc
+                                if pred+temp.delay>succ:
+                                        violations.append("temporal {0} {1} type {2} delay {3} is violated".format(
+                                                getattr(temp.pred,"name",temp.pred),getattr(temp.succ,"name",temp.succ),t,temp.delay))
+
+                        diff=dict((r,[dict(d),{}]) for (r,d) in capacity.items())
+                        for (start,completion,mode,execute) in rows.values():
+                                for (r,s,c,amount) in _usage(execute,mode):
+                                        if r in diff:
+                                                d=diff[r][1]
+                                                d[s]=d.get(s,0)+amount
+                                                d[c]=d.get(c,0)-amount
+                        for r in sorted(diff):
+                                (cap,use)=diff[r]
+                                (available,used)=(0,0)
+                                for t in sorted(set(cap)|set(use)):
+                                        available+=cap.get(t,0)
+                                        used+=use.get(t,0)
+                                        if used>available:
+                                                violations.append("resource {0} is used {1} over the capacity {2} at time {3}".format(r,used,available,t))
+
+                        changes=dict((s,[(t,0,v,None) for (t,v) in values]) for (s,values) in fixed.items())
+                        for (a,(start,completion,mode,execute)) in rows.items():
+                                for (s,(fromValue,toValue)) in mode.state.items():
+                                        changes.setdefault(s,[]).append((start,1,(fromValue,toValue),a))
+                        for s in sorted(changes):
+                                value=None
+                                for (t,kind,v,a) in sorted(changes[s],key=lambda x:x[:2]):
+                                        if kind==0:
+                                                value=v
+                                        else:
+                                                if value!=None and value!=v[0]:
+                                                        violations.append("activity {0} needs the value {1} of the state {2} at time {3} but it is {4}".format(a,v[0],s,t,value))
+                                                value=v[1]
+
+                        if self.Params.Makespan:
+                                objective=makespan
+                        else:
+                                objective=0
+                                for act in self.act:
+                                        if act.duedate!="inf" and act.name in rows:
+                                                objective+=act.weight*max(0,rows[act.name][1]-act.duedate)
+                        for res in self.res:
+                                if len(res.terms)==0:
+                                        continue
+                                lhs=0
+                                for (coeff,act,mode) in res.terms:
+                                        if act.name in rows and rows[act.name][2].name==mode.name:
+                                                lhs+=coeff
+                                if res.direction in (">=",">"):
+                                        excess=max(0,res.rhs-lhs)
+                                elif res.direction in ("==","="):
+                                        excess=abs(lhs-res.rhs)
+                                else:
+                                        excess=max(0,lhs-res.rhs)
+                                if excess>0:
+                                        if res.weight=="inf":
+                                                violations.append("nonrenewable resource {0} is violated by {1}".format(res.name,excess))
+                                        else:
+                                                objective+=res.weight*excess
+                        results.append((objective,violations))
+                return results
+
+        def _checkMode(self,name,start,completion,mode,execute):
+                """
+                returns the violations of the execution intervals of an activity (duration, breaks and parallel executions)
+                """
+                violations=[]
+                exe=sorted((s,c,int(para)) for ((s,c),para) in execute.items() if int(para)>=1)
+                if not exe:
+                        if mode.duration>0:
+                                violations.append("activity {0} is not executed".format(name))
+                        return violations
+                if exe[0][0]!=start or exe[-1][1]!=completion:
+                        violations.append("activity {0} is executed out of ({1},{2})".format(name,start,completion))
+                if max(para for (s,c,para) in exe)==1 and sum(c-s for (s,c,para) in exe)!=mode.duration:
+                        violations.append("activity {0} is executed for {1} periods but mode {2} takes {3}".format(
+                                name,sum(c-s for (s,c,para) in exe),mode.name,mode.duration))
+                inf=float("inf")
+                done=0
+                last=None
+                for (s,c,para) in exe:
+                        if last!=None and last<s:
+                                ok=False
+                                for ((bs,bt),maxtime) in mode.breakable.items():
+                                        if bs<=done and (bt=="inf" or done<=bt) and (maxtime=="inf" or s-last<=maxtime):
+                                                ok=True
+                                if not ok:
+                                        violations.append("activity {0} breaks in ({1},{2})".format(name,last,s))
+                        if para>=2:
+                                limit=max([inf if m=="inf" else m for m in mode.parallel.values()]+[1])
+                                if para>limit:
+                                        violations.append("activity {0} is executed {1} in parallel in ({2},{3})".format(name,para,s,c))
+                        done+=c-s
+                        last=c
+                return violations
+
+        def _intervalRows(self):
+                """
+                yields the rows (kind,name,mode,start,finish,value) of the long format of the schedule
+                """
+                horizon=0
+                for act in self.act:
+                        horizon=max(act.completion,horizon)
+                for a in sorted(self.activities):
+                        act=self.activities[a]
+                        mode="" if act.selected==None else _modeName(act.selected)
+                        yield ("activity",act.name,mode,act.start,act.completion,"")
+                        for ((s,c),para) in sorted(act.execute.items()):
+                                yield ("execute",act.name,mode,s,c,int(para))
+                for r in sorted(self.resources):
+                        res=self.resources[r]
+                        if len(res.terms)==0:
+                                steps=_sweep(horizon,res.capacity,getattr(res,"residual",{}))
+                                for (s,t,cap) in _runs((s,t,cap) for (s,t,(cap,residual)) in steps):
+                                        yield ("capacity",res.name,"",s,t,cap)
+                                for (s,t,usage) in _runs((s,t,cap-residual) for (s,t,(cap,residual)) in steps):
+                                        yield ("usage",res.name,"",s,t,usage)
+
+        def writeIntervals(self,filename="optseq_intervals.csv",batch=65536):
+                """
+                Output the schedule and the resource profiles in a long (interval) format.
+
+                Each row is (kind,name,mode,start,finish,value):
+                "activity" rows give the start and completion times of the activities and their modes,
+                "execute" rows give the execution intervals with the parallel numbers,
+                "capacity" and "usage" rows give the change points of the capacities and the usages of the renewable resources
+                up to the completion time of the last activity.
+                The rows are streamed to a csv file, or to a Parquet file if the file name ends with ".parquet"
+                (pyarrow is needed in this case).
+
+                    - Argument:
+                        - filename: Output file name. Default="optseq_intervals.csv."
+                        - batch(optional): Number of rows written to a Parquet file at once. Default=65536.
+
+                    - Example usage:
+
+                    >>> model.writeIntervals("sample.csv")
+
+                    >>> model.writeIntervals("sample.parquet")
+
+                """
+                columns=("kind","name","mode","start","finish","value")
+                rows=self._intervalRows()
+                if not filename.endswith(".parquet"):
+                        import csv
+                        with open(filename,"w",newline="") as f:
+                                w=csv.writer(f)
+                                w.writerow(columns)
+                                w.writerows(rows)
+                        return
+
+                try:
+                        import pyarrow
+                        import pyarrow.parquet
+                except ImportError:
+                        print("pyarrow is needed to write a Parquet file")
+                        raise
+                schema=pyarrow.schema([("kind",pyarrow.string()),("name",pyarrow.string()),("mode",pyarrow.string()),
+                                       ("start",pyarrow.int64()),("finish",pyarrow.int64()),("value",pyarrow.int64())])
+                with pyarrow.parquet.ParquetWriter(filename,schema) as w:
+                        while True:
+                                chunk=list(itertools.islice(rows,batch))
+                                if not chunk:
+                                        break
+                                data=[list(col) for col in zip(*chunk)]
+                                data[5]=[None if v=="" else v for v in data[5]]
+                                w.write_table(pyarrow.Table.from_arrays([pyarrow.array(d,type=schema.field(i).type) for (i,d) in enumerate(data)],schema=schema))
 
         def writeExcel(self,filename="optseq_chart.csv",scale=1):
                 """
@@ -1108,12 +3976,18 @@ class Model(object):
 
                     - Argument:
                         - filename: Output file name. Default="optseq_chart.csv."
+                        - scale(optional): Number of periods shown in one column. Positive number. Default=1.
 
                     - Example usage:
 
                     >>> model.writeExcel("sample.csv")
 
+                    See also writeIntervals, which writes the schedule in a compact long format.
+
                 """
+                if scale<=0:
+                        print("optseq write scale error")
+                        raise ValueError
                 f=open(filename,"w")
                 horizon=0
                 actList=[]
@@ -1122,9 +3996,6 @@ class Model(object):
                         act=self.activities[a]
                         horizon=max(act.completion,horizon)
                 #print("planning horizon=",horizon)
-                if scale<=0:
-                        print("optseq write scale error")
-                        exit(0)
                 original_horizon=horizon
                 horizon=int(horizon/scale)+1
                 actList.sort()
@@ -1205,6 +4076,459 @@ class Model(object):
                                 #f.write(rstring+"\n")
                 f.close()
 
+        def save(self,filename="optseq_model.bin"):
+                """
+                Saves the model (activities, modes, resources, states, temporal constraints and parameters) to a compact binary file.
+
+                The names are kept once in a string table and the intervals, requirements, terms and temporal constraints
+                are kept in integer arrays ("inf" is written as -1), so that load reads the file without parsing the records one by one.
+                Results of the solver and parameters that are not numbers, strings or None (e.g. Monitor) are not saved.
+
+                    - Arguments:
+                        - filename(optional): File name. Default="optseq_model.bin."
+
+                    - Example usage:
+
+                    >>> model.save("plan.bin")
+                """
+                strings=[]
+                table={}
+                def name(x):
+                        if x not in table:
+                                table[x]=len(strings)
+                                strings.append(x)
+                        return table[x]
+                def number(x):
+                        if x=="inf":
+                                return -1
+                        return int(x)
+                def items(profile):
+                        if isinstance(profile,IntervalProfile):
+                                return profile.items() #kept in time order
+                        return sorted(profile.items(),key=lambda item:_order(item[0]))
+                def intervals(profile,out):
+                        for ((s,t),amount) in items(profile):
+                                out.extend((number(s),number(t),number(amount)))
+                        return len(out)
+
+                self._index()
+                modes=[]
+                modeIndex={}
+                for a in self.act:
+                        for m in a.modes:
+                                if id(m) not in modeIndex:
+                                        modeIndex[id(m)]=len(modes)
+                                        modes.append(m)
+                for r in self.res:
+                        for (coeff,act,m) in r.terms:
+                                if id(m) not in modeIndex:
+                                        modeIndex[id(m)]=len(modes)
+                                        modes.append(m)
+                actIndex=dict((id(a),i) for (i,a) in enumerate(self.act))
+                q=lambda:array.array("q")
+                data=dict((key,q()) for key in ("res","cap","terms","states","values","modes","req","breaks","parallel","modeStates",
+                                                 "acts","actModes","temps","meta"))
+                rtypes={None:0,"break":1,"max":2}
+                for r in self.res:
+                        intervals(r.capacity,data["cap"])
+                        for (coeff,act,m) in r.terms:
+                                data["terms"].extend((int(coeff),actIndex[id(act)],modeIndex[id(m)]))
+                        data["res"].extend((name(r.name),int(r.rhs),name(r.direction),number(r.weight),len(data["cap"]),len(data["terms"])))
+                for st in self.state:
+                        for t in st.Value:
+                                data["values"].extend((int(t),int(st.Value[t])))
+                        data["states"].extend((name(st.name),len(data["values"])))
+                for m in modes:
+                        for ((r,rtype),profile) in m.requirement.items():
+                                for ((s,t),amount) in items(profile):
+                                        data["req"].extend((name(r),rtypes[rtype],number(s),number(t),number(amount)))
+                        intervals(m.breakable,data["breaks"])
+                        intervals(m.parallel,data["parallel"])
+                        for st in m.state:
+                                data["modeStates"].extend((name(st),)+tuple(int(v) for v in m.state[st]))
+                        data["modes"].extend((name(m.name),int(m.duration),len(data["req"]),len(data["breaks"]),len(data["parallel"]),len(data["modeStates"])))
+                for a in self.act:
+                        data["actModes"].extend(modeIndex[id(m)] for m in a.modes)
+                        data["acts"].extend((name(a.name),number(a.duedate),int(a.weight),int(bool(a.autoselect)),len(data["actModes"])))
+                ends={"source":-1,"sink":-2}
+                horizon=-1
+                for (k,t) in enumerate(self.tempo):
+                        if t is getattr(self,"_horizon",None):
+                                horizon=k
+                        pred=ends[t.pred] if isinstance(t.pred,str) else actIndex[id(t.pred)]
+                        succ=ends[t.succ] if isinstance(t.succ,str) else actIndex[id(t.succ)]
+                        data["temps"].extend((pred,succ,name(t.type),int(t.delay)))
+                data["meta"].extend((1,horizon))
+                params=[]
+                for (key,value) in sorted(vars(self.Params).items()):
+                        if value is None or isinstance(value,(bool,int,float,str)):
+                                params.append("{0}={1!r}".format(key,value))
+                _saveSections(filename,"OPTSEQ",{"strings":"\0".join(strings),"params":"\n".join(params),"name":str(self.name)},data)
+
+        def load(self,filename="optseq_model.bin"):
+                """
+                Loads a model saved by save into this (empty) model.
+
+                The file is read through a memory map and the objects are made without calling the constructors,
+                as in addActivities; the duedates, weights and modes of the activities are made when they are first used
+                (e.g. by update), so that a large model is opened at once.
+
+                    - Arguments:
+                        - filename(optional): File name. Default="optseq_model.bin."
+
+                    - Example usage:
+
+                    >>> model=Model()
+                    >>> model.load("plan.bin")
+                """
+                import ast
+                if self.act or self.res or self.state or self.tempo:
+                        print("a model can be loaded only into an empty model")
+                        raise TypeError
+                data=_loadSections(filename,"OPTSEQ")
+                strings=data["strings"].split("\0")
+                loader=_Loader(data,strings)
+                new=object.__new__
+                put=object.__setattr__
+
+                self.name=data["name"]
+                for line in data["params"].split("\n"):
+                        if line:
+                                (key,value)=line.split("=",1)
+                                setattr(self.Params,key,ast.literal_eval(value))
+                with _noGC():
+                        acts=data["acts"]
+                        for k in range(len(acts)//5):
+                                act=new(_LoadedActivity)
+                                put(act,"name",strings[acts[5*k]])
+                                put(act,"_start",0)
+                                put(act,"_completion",0)
+                                put(act,"_execute",{})
+                                put(act,"_selected",None)
+                                put(act,"_row",None)
+                                put(act,"_stamp",next(_stamps))
+                                put(act,"_source",loader)
+                                self.act.append(act)
+                        loader.loaded=list(self.act)
+                        self.activities=dict((act.name,act) for act in self.act)
+                        res=data["res"]
+                        (cap,terms)=(data["cap"],data["terms"])
+                        (c0,t0)=(0,0)
+                        for k in range(0,len(res),6):
+                                r=new(Resource)
+                                r.__dict__.update(name=strings[res[k]],capacity=loader.profile(cap,c0,res[k+4],3,True),rhs=res[k+1],
+                                                  direction=strings[res[k+2]],weight="inf" if res[k+3]==-1 else res[k+3],
+                                                  terms=[(terms[i],self.act[terms[i+1]],loader.mode(terms[i+2])) for i in range(t0,res[k+5],3)],
+                                                  _stamp=next(_stamps))
+                                (c0,t0)=(res[k+4],res[k+5])
+                                self.res.append(r)
+                        self.resources=dict((r.name,r) for r in self.res)
+                        states=data["states"]
+                        values=data["values"]
+                        begin=0
+                        for k in range(0,len(states),2):
+                                st=new(State)
+                                st.__dict__.update(name=strings[states[k]],Value=dict((values[i],values[i+1]) for i in range(begin,states[k+1],2)),
+                                                   _stamp=next(_stamps))
+                                begin=states[k+1]
+                                self.state.append(st)
+                        self.states=dict((st.name,st) for st in self.state)
+                        ends=("sink","source")
+                        temps=data["temps"]
+                        for k in range(0,len(temps),4):
+                                (pred,succ)=(temps[k],temps[k+1])
+                                t=new(Temporal)
+                                put(t,"pred",ends[pred+2] if pred<0 else self.act[pred])
+                                put(t,"succ",ends[succ+2] if succ<0 else self.act[succ])
+                                put(t,"type",strings[temps[k+2]])
+                                put(t,"delay",temps[k+3])
+                                put(t,"_stamp",next(_stamps))
+                                self.tempo.append(t)
+                                pair=(ends[pred+2] if pred<0 else strings[acts[5*pred]],ends[succ+2] if succ<0 else strings[acts[5*succ]])
+                                self.temporals.setdefault(pair,[]).append(t)
+                        self._ntempo=len(self.tempo)
+                        horizon=data["meta"][1]
+                        if horizon>=0:
+                                self._horizon=self.tempo[horizon]
+
+def solveMany(models,workers=None,workdir=None,keep=False):
+        """
+        Optimize several models at once.
+
+        Each model is solved by its own optseq process in its own scratch directory,
+        so that the input, output and activity list files of different solves never overwrite each other.
+        The solver processes are driven from a thread pool; results are written back onto
+        Activity.start/completion/execute and Resource.residual of each model as in Model.optimize.
+
+            - Arguments:
+                - models: List of model objects.
+                - workers(optional): Maximum number of solver processes running at the same time.
+                  Default=None (number of processors).
+                - workdir(optional): Directory in which the scratch directories are created. Default=None (system temporary directory).
+                - keep(optional): True if the scratch directories are kept after the solves. Default=False.
+
+            - Return value: List of the Status of the models.
+
+            - Example usage:
+
+            >>> solveMany([m1,m2,m3],workers=8)
+        """
+        import shutil
+        import tempfile
+        from concurrent.futures import ThreadPoolExecutor
+
+        if workers==None:
+                workers=os.cpu_count() or 1
+
+        def solve(model):
+                scratch=tempfile.mkdtemp(prefix="optseq_",dir=workdir)
+                try:
+                        #the initial activity list is read from the scratch directory
+                        if model.Params.Initial and os.path.exists("optseq_best_act_data.txt"):
+                                shutil.copy("optseq_best_act_data.txt",scratch)
+                        model.optimize(workdir=scratch)
+                finally:
+                        if not keep:
+                                shutil.rmtree(scratch,ignore_errors=True)
+                return model.Status
+
+        pool=ThreadPoolExecutor(max_workers=workers)
+        try:
+                return list(pool.map(solve,models))
+        finally:
+                pool.shutdown()
+
+class Job(object):
+        """
+        Solve job of a Scheduler (made by Scheduler.submit).
+
+            - Attributes:
+                - priority: Priority of the job (smaller value first).
+                - cpus: Set of the processors the solver processes of the job run on (None for all processors).
+                - status: "queued," "running," "done," "failed" or "cancelled."
+                - submitted, started, finished: Times (time.time()) when the job was submitted, started and finished.
+        """
+        def __init__(self,fn,args,kwargs,priority=0,cpus=None):
+                import threading
+                self.fn=fn
+                self.args=args
+                self.kwargs=kwargs
+                self.priority=priority
+                self.cpus=cpus
+                self.status="queued"
+                self.submitted=time.time()
+                self.started=None
+                self.finished=None
+                self._value=None
+                self._error=None
+                self._pipes=[]
+                self._lock=threading.Lock()
+                self._done=threading.Event()
+                self._scheduler=None
+
+        def _attach(self,pipe):
+                """
+                registers a solver process started by the job, so that cancel() can kill it, and pins it to the processors
+                """
+                with self._lock:
+                        self._pipes.append(pipe)
+                        cancelled=self.status=="cancelled"
+                if self.cpus!=None and hasattr(os,"sched_setaffinity"):
+                        try:
+                                os.sched_setaffinity(pipe.pid,self.cpus)
+                        except OSError:
+                                pass
+                if cancelled:
+                        pipe.kill()
+
+        def cancel(self):
+                """
+                Cancels the job; a queued job is not started and the solver processes of a running job are killed.
+
+                    - Return value: True if the job was queued or running.
+                """
+                with self._lock:
+                        if self.status not in ("queued","running"):
+                                return False
+                        running=self.status=="running"
+                        self.status="cancelled"
+                        pipes=list(self._pipes)
+                for pipe in pipes:
+                        if pipe.poll()==None:
+                                pipe.kill()
+                if not running:
+                        self.finished=time.time()
+                        if self._scheduler!=None:
+                                self._scheduler._retire(self)
+                        self._done.set()
+                return True
+
+        def done(self):
+                return self._done.is_set()
+
+        def result(self,timeout=None):
+                """
+                Waits for the job and returns the return value of the function (None if the job was cancelled).
+                An exception raised by the function is raised again.
+                """
+                self._done.wait(timeout)
+                if self._error!=None:
+                        raise self._error
+                return self._value
+
+        def wait(self):
+                """
+                Seconds the job waited in the queue (until now if it is still queued).
+                """
+                return (self.started or self.finished or time.time())-self.submitted
+
+class Scheduler(object):
+        """
+        Job scheduler that limits the number of solves running at the same time.
+
+        Jobs are started in the order of their priorities (smaller value first; first submitted first for the same priority)
+        on at most "workers" threads; the others wait in the queue instead of starting more solver processes.
+        Any function can be submitted, e.g., optseq.Model.optimize or scop.Model.optimize;
+        the solver processes started by the function are registered with its job (through the thread running it),
+        so that they are pinned to the processors of the job and killed when the job is cancelled.
+
+            - Arguments:
+                - workers(optional): Maximum number of jobs running at the same time. Default=None (number of processors).
+
+            - Example usage:
+
+            >>> s=Scheduler(workers=4)
+            >>> job=s.submit(model.optimize,priority=1,cpus={0,1})
+            >>> job.result()
+            >>> s.metrics()
+        """
+        def __init__(self,workers=None):
+                import threading
+                if workers==None:
+                        workers=os.cpu_count() or 1
+                self.workers=workers
+                self._queue=[] #heap of (priority,sequence number,job)
+                self._count=itertools.count()
+                self._cond=threading.Condition()
+                self._threads=[]
+                self._closed=False
+                self._jobs=set() #queued and running jobs; finished jobs are only counted
+                self._counts=dict((status,0) for status in ("done","failed","cancelled"))
+                self._waits=[0.0,0,0.0] #sum, number and maximum of the waiting times of the started jobs
+                self._runs=[0.0,0] #sum and number of the running times of the finished jobs
+
+        def submit(self,fn,*args,priority=0,cpus=None,**kwargs):
+                """
+                Submits a job that calls fn(*args,**kwargs).
+
+                    - Arguments:
+                        - fn: Function called by the job, e.g., model.optimize.
+                        - priority(optional): Priority of the job (smaller value first). Default=0.
+                        - cpus(optional): Set of the processors the solver processes of the job run on (Linux only). Default=None (all).
+
+                    - Return value: Job object.
+                """
+                import heapq
+                import threading
+                job=Job(fn,args,kwargs,priority,cpus)
+                job._scheduler=self
+                with self._cond:
+                        if self._closed:
+                                print("the scheduler is shut down")
+                                raise RuntimeError
+                        heapq.heappush(self._queue,(priority,next(self._count),job))
+                        self._jobs.add(job)
+                        if len(self._threads)<self.workers:
+                                t=threading.Thread(target=self._work)
+                                t.daemon=True
+                                self._threads.append(t)
+                                t.start()
+                        self._cond.notify()
+                return job
+
+        def _work(self):
+                import heapq
+                import threading
+                while True:
+                        with self._cond:
+                                while not self._queue and not self._closed:
+                                        self._cond.wait()
+                                if not self._queue:
+                                        return
+                                (priority,number,job)=heapq.heappop(self._queue)
+                        with job._lock:
+                                if job.status!="queued": #cancelled in the queue
+                                        continue
+                                job.status="running"
+                                job.started=time.time()
+                        with self._cond:
+                                wait=job.started-job.submitted
+                                self._waits[0]+=wait
+                                self._waits[1]+=1
+                                self._waits[2]=max(self._waits[2],wait)
+                        thread=threading.current_thread()
+                        thread.job=job #solver processes started by the job are attached to it
+                        try:
+                                job._value=job.fn(*job.args,**job.kwargs)
+                        except BaseException as e:
+                                job._error=e
+                        finally:
+                                thread.job=None
+                        with job._lock:
+                                if job.status=="running":
+                                        job.status="failed" if job._error!=None else "done"
+                                job.finished=time.time()
+                        self._retire(job)
+                        job._done.set()
+
+        def _retire(self,job):
+                """
+                removes a finished or cancelled job from the scheduler and adds it to the counts of metrics()
+                """
+                with self._cond:
+                        if job not in self._jobs:
+                                return
+                        self._jobs.discard(job)
+                        self._counts[job.status]+=1
+                        if job.started!=None:
+                                self._runs[0]+=job.finished-job.started
+                                self._runs[1]+=1
+                job.fn=job.args=job.kwargs=None
+
+        def metrics(self):
+                """
+                Returns the numbers of the jobs by status and the queue waiting times.
+
+                    - Return value: Dictionary with the keys "queued," "running," "done," "failed," "cancelled,"
+                      "wait_mean" and "wait_max" (seconds the started jobs waited in the queue) and "run_mean" (seconds the finished jobs ran).
+                """
+                with self._cond:
+                        info=dict((status,0) for status in ("queued","running"))
+                        info.update(self._counts)
+                        for job in self._jobs:
+                                info[job.status]+=1
+                        (waitSum,waitNumber,waitMax)=self._waits
+                        (runSum,runNumber)=self._runs
+                info["wait_mean"]=waitSum/waitNumber if waitNumber else 0.0
+                info["wait_max"]=waitMax
+                info["run_mean"]=runSum/runNumber if runNumber else 0.0
+                return info
+
+        def shutdown(self,wait=True,cancel=False):
+                """
+                Stops accepting jobs; queued jobs are still run unless cancel is True (running jobs are then cancelled too).
+                """
+                with self._cond:
+                        self._closed=True
+                        self._cond.notify_all()
+                        jobs=list(self._jobs)
+                if cancel:
+                        for job in jobs:
+                                job.cancel()
+                if wait:
+                        for t in self._threads:
+                                t.join()
+
 def test1():
         """
         Full test using a job shopn instance
@@ -7,8 +7,12 @@
 SCOP = './scop.exe'
 #SCOP = './bin/scop'
 import sys
+import os
+import array
 import copy
 import platform
+import time
+import hashlib
 
 if int(sys.version_info[0])<=2:
     import string
@@ -16,6 +20,173 @@ if int(sys.version_info[0])<=2:
 else:
     _trans = str.maketrans("-+*/'(){} ^=<>$&#?","_"*18)
 
+def _popen(cmd):
+    """
+    start the solver process; on Mac and Linux the solver is started without a shell
+    so that killing the process stops the solver itself.
+    If the process is started by a job of a scheduler (e.g. optseq.Scheduler), it is attached to the job.
+    """
+    import subprocess
+    import threading
+    if platform.system() == "Windows":
+        pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE, shell=True)
+    else:
+        pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE)
+    job = getattr(threading.current_thread(),"job",None)
+    if job!=None:
+        job._attach(pipe)
+    return pipe
+
+async def _popenAsync(cmd):
+    """
+    start the solver process as an asyncio subprocess
+    """
+    import asyncio
+    import subprocess
+    if platform.system() == "Windows":
+        return await asyncio.create_subprocess_shell(subprocess.list2cmdline(cmd),
+            stdout=asyncio.subprocess.PIPE, stdin=asyncio.subprocess.PIPE)
+    return await asyncio.create_subprocess_exec(*cmd,
+        stdout=asyncio.subprocess.PIPE, stdin=asyncio.subprocess.PIPE)
+
+def _cacheGet(directory,key,maxAge=None):
+    """
+    return the solver output stored in the solve cache under the key (None if it is not stored or is too old)
+    """
+    path=os.path.join(directory,key+".out")
+    try:
+        if maxAge!=None and time.time()-os.path.getmtime(path)>maxAge:
+            os.remove(path)
+            return None
+        with open(path,"rb") as f:
+            out=f.read()
+        os.utime(path,None) #recently used entries are evicted last
+        return out
+    except (IOError,OSError):
+        return None
+
+def _cachePut(directory,key,out,maxSize=None,maxAge=None):
+    """
+    store the solver output in the solve cache and evict the entries that are too old
+    or least recently used ones until the cache is not larger than maxSize bytes
+    """
+    import tempfile
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd,tmp=tempfile.mkstemp(dir=directory,suffix=".tmp")
+    with os.fdopen(fd,"wb") as f:
+        f.write(out)
+    os.replace(tmp,os.path.join(directory,key+".out"))
+    entries=[]
+    for name in os.listdir(directory):
+        if name.endswith(".out"):
+            path=os.path.join(directory,name)
+            try:
+                entries.append((os.path.getmtime(path),os.path.getsize(path),path))
+            except OSError:
+                pass
+    entries.sort()
+    total=sum(size for (mtime,size,path) in entries)
+    now=time.time()
+    for (mtime,size,path) in entries:
+        if (maxAge!=None and now-mtime>maxAge) or (maxSize!=None and total>maxSize):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total-=size
+
+def _stop(pipe, grace):
+    """
+    interrupt the solver (and kill it if it is still running after the grace time) and return its output
+    """
+    import signal
+    import subprocess
+    if platform.system() == "Windows":
+        pipe.terminate()
+    else:
+        pipe.send_signal(signal.SIGINT) #let the solver report its best solution
+    try:
+        return pipe.communicate(timeout=grace)
+    except subprocess.TimeoutExpired:
+        pipe.kill()
+        return pipe.communicate()
+
+def _typecode(values):
+    """
+    return the narrowest array type code that holds the integers
+    """
+    low,high=(min(values),max(values)) if len(values) else (0,0)
+    for code in ("b","h","i"):
+        bound=1<<(8*array.array(code).itemsize-1)
+        if -bound<=low and high<bound:
+            return code
+    return "q"
+
+def _saveSections(filename,magic,texts,arrays):
+    """
+    write text sections (dictionary that maps names to strings) and integer sections
+    (dictionary that maps names to arrays of integers) to a binary file;
+    each integer section is written in the narrowest type code that holds its values, and
+    a header line gives the names, type codes ("t" for text) and sizes of the sections, which start at multiples of 8 bytes
+    """
+    sections=[(key,"t",texts[key].encode("utf-8")) for key in sorted(texts)]
+    for key in sorted(arrays):
+        code=_typecode(arrays[key])
+        sections.append((key,code,array.array(code,arrays[key]).tobytes()))
+    index=" ".join("{0}:{1}:{2}".format(key,code,len(data)) for (key,code,data) in sections)
+    header="{0} {1} {2}\n".format(magic,sys.byteorder,index).encode("utf-8")
+    with open(filename,"wb") as f:
+        f.write(header)
+        f.write(b"\0"*(-len(header)%8))
+        for (key,code,data) in sections:
+            f.write(data)
+            f.write(b"\0"*(-len(data)%8))
+
+def _loadSections(filename,magic):
+    """
+    read a file written by _saveSections through a memory map;
+    return the dictionary that maps section names to strings or arrays of integers
+    """
+    import mmap
+    with open(filename,"rb") as f:
+        mm=mmap.mmap(f.fileno(),0,access=mmap.ACCESS_READ)
+    try:
+        end=mm.find(b"\n")
+        words=mm[:end].decode("utf-8").split()
+        if end<0 or len(words)<2 or words[0]!=magic:
+            raise TypeError("{0} is not a file saved by {1}".format(filename,magic))
+        swap=words[1]!=sys.byteorder
+        pos=end+1
+        pos+=-pos%8
+        sections={}
+        for word in words[2:]:
+            key,kind,size=word.split(":")
+            size=int(size)
+            if kind=="t":
+                sections[key]=mm[pos:pos+size].decode("utf-8")
+            else:
+                data=array.array(kind)
+                with memoryview(mm) as view:
+                    with view[pos:pos+size] as chunk:
+                        data.frombytes(chunk)
+                if swap:
+                    data.byteswap()
+                sections[key]=data
+            pos+=size+(-size%8)
+    finally:
+        mm.close()
+    return sections
+
+def _number(text):
+    """
+    return the number written as text by str (an integer if it is written as an integer)
+    """
+    try:
+        return int(text)
+    except ValueError:
+        return float(text)
+
 class Variable():
     """
     SCOP variable class. Variables are associated with a particular model.
@@ -49,6 +220,12 @@ class Parameters():
     Target: Sets the target penalty value;
             optimization will terminate if the solver determines that the optimum penalty value
             for the model is worse than the specified "Target." Non-negative integer. Default=0.
+    Cache: Directory of the solve cache. If it is set, the output of the solver is stored there and reused
+            when the same model is solved with the same parameters again. Default=None (no cache).
+    CacheSize: Largest total size (in bytes) of the solve cache; least recently used outputs are removed. Default=256MB.
+    CacheAge: Largest age (in seconds) of the outputs in the solve cache. Default=None (no limit).
+    Monitor: Function called as Monitor(model.stats) after each optimize,
+            or a logger (an object with an info method, e.g., logging.getLogger("scop")). Default=None.
     """
     def __init__(self):
         self.TimeLimit=600
@@ -56,6 +233,10 @@ class Parameters():
         self.RandomSeed=1
         self.Target =0
         self.Initial=False
+        self.Cache=None
+        self.CacheSize=1<<28
+        self.CacheAge=None
+        self.Monitor=None
 
 class Model(object):
     """
@@ -66,6 +247,9 @@ class Model(object):
     variables: Set of variable objects in the model.
     Params:  Object including all the parameters of the model.
     varDict: Dictionary that maps variable names to the variable object.
+    stats: Dictionary of the wall times (in seconds) of the phases of the last optimize
+           ("update", "write", "start", "solve", "parse" and "total"), the sizes (in bytes) of the solver input and output
+           ("inputBytes" and "outputBytes") and the size of the model ("variables", "values", "constraints" and "terms").
 
     """
     def __init__(self,name=""):
@@ -75,6 +259,8 @@ class Model(object):
         self.Params=Parameters()
         self.varDict={}       # dictionary that maps variable names to their domains
         self.Status = 10      # unsolved
+        self.stats = {}       # times and sizes of the last optimize
+        self._last = None
     def __str__(self):
         """
             return the information of the problem
@@ -187,25 +373,22 @@ class Model(object):
 ##        for c in cons:
 ##            self.addConstraint(c)
 
-    def optimize(self):
+    def _prepare(self):
         """
-        optimize ()
-        Optimize the model using scop.exe in the same directory.
-
-        Example usage:
-        model.optimize()
+        returns the scop input of the model and writes it to scop_input.txt
         """
-
         time=self.Params.TimeLimit
         seed=self.Params.RandomSeed
         LOG=self.Params.OutputFlag
         self.target=self.Params.Target
 
         f = self.update()
+        self._mark("update")
 
         f3 = open("scop_input.txt","w")
         f3.write(f)
         f3.close()
+        self._mark("write")
 
         if LOG>=100:
             print("scop input: \n")
@@ -216,30 +399,213 @@ class Model(object):
             print("  TimeLimit =%s second \n"%time)
             print("  RandomSeed= %s \n"%seed)
             print("  OutputFlag= %s \n"%LOG)
-        import subprocess
+        return f
+
+    def _startStats(self):
+        """
+        start recording the times and sizes of an optimize in model.stats
+        """
+        self.stats = {"update":0.0,"write":0.0,"start":0.0,"solve":0.0,"parse":0.0,"inputBytes":0,"outputBytes":0}
+        self._begin = self._last = time.time()
+
+    def _mark(self,phase):
+        """
+        add the time since the last mark to the phase (if optimize is recording the times)
+        """
+        if self._last==None:
+            return
+        now = time.time()
+        self.stats[phase] = self.stats.get(phase,0.0)+now-self._last
+        self._last = now
+
+    def _endStats(self):
+        """
+        complete model.stats with the total time and the size of the model and pass it to Params.Monitor
+        """
+        stats = self.stats
+        stats["total"] = time.time()-self._begin
+        stats["Status"] = self.Status
+        self._last = None
+        stats["variables"] = len(self.variables)
+        stats["values"] = sum(len(var.domain) for var in self.variables)
+        stats["constraints"] = len(self.constraints)
+        stats["terms"] = sum(len(getattr(con,"terms",getattr(con,"variables",[]))) for con in self.constraints)
+        monitor = self.Params.Monitor
+        if monitor!=None:
+            if hasattr(monitor,"info"):
+                monitor.info("scop %s",stats)
+            else:
+                monitor(stats)
+
+    def _command(self,timeLimit=None):
+        """
+        returns the argument list of the scop call (with the time limit of the solver if it is given)
+        """
+        if timeLimit==None:
+            timeLimit=self.Params.TimeLimit
         if platform.system() == "Windows":
-            cmd = "scop -time "+str(time)+" -seed "+str(seed) #solver call
+            cmd = ["scop"] #solver call
         else:
-            cmd = "./scop -time "+str(time)+" -seed "+str(seed) #solver call
-                
+            cmd = ["./scop"] #solver call
+        cmd += ["-time", str(timeLimit), "-seed", str(self.Params.RandomSeed)]
 
         if self.Params.Initial:
-            cmd += " -initsolfile scop_best_data.txt"
+            cmd += ["-initsolfile", "scop_best_data.txt"]
+        return cmd
+
+    def _cacheKey(self,f,cmd):
+        """
+        returns the key of the solve cache for the model text and the solver arguments (None if the cache is not used);
+        the initial solution file is replaced with its contents
+        """
+        if self.Params.Cache==None:
+            return None
+        args=list(cmd[1:])
+        parts=[f]
+        if "-initsolfile" in args:
+            i=args.index("-initsolfile")
+            try:
+                with open(args[i+1]) as g:
+                    parts.append(g.read())
+            except (IOError,OSError):
+                parts.append("")
+            del args[i:i+2]
+        parts+=args
+        return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+    def optimize(self,deadline=None):
+        """
+        optimize (deadline=None)
+        Optimize the model using scop.exe in the same directory.
+
+        deadline (optional): Seconds within which optimize returns, including writing the model,
+        starting the solver and reading the results. Default=None (no deadline).
+        The time spent to write the model is measured and the same time is kept for reading the results;
+        the time limit of the solver is set to the time left (if it is shorter than Params.TimeLimit),
+        and the solver is interrupted and then killed when the time is up.
+        In this case Status is set to 9 and the best solution reported so far (if any) is returned.
 
+        Example usage:
+        model.optimize()
+        model.optimize(deadline=30)
+        """
+        self._startStats()
         try:
-            if platform.system() == "Windows":
-                pipe = subprocess.Popen(cmd.split(), stdout=subprocess.PIPE, stdin=subprocess.PIPE, shell=True)
-            else:
-                pipe = subprocess.Popen(cmd, stdout=subprocess.PIPE, stdin=subprocess.PIPE, shell=True)
+            return self._optimize(deadline)
+        finally:
+            self._endStats()
+
+    def _optimize(self,deadline=None):
+        """
+        optimize the model (see optimize), marking the phases in model.stats
+        """
+        begin = time.time()
+        f = self._prepare()
+        data = f.encode()
+        self.stats["inputBytes"] = len(data)
+        stopAt = None
+        grace = 1
+        if deadline==None:
+            cmd = self._command()
+        else:
+            now = time.time()
+            reserve = max(now-begin,0.05) #reading the results takes about as long as writing the model
+            grace = min(grace,max(deadline*0.05,0.05))
+            stopAt = begin+deadline-reserve-grace
+            if stopAt<=now:
+                print("no time is left for the solver before the deadline")
+                self.Status = 9 #deadline reached
+                return None, None
+            cmd = self._command(max(1,min(self.Params.TimeLimit,int(stopAt-now))))
+        key = self._cacheKey(f,cmd)
+        if key!=None:
+            out = _cacheGet(self.Params.Cache,key,self.Params.CacheAge)
+            if out!=None:
+                self.stats["outputBytes"] = len(out)
+                self.stats["cached"] = True
+                self._mark("solve")
+                result = self._parse(out, None, 0)
+                self._mark("parse")
+                return result
+        try:
+            pipe = _popen(cmd)
+            self._mark("start")
             print("\n ================ Now solving the problem ================ \n")
-            #pipe = subprocess.Popen(cmd.split(), stdout=subprocess.PIPE,stdin=subprocess.PIPE)
         except OSError:
-            print("error: could not execute command '%s'" % cmd)
+            print("error: could not execute command '%s'" % " ".join(cmd))
             print("please check that the solver is in the path")
             self.Status = 7  #execution falied
             return None, None
 
-        out, err = pipe.communicate(f.encode()) #get the result
+        if stopAt==None:
+            out, err = pipe.communicate(data) #get the result
+        else:
+            import subprocess
+            try:
+                out, err = pipe.communicate(data, timeout=max(stopAt-time.time(),0))
+            except subprocess.TimeoutExpired:
+                out, err = _stop(pipe, grace)
+                self.stats["outputBytes"] = len(out)
+                self._mark("solve")
+                print("the solver was stopped by the deadline")
+                if out.find(b"[best solution]")>=0 and out.find(b"[Violated constraints]")>=0:
+                    result = self._parse(out, err, 0)
+                    self._mark("parse")
+                else:
+                    result = (None, None)
+                self.Status = 9 #deadline reached
+                return result
+        self.stats["outputBytes"] = len(out)
+        self._mark("solve")
+        if key!=None and pipe.returncode==0:
+            _cachePut(self.Params.Cache,key,out,self.Params.CacheSize,self.Params.CacheAge)
+        result = self._parse(out, err, pipe.returncode)
+        self._mark("parse")
+        return result
+
+    async def optimizeAsync(self):
+        """
+        optimizeAsync ()
+        Optimize the model as optimize() does, using an asyncio subprocess.
+        The event loop is not blocked while scop is running, so that many models can be solved at once.
+        If the task is cancelled, the solver process is killed.
+
+        Example usage:
+        sol, violated = await model.optimizeAsync()
+        """
+        import asyncio
+        f = self._prepare()
+        cmd = self._command()
+        key = self._cacheKey(f,cmd)
+        if key!=None:
+            out = _cacheGet(self.Params.Cache,key,self.Params.CacheAge)
+            if out!=None:
+                return self._parse(out, None, 0)
+        try:
+            pipe = await _popenAsync(cmd)
+            print("\n ================ Now solving the problem ================ \n")
+        except OSError:
+            print("error: could not execute command '%s'" % " ".join(cmd))
+            print("please check that the solver is in the path")
+            self.Status = 7  #execution falied
+            return None, None
+
+        try:
+            out, err = await pipe.communicate(f.encode()) #get the result
+        except asyncio.CancelledError:
+            if pipe.returncode is None:
+                pipe.kill()
+                await pipe.wait()
+            raise
+        if key!=None and pipe.returncode==0:
+            _cachePut(self.Params.Cache,key,out,self.Params.CacheSize,self.Params.CacheAge)
+        return self._parse(out, err, pipe.returncode)
+
+    def _parse(self, out, err, returncode):
+        """
+        reads the solver output and returns the solution and the violated constraints
+        """
+        LOG=self.Params.OutputFlag
         if err!=None:
             if int(sys.version_info[0])>=3:
                 err = str(err, encoding='utf-8')
@@ -254,14 +620,14 @@ class Model(object):
             print (out, '\n')
         #print ("out=",out)
         #print ("err=",err)
-        #print("Return Code=",pipe.returncode)
+        #print("Return Code=",returncode)
 
         f = open("scop_out.txt","w")
         f.write(out)
         f.close()
 
         #check the return code
-        self.Status = pipe.returncode
+        self.Status = returncode
         if self.Status !=0: #if the return code is not "optimal", then return
             print("Status=",self.Status)
             print("Output=",out)
@@ -344,6 +710,140 @@ class Model(object):
         return sol,violated
 
 
+    def save(self,filename="scop_model.bin"):
+        """
+        save ( filename="scop_model.bin" )
+        Save the variables, the constraints and the parameters of the model to a compact binary file.
+
+        The names and values are kept once in a string table and the domains and terms are kept in integer arrays,
+        so that load reads the file without parsing the constraints one by one.
+        The right-hand sides, and the coefficients of a constraint that are not all integers (e.g. floats),
+        are kept as strings in the table and are restored exactly.
+        The solution and the parameters that are not numbers, strings or None (e.g. Monitor) are not saved.
+
+        Arguments:
+        filename: File name. Default="scop_model.bin".
+
+        Example usage:
+        model.save("assignment.bin")
+        """
+        strings=[]
+        table={}
+        def name(x):
+            if x not in table:
+                table[x]=len(strings)
+                strings.append(x)
+            return table[x]
+        data=dict((key,array.array("q")) for key in ("variables","domains","constraints","linear","quadratic","alldiff"))
+        index={}
+        for (i,var) in enumerate(self.variables):
+            index[id(var)]=i
+            data["domains"].extend(name(value) for value in var.domain)
+            data["variables"].extend((name(var.name),len(data["domains"])))
+        for con in self.constraints:
+            exact=1 #the coefficients are integers kept in the array
+            if isinstance(con,(Linear,Quadratic)) and not all(type(term[0]) is int for term in con.terms):
+                exact=0
+            coeff=(lambda c:c) if exact else (lambda c:name(str(c)))
+            if isinstance(con,Linear):
+                (kind,terms)=(0,data["linear"])
+                for (c,var,value) in con.terms:
+                    terms.extend((coeff(c),index[id(var)],name(value)))
+            elif isinstance(con,Quadratic):
+                (kind,terms)=(1,data["quadratic"])
+                for (c,var1,value1,var2,value2) in con.terms:
+                    terms.extend((coeff(c),index[id(var1)],name(value1),index[id(var2)],name(value2)))
+            else:
+                (kind,terms)=(2,data["alldiff"])
+                terms.extend(index[id(var)] for var in con.variables)
+            data["constraints"].extend((kind,name(con.name),name(con.weight),name(str(getattr(con,"rhs",0))),
+                                        name(getattr(con,"direction","")),len(terms),exact))
+        params=[]
+        for (key,value) in sorted(vars(self.Params).items()):
+            if value is None or isinstance(value,(bool,int,float,str)):
+                params.append("{0}={1!r}".format(key,value))
+        _saveSections(filename,"SCOP",{"strings":"\0".join(strings),"params":"\n".join(params),"name":str(self.name)},data)
+
+    def load(self,filename="scop_model.bin"):
+        """
+        load ( filename="scop_model.bin" )
+        Load a model saved by save into this (empty) model.
+        The file is read through a memory map and the objects are made without calling the constructors.
+
+        Arguments:
+        filename: File name. Default="scop_model.bin".
+
+        Example usage:
+        model=Model()
+        model.load("assignment.bin")
+        """
+        import ast
+        if self.variables or self.constraints:
+            raise TypeError("a model can be loaded only into an empty model")
+        data=_loadSections(filename,"SCOP")
+        self.name=data["name"]
+        for line in data["params"].split("\n"):
+            if line:
+                key,value=line.split("=",1)
+                setattr(self.Params,key,ast.literal_eval(value))
+        import gc
+        enabled=gc.isenabled()
+        gc.disable() #many objects are made at once
+        try:
+            self._load(data)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def _load(self,data):
+        """
+        make the variables and the constraints from the sections of a saved model
+        """
+        strings=data["strings"].split("\0")
+        string=strings.__getitem__
+        new=object.__new__
+        variables=data["variables"]
+        domains=data["domains"]
+        begin=0
+        for k in range(0,len(variables),2):
+            var=new(Variable)
+            var.name=strings[variables[k]]
+            var.domain=list(map(string,domains[begin:variables[k+1]]))
+            var.value=None
+            begin=variables[k+1]
+            self.variables.append(var)
+            self.varDict[var.name]=var
+        variable=self.variables.__getitem__
+        classes=(Linear,Quadratic,Alldiff)
+        terms=(data["linear"],data["quadratic"],data["alldiff"])
+        begins=[0,0,0]
+        constraints=data["constraints"]
+        for k in range(0,len(constraints),7):
+            kind=constraints[k]
+            con=new(classes[kind])
+            con.name=strings[constraints[k+1]]
+            con.weight=strings[constraints[k+2]]
+            con.lhs=0
+            (t,begin,end)=(terms[kind],begins[kind],constraints[k+5])
+            if kind==2:
+                con.variables=list(map(variable,t[begin:end]))
+                con._members=set(con.variables)
+            else:
+                con.rhs=_number(strings[constraints[k+3]])
+                con.direction=strings[constraints[k+4]]
+                width=3 if kind==0 else 5
+                coeffs=t[begin:end:width]
+                if not constraints[k+6]: #the coefficients are kept as strings
+                    coeffs=list(map(_number,map(string,coeffs)))
+                if kind==0:
+                    con.terms=list(zip(coeffs,map(variable,t[begin+1:end:3]),map(string,t[begin+2:end:3])))
+                else:
+                    con.terms=list(zip(coeffs,map(variable,t[begin+1:end:5]),map(string,t[begin+2:end:5]),
+                                       map(variable,t[begin+3:end:5]),map(string,t[begin+4:end:5])))
+            begins[kind]=end
+            self.constraints.append(con)
+
+
 class Constraint(object):
     """
      Constraint base class
@@ -382,13 +882,15 @@ class Alldiff(Constraint):
         #call the super class (Constraint) to initialize Alldiff
         super(Alldiff,self).__init__(name,weight)
         self.lhs=0
-        if varlist==None:
-            self.variables = set([])
-        else:
+        self.variables = [] #list (not set) so that the constraint is written in the same order every time
+        self._members = set() #set of the variables for checking duplicates
+        if varlist!=None:
             for var in varlist:
                 if not isinstance(var,Variable):
                     raise NameError("error: %r should be a subclass of Variable" % var)
-            self.variables = set(varlist)
+                if var not in self._members:
+                    self.variables.append(var)
+                    self._members.add(var)
 
     def __str__(self):
         """
@@ -416,10 +918,11 @@ class Alldiff(Constraint):
         if not isinstance(var,Variable):
             raise NameError("error: %r should be a subclass of Variable" % var)
 
-        if var in self.variables:
+        if var in self._members:
             print("duplicate variable name error when adding variable %r" % var)
             return False
-        self.variables.add(var)
+        self.variables.append(var)
+        self._members.add(var)
 
     def addVariables(self, varlist):
         """
@@ -436,7 +939,7 @@ class Alldiff(Constraint):
 
         """
         for var in varlist:
-            self.addvar(var)
+            self.addVariable(var)
 
     def feasible(self,allvars):
         """
@@ -0,0 +1,18 @@
+# fixtures of the tests of optseq.py, scop.py and benchmark.py
+# The solvers are replaced by the stub executables of benchmark.py (Mac and Linux).
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import benchmark
+
+
+@pytest.fixture
+def stubs(tmp_path, monkeypatch):
+    """runs the test in a temporary directory where the solvers are called as ./optseq and ./scop"""
+    benchmark.writeStubs(str(tmp_path))
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
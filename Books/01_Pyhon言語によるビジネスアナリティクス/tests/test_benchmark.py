@@ -0,0 +1,26 @@
+import csv
+import os
+
+import benchmark
+
+
+def test_run_solves_every_instance_with_the_stubs(tmp_path, capsys):
+    cwd = os.getcwd()
+    results = benchmark.run([20], memory=False, directory=str(tmp_path))
+    assert os.getcwd() == cwd
+    assert [(r["instance"], r["size"], r["Status"]) for r in results] == [(name, 20, 0) for name in benchmark.INSTANCES]
+    for r in results:
+        assert r["inputBytes"] > 0 and r["outputBytes"] > 0
+        assert all(r[phase] is None or r[phase] >= 0 for phase in benchmark.PHASES)
+    assert (tmp_path / "benchmark_chart.txt").exists()
+    assert capsys.readouterr().out.splitlines()[0].split()[:3] == ["instance", "size", "build"]
+
+
+def test_main_writes_the_results_to_csv(tmp_path, capsys):
+    filename = str(tmp_path / "results.csv")
+    directory = str(tmp_path / "bench" / "stubs")  # made by the benchmark
+    benchmark.main(["--sizes", "10", "30", "--instances", "setup", "--no-memory", "--dir", directory, "--csv", filename])
+    with open(filename) as f:
+        rows = list(csv.DictReader(f))
+    assert [(row["instance"], row["size"], row["Status"]) for row in rows] == [("setup", "10", "0"), ("setup", "30", "0")]
+    assert rows[0]["peak.build"] == ""
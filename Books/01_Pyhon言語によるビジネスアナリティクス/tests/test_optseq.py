@@ -0,0 +1,582 @@
+import asyncio
+import sys
+import threading
+import time
+
+import pytest
+
+import optseq
+
+
+def small():
+    """returns a model with a resource, a single-mode and a two-mode activity and a temporal constraint"""
+    model = optseq.Model()
+    worker = model.addResource("worker", capacity=2)
+    a = model.addActivity("a", duedate=5)
+    mode = optseq.Mode("m1", 3)
+    mode.addResource(worker, {(0, "inf"): 1})
+    a.addModes(mode)
+    b = model.addActivity("b")
+    b.addModes(optseq.Mode("b1", 2), optseq.Mode("b2", 4))
+    model.addTemporal(a, b)
+    model.Params.Echo = False
+    return model
+
+
+def test_mode_methods_mark_the_mode_changed():
+    model = small()
+    mode = model.act[0].modes[0]
+    worker = model.res[0]
+    model.update()
+    mode.addResource(worker, {(2, 3): 2})
+    assert " worker interval 2 3 requirement 2 " in model.update()
+    mode.addBreak(0, 1)
+    assert " break interval 0 1 " in model.update()
+    mode.addParallel(1, 1, 2)
+    assert " parallel interval 1 1 max 2 " in model.update()
+    worker.addCapacity(5, 8, 1)
+    assert " interval 5 8 capacity 1 " in model.update()
+
+
+def test_changed_mode_is_solved(stubs):
+    model = small()
+    model.optimize()
+    mode = model.act[0].modes[0]
+    mode.addBreak(0, 1)
+    model.optimize()
+    assert " break interval 0 1 " in (stubs / "optseq_input.txt").read_text()
+
+
+def test_profile_changed_in_place_after_update():
+    model = small()
+    mode = model.act[0].modes[0]
+    model.update()
+    mode.requirement[("worker", None)][(2, 3)] = 2
+    assert " worker interval 2 3 requirement 2 " in model.update()
+    mode.breakable = optseq.IntervalProfile(merge=False)
+    model.update()
+    mode.breakable[(0, 1)] = "inf"
+    assert " break interval 0 1 " in model.update()
+    mode.requirement[("worker", "max")] = optseq.IntervalProfile({(0, 2): 1})
+    assert " worker max interval 0 2 requirement 1 " in model.update()
+    model.res[0].capacity[(5, 8)] = 1
+    assert " interval 5 8 capacity 1 " in model.update()
+
+
+def test_interval_profile_merges_adjacent_intervals():
+    profile = optseq.IntervalProfile()
+    profile[(0, 5)] = 1
+    profile[(5, 10)] = 1
+    profile[(10, "inf")] = 2
+    assert list(profile.intervals()) == [(0, 10, 1), (10, "inf", 2)]
+    copy = profile.copy()
+    copy[(20, 30)] = 3
+    assert len(profile) == 3 and len(copy) == 4
+
+
+def test_solve_cache_reuses_the_output(stubs):
+    model = small()
+    model.Params.Cache = str(stubs / "cache")
+    model.optimize()
+    assert model.stats.get("cached") is None
+    schedule = [(act.start, act.completion) for act in model.act]
+    model.optimize()
+    assert model.stats["cached"] is True
+    assert [(act.start, act.completion) for act in model.act] == schedule
+    model.act[0].duedate = 7
+    model.optimize()
+    assert model.stats.get("cached") is None
+
+
+def cyclic():
+    """returns a model whose temporal constraints make a cycle (an activity and its setup, as in test2)"""
+    model = optseq.Model()
+    machine = model.addResource("machine", 1)
+    for k in range(30):
+        setup = model.addActivity("setup%d" % k)
+        mode = optseq.Mode("setupMode%d" % k, 1)
+        mode.addResource(machine, 1)
+        setup.addModes(mode)
+        act = model.addActivity("act%d" % k, duedate=3 * k)
+        mode = optseq.Mode("mode%d" % k, 1 + k % 3)
+        mode.addResource(machine, 1)
+        act.addModes(mode)
+        model.addTemporal(setup, act, "CS")
+        model.addTemporal(act, setup, "SC")
+    model.Params.Echo = False
+    return model
+
+
+def test_heuristic_schedules_every_activity_of_a_cycle():
+    for scheme in ("serial", "parallel"):
+        for rule in ("EST", "SPT", "LPT", "EDD", "ORDER"):
+            model = cyclic()
+            actList = model.optimizeHeuristic(rule, scheme)
+            assert len(actList) == len(model.act)
+            (obj, violations) = model.evaluate()
+            assert model.ObjVal == obj
+            assert model.Status == (0 if violations == [] else -1)
+            if rule in ("EST", "ORDER"):
+                assert violations == []
+                for k in range(30):
+                    assert model.activities["setup%d" % k].completion == model.activities["act%d" % k].start
+
+
+def test_heuristic_follows_the_priority_rule():
+    model = optseq.Model()
+    machine = model.addResource("machine", 1)
+    for (name, duration) in (("long", 5), ("short", 1), ("middle", 3)):
+        mode = optseq.Mode(name + "Mode", duration)
+        mode.addResource(machine, 1)
+        model.addActivity(name).addModes(mode)
+    assert [name for (name, mode) in model.optimizeHeuristic("SPT")] == ["short", "middle", "long"]
+    assert [name for (name, mode) in model.optimizeHeuristic("LPT", "parallel")] == ["long", "middle", "short"]
+    assert model.ObjVal == 0
+
+
+def test_stream_writes_the_same_input_and_uses_the_cache(stubs):
+    model = small()
+    assert b"".join(model.updateChunks(size=10)) == model.update().encode()
+    model.Params.Cache = str(stubs / "cache")
+    model.optimize()
+    schedule = [(act.start, act.completion) for act in model.act]
+    model.Params.Stream = True
+    (stubs / "optseq_input.txt").unlink()
+    model.optimize()
+    assert model.stats["cached"] is True
+    assert (stubs / "optseq_input.txt").read_text() == model.update()
+    assert [(act.start, act.completion) for act in model.act] == schedule
+    model.act[0].duedate = 7
+    model.optimize()
+    assert model.stats.get("cached") is None
+    assert model.stats["inputBytes"] == len(model.update().encode())
+    assert " duedate 7 " in (stubs / "optseq_input.txt").read_text()
+    assert [(act.start, act.completion) for act in model.act] == schedule
+
+
+def test_solve_many_solves_each_model_in_its_own_directory(stubs):
+    models = [small() for k in range(3)]
+    models[1].act[0].modes[0].duration = 4
+    assert optseq.solveMany(models, workers=2, workdir=str(stubs)) == [0, 0, 0]
+    assert [model.act[1].start for model in models] == [3, 4, 3]
+    assert not (stubs / "optseq_input.txt").exists()
+    assert [path.name for path in stubs.iterdir() if path.name.startswith("optseq_")] == []
+    optseq.solveMany(models[:1], workdir=str(stubs), keep=True)
+    (scratch,) = [path for path in stubs.iterdir() if path.name.startswith("optseq_")]
+    assert (scratch / "optseq_input.txt").read_text() == models[0].update()
+
+
+def test_portfolio_keeps_the_best_schedule(stubs):
+    model = small()
+    model.Params.RandomSeed = 3
+    best = model.optimizePortfolio(2)
+    assert best.RandomSeed == 3 and model.Params.RandomSeed == 3
+    assert (model.Status, model.ObjVal) == (0, 5)
+    assert [(act.start, act.completion) for act in model.act] == [(0, 3), (3, 5)]
+    best = model.optimizePortfolio([{"Tenure": 5}, {"RandomSeed": 9}])
+    assert (best.Tenure, best.RandomSeed, best.TimeLimit) == (5, 3, model.Params.TimeLimit)
+    with pytest.raises(NameError):
+        model.optimizePortfolio([{"Seed": 1}])
+
+
+def test_optimize_async_gives_the_schedule_of_optimize(stubs):
+    models = [small(), small()]
+    models[1].act[0].modes[0].duration = 4
+    for k in range(2):
+        (stubs / ("job%d" % k)).mkdir()
+
+    async def solveBoth():
+        await asyncio.gather(*[model.optimizeAsync(workdir=str(stubs / ("job%d" % k))) for (k, model) in enumerate(models)])
+
+    asyncio.run(solveBoth())
+    assert [model.Status for model in models] == [0, 0]
+    assert [(act.start, act.completion) for act in models[1].act] == [(0, 4), (4, 6)]
+    schedule = [(act.start, act.completion) for act in models[0].act]
+    models[0].optimize()
+    assert [(act.start, act.completion) for act in models[0].act] == schedule
+    assert (stubs / "job1" / "optseq_input.txt").read_text() == models[1].update()
+
+
+def test_callback_gets_the_improved_objectives_and_stops_the_solver(stubs):
+    model = small()
+    seen = []
+    model.optimize(callback=lambda elapsed, obj: seen.append((elapsed >= 0, obj)))
+    assert seen == [(True, 7), (True, 6), (True, 5)]
+    assert model.Status == 0
+    model.optimize(callback=lambda elapsed, obj: True)
+    assert model.Status == 11
+    model.Params.Target = 6
+    model.optimize()
+    assert model.Status == 11 and model.ObjVal <= 7
+
+
+OUTPUT = """objective value = 9 (cpu time = 0.00(s), iteration = 0)
+
+ --- best solution ---
+source,---, 0 0
+a,---, 0 0--1 2--4[2] 4
+b,b2, 4 4--8 8
+sink,---, 8 8
+ --- tardy activity ---
+ --- resource residuals ---
+worker: [0,1] 1 [1,2] 2 [2,4] 0 [4,8] 2
+
+ --- best activity list ---
+source ---
+a ---
+b b2
+sink ---
+
+objective value = 9
+cpu time = 0.00/1.00(s)
+iteration = 3/3
+"""
+
+
+def test_parser_reads_breaks_parallel_executions_and_residuals(stubs):
+    model = small()
+    model.Params.OutputFlag = False
+    model._parse(OUTPUT)
+    assert (model.Status, model.ObjVal) == (0, 9)
+    assert model.solution.names == ["source", "a", "b", "sink"]
+    assert list(model.solution.offset) == [0, 0, 2, 3, 3]
+    (a, b) = model.act
+    assert (a.start, a.completion, a.execute) == (0, 4, {(0, 1): 1, (2, 4): 2})
+    assert (b.start, b.completion, b.execute, b.selected) == (4, 8, {(4, 8): 1}, "b2")
+    assert model.res[0].residual == {(0, 1): 1, (1, 2): 2, (2, 4): 0, (4, 8): 2}
+    assert model.bestActList == [("source", "---"), ("a", "---"), ("b", "b2"), ("sink", "---")]
+    assert (stubs / "optseq_output.txt").read_text() == OUTPUT
+
+
+def test_initial_activity_list_is_passed_without_the_file(stubs):
+    # the solver is wrapped to keep the file given by -initial
+    (stubs / "optseq").rename(stubs / "optseq_stub")
+    (stubs / "optseq").write_text(
+        '#!/bin/sh\nprev=""\nfor arg; do\n    [ "$prev" = "-initial" ] && cp "$arg" initial.txt\n    prev="$arg"\ndone\n'
+        'exec ./optseq_stub "$@"\n'
+    )
+    (stubs / "optseq").chmod(0o755)
+    model = small()
+    (a, b) = model.act
+    model.setInitial([(b, "b2"), a])
+    model.optimize()
+    assert (stubs / "initial.txt").read_text() == "source ---\nb b2\na ---\nsink ---\n\n"
+    assert [path.name for path in stubs.iterdir() if path.name.startswith("optseq_initial_")] == []
+    model.setInitial()
+    model.optimize()
+    assert (stubs / "initial.txt").read_text() == "source ---\na ---\nb b1\nsink ---\n\n"
+    (stubs / "initial.txt").unlink()
+    model.setInitial([])
+    model.optimize()
+    assert model.initial is None and not (stubs / "initial.txt").exists()
+
+
+def test_rolling_horizon_solves_the_windows_in_due_date_order(stubs):
+    model = optseq.Model()
+    machine = model.addResource("machine", 1)
+    for (k, duedate) in enumerate([9, 1, 8, 2, 7, 3]):
+        mode = optseq.Mode("mode%d" % k, 2)
+        mode.addResource(machine, 1)
+        model.addActivity("act%d" % k, duedate=duedate).addModes(mode)
+    model.addTemporal(model.act[4], model.act[1])
+    model.Params.OutputFlag = False
+    text = model.update()
+    windows = model.optimizeRolling(size=2)
+    # act4 precedes act1 and is moved to the first window
+    assert [[act.name for act in window] for window in windows] == [["act1", "act3", "act4"], ["act5"], ["act2", "act0"]]
+    assert model.Status == 0
+    assert [(act.start, act.completion) for act in model.act] == [(2, 4), (0, 2), (0, 2), (2, 4), (4, 6), (0, 2)]
+    # the last window sees the capacity left by the earlier ones
+    assert " interval 0 6 capacity 0 " in (stubs / "optseq_input.txt").read_text()
+    assert model.update() == text
+
+
+def test_bulk_builder_gives_the_text_of_the_one_by_one_builder():
+    names = ["a1", "a2", "a3"]
+    durations = [3, 5, 2]
+    duedates = [10, "inf", 8]
+    bulk = optseq.Model()
+    machine = bulk.addResource("machine", 2)
+    acts = bulk.addActivities(names, durations=durations, duedates=duedates, requirements={machine: [1, 0, 2]})
+    bulk.addTemporals(["a1", "a2"], acts[1:], "SS", 1)
+    single = optseq.Model()
+    machine = single.addResource("machine", 2)
+    for (k, name) in enumerate(names):
+        mode = optseq.Mode("Mode_" + name, durations[k])
+        if [1, 0, 2][k] != 0:
+            mode.addResource(machine, {(0, "inf"): [1, 0, 2][k]})
+        single.addActivity(name, duedate=duedates[k]).addModes(mode)
+    for k in range(2):
+        single.addTemporal(single.act[k], single.act[k + 1], "SS", 1)
+    assert bulk.update() == single.update()
+    acts[0].modes[0].addBreak(0, 1)
+    single.act[0].modes[0].addBreak(0, 1)
+    assert " break interval 0 1 " in bulk.update()
+    assert bulk.update() == single.update()
+
+
+def test_profile_of_a_bulk_mode_changed_in_place_after_update():
+    model = optseq.Model()
+    machine = model.addResource("machine", 2)
+    (act,) = model.addActivities(["a1"], durations=[3], requirements={machine: [1]})
+    mode = act.modes[0]
+    model.update()
+    mode.requirement[("machine", None)][(2, 3)] = 2
+    assert " machine interval 2 3 requirement 2 " in model.update()
+    mode.breakable[(0, 1)] = "inf"
+    assert " break interval 0 1 " in model.update()
+
+
+# chart of OUTPUT written by Model.write of the baseline optseq.py
+CHART = """  activity    mode   duration |1|2|3|4|5|6|7|8|
+----------------------------------------------|
+    a         m1        3     |=|.|*2|*2| | | | |
+    b         b2        4     | | | | |=|=|=|=|
+----------------------------------------------
+   resource usage/capacity    | 
+----------------------------------------------
+            worker            |1|0|2|2|0|0|0|0|
+                              |2|2|2|2|2|2|2|2|
+----------------------------------------------
+"""
+
+
+def test_chart_is_the_chart_of_the_baseline(stubs):
+    model = small()
+    model.Params.OutputFlag = False
+    model.update()
+    model._parse(OUTPUT)
+    model.write("chart.txt")
+    assert (stubs / "chart.txt").read_text() == CHART
+    model.write("chart.txt", bucket=2)
+    lines = (stubs / "chart.txt").read_text().splitlines()
+    assert lines[0].endswith("|2|4|6|8|")
+    assert lines[2].endswith("|=|*2| | |")
+    assert lines[7].endswith("|1|2|0|0|")
+    with pytest.raises(TypeError):
+        model.write("chart.txt", bucket=0)
+
+
+def test_interval_rows_give_the_schedule_and_the_change_points(stubs):
+    model = small()
+    model.Params.OutputFlag = False
+    model.update()
+    model._parse(OUTPUT)
+    model.writeIntervals("intervals.csv")
+    assert (stubs / "intervals.csv").read_text().splitlines() == [
+        "kind,name,mode,start,finish,value",
+        "activity,a,m1,0,4,",
+        "execute,a,m1,0,1,1",
+        "execute,a,m1,2,4,2",
+        "activity,b,b2,4,8,",
+        "execute,b,b2,4,8,1",
+        "capacity,worker,,0,8,2",
+        "usage,worker,,0,1,1",
+        "usage,worker,,1,2,0",
+        "usage,worker,,2,4,2",
+        "usage,worker,,4,8,0",
+    ]
+    with pytest.raises(ValueError):
+        model.writeExcel("chart.csv", scale=0)
+
+
+def test_resource_profile_agrees_with_the_residuals_of_the_solver(stubs):
+    model = small()
+    model.Params.OutputFlag = False
+    model.update()
+    model._parse(OUTPUT)
+    (times, usage, capacity, slack) = model.resourceProfile("worker")
+    assert (list(times), list(usage), list(capacity), list(slack)) == ([0, 1, 2, 4, 8], [1, 0, 2, 0], [2, 2, 2, 2], [1, 2, 0, 2])
+    residual = model.res[0].residual
+    assert [residual[(times[i], times[i + 1])] for i in range(4)] == list(slack)
+    model.res[0].addCapacity(3, 5, 1)
+    (times, usage, capacity, slack) = model.resourceProfile()["worker"]
+    assert (list(times), list(capacity)) == ([0, 1, 2, 3, 4, 5, 8], [2, 2, 2, 3, 3, 2])
+    with pytest.raises(NameError):
+        model.resourceProfile("machine")
+
+
+def test_evaluate_checks_the_constraints_and_computes_the_objective(stubs):
+    model = small()
+    feasible = {"a": (0, 3, None, None), "b": (3, 5, "b1", None)}
+    late = {"a": (5, 8, None, None), "b": (8, 12, "b2", None)}
+    early = {"a": (0, 3, None, None), "b": (1, 3, "b1", None)}
+    parallel = {"a": (0, 3, None, {(0, 3): 3}), "b": (3, 5, "b1", None)}
+    assert model.evaluateMany([feasible, late, early, parallel]) == [
+        (0, []),
+        (3, []),
+        (0, ["temporal a b type CS delay 0 is violated"]),
+        (0, ["activity a is executed 3 in parallel in (0,3)", "resource worker is used 3 over the capacity 2 at time 0"]),
+    ]
+    model.Params.Makespan = True
+    assert model.evaluate(late) == (12, [])
+    model.Params.Makespan = False
+    model.optimize()
+    assert model.evaluate() == model.evaluate(feasible)
+
+
+def test_temporal_analysis_gives_the_windows_and_finds_positive_cycles():
+    model = small()
+    info = model.analyzeTemporals()
+    assert (info["earliest"], info["latest"], info["critical"], info["makespan"]) == ({"a": 0, "b": 3}, {"a": 0, "b": 3}, ["a", "b"], 5)
+    info = model.analyzeTemporals(10)
+    assert (info["latest"], info["slack"], info["horizon"]) == ({"a": 5, "b": 8}, {"a": 5, "b": 5}, 10)
+    model.setHorizon(9)
+    assert model.update().endswith("temporal sink source  type CS delay -9 ")
+    model.setHorizon(7)
+    assert " delay -9 " not in model.update() and len(model.tempo) == 2
+    model.setHorizon()
+    assert len(model.tempo) == 1
+    model.addTemporal(model.act[1], model.act[0], "SS", 1)
+    info = model.analyzeTemporals()
+    assert (info["cycles"], info["earliest"], info["makespan"]) == ([["b", "a"]], {}, None)
+
+
+def test_scheduler_runs_the_jobs_by_priority_and_cancels_them(stubs):
+    scheduler = optseq.Scheduler(workers=1)
+    release = threading.Event()
+    order = []
+    first = scheduler.submit(release.wait, 10)
+    low = scheduler.submit(order.append, "low", priority=5)
+    high = scheduler.submit(order.append, "high", priority=1)
+    dropped = scheduler.submit(order.append, "dropped", priority=0)
+    assert dropped.cancel() and dropped.status == "cancelled"
+    release.set()
+    assert first.result(10) is True
+    low.result(10)
+    assert order == ["high", "low"] and high.status == "done"
+    failed = scheduler.submit(int, "x")
+    with pytest.raises(ValueError):
+        failed.result(10)
+    assert failed.status == "failed"
+    # a running solve is stopped by killing its solver process
+    (stubs / "optseq").write_text("#!/bin/sh\nexec sleep 30\n")
+    model = small()
+    begin = time.time()
+    job = scheduler.submit(model.optimize)
+    while job.status == "queued":
+        time.sleep(0.01)
+    time.sleep(0.5)
+    assert job.cancel()
+    job.result(10)
+    assert job.done() and job.status == "cancelled" and time.time() - begin < 10
+    info = scheduler.metrics()
+    assert (info["done"], info["failed"], info["cancelled"]) == (3, 1, 2)
+    assert (info["queued"], info["running"]) == (0, 0) and info["wait_max"] >= info["wait_mean"] > 0
+    # finished jobs are not kept by the scheduler
+    assert scheduler._jobs == set() and dropped.fn is None and job.fn is None
+    scheduler.shutdown()
+
+
+def test_deadline_stops_the_solver_and_keeps_the_best_objective(stubs):
+    model = small()
+    model.optimize(deadline=1e-6)
+    assert model.Status == 9
+    # the solver reports an objective value and does not finish
+    (stubs / "optseq").write_text(
+        "#!%s\nimport sys, time\nsys.stdin.read()\nprint('objective value = 7 (cpu time = 0.00(s), iteration = 0)', flush=True)\ntime.sleep(30)\n"
+        % sys.executable
+    )
+    begin = time.time()
+    model.optimize(deadline=2)
+    assert time.time() - begin < 3
+    assert (model.Status, model.ObjVal) == (9, 7)
+
+
+def test_stats_record_the_phases_and_the_sizes(stubs):
+    model = small()
+    model.optimize()
+    stats = model.stats
+    phases = ("update", "write", "start", "solve", "parse")
+    assert all(stats[phase] >= 0 for phase in phases)
+    assert abs(sum(stats[phase] for phase in phases) - stats["total"]) < 0.01
+    assert stats["inputBytes"] == len((stubs / "optseq_input.txt").read_bytes())
+    assert stats["outputBytes"] == len((stubs / "optseq_output.txt").read_bytes())
+    sizes = ("Status", "activities", "modes", "intervals", "resources", "terms", "temporals", "states")
+    assert [stats[key] for key in sizes] == [0, 2, 3, 2, 1, 0, 1, 0]
+
+
+def test_scenario_input_is_the_base_model_with_the_changes(stubs):
+    model = small()
+    text = model.update()
+    scenario = model.addScenario("what-if")
+    scenario.setDuedate("a", 7)
+    scenario.setCapacity(model.res[0], 2, 4, 1)
+    scenario.removeTemporal("a", "b")
+    scenario.addTemporal("source", "b", "SS", 1)
+    changed = small()
+    changed.act[0].duedate = 7
+    changed.res[0].capacity = optseq.IntervalProfile({(0, 2): 2, (2, 4): 1, (4, "inf"): 2})
+    changed.removeTemporal(changed.act[0], changed.act[1])
+    changed.addTemporal("source", changed.act[1], "SS", 1)
+    assert model._scenarioText(scenario) == changed.update()
+    rows = model.optimizeScenarios(workers=2)
+    assert rows == [{"name": "what-if", "Status": 0, "ObjVal": 5, "base": 5, "difference": 0, "changed": {}}]
+    assert scenario.solution.names == ["source", "a", "b", "sink"]
+    assert model.update() == text
+
+
+def test_removed_objects_leave_the_text_of_a_model_without_them():
+    model = small()
+    (a, b) = model.act
+    assert (model.getActivity("a"), model.getResource("worker"), model.getActivity("c")) == (a, model.res[0], None)
+    model.update()
+    model.removeActivity("b")
+    expected = optseq.Model()
+    worker = expected.addResource("worker", capacity=2)
+    mode = optseq.Mode("m1", 3)
+    mode.addResource(worker, {(0, "inf"): 1})
+    expected.addActivity("a", duedate=5).addModes(mode)
+    assert model.update() == expected.update()
+    assert model.getActivity("b") is None
+    with pytest.raises(NameError):
+        model.removeTemporal(a, b)
+    with pytest.raises(NameError):
+        model.removeActivity(b)
+    model.removeResource("worker")
+    expected = optseq.Model()
+    expected.addActivity("a", duedate=5).addModes(optseq.Mode("m1", 3))
+    assert model.update() == expected.update()
+    assert model.addActivity("b") is model.getActivity("b")
+
+
+def test_save_and_load_give_the_same_text(tmp_path):
+    model = small()
+    (a, b) = model.act
+    mode = a.modes[0]
+    mode.addBreak(0, 2, 1)
+    mode.addParallel(1, 1, 2)
+    mode.addResource(model.res[0], {(0, 2): 1}, "max")
+    state = model.addState("setup")
+    state.addValue(0, 1)
+    state.addValue(10, 0)
+    b.modes[1].addState(state, 1, 0)
+    budget = model.addResource("budget", rhs=10, direction="<=", weight=5)
+    budget.addTerms([2, 3], [a, b], [mode, b.modes[1]])
+    model.addTemporal(b, "sink", "CC", -2)
+    model.Params.Makespan = True
+    model.Params.TimeLimit = 7
+    model.save(str(tmp_path / "model.bin"))
+    loaded = optseq.Model()
+    loaded.load(str(tmp_path / "model.bin"))
+    assert loaded.update() == model.update()
+    assert (loaded.Params.Makespan, loaded.Params.TimeLimit) == (True, 7)
+    loaded.act[0].modes[0].addBreak(5, 6)
+    assert " break interval 5 6 " in loaded.update()
+
+
+def test_save_is_smaller_than_the_text_and_load_is_fast(tmp_path):
+    import benchmark
+
+    model = benchmark.jobShop(100000)
+    size = len(model.update().encode())
+    model.save(str(tmp_path / "model.bin"))
+    assert (tmp_path / "model.bin").stat().st_size < size / 2
+    begin = time.time()
+    loaded = optseq.Model()
+    loaded.load(str(tmp_path / "model.bin"))
+    assert time.time() - begin < 1
+    # the activities are filled when they are first used
+    assert len(loaded.act) == len(model.act) and len(loaded.temporals) == len(model.temporals)
+    assert [act._str() for act in loaded.act[-3:]] == [act._str() for act in model.act[-3:]]
+    assert type(loaded.act[0]) is optseq.Activity
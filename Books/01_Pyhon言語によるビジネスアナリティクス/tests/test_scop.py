@@ -0,0 +1,119 @@
+import asyncio
+import time
+
+import scop
+
+
+def assignment():
+    """returns the assignment example of scop.py"""
+    model = scop.Model()
+    workers = ["A", "B", "C", "D", "E"]
+    cost = [[15, 20, 30], [7, 15, 12], [25, 10, 13], [15, 18, 3], [5, 12, 17]]
+    jobs = ["Job1", "Job2", "Job3"]
+    varlist = model.addVariables(workers, jobs)
+    model.addConstraint(scop.Alldiff("AD", varlist, "inf"))
+    for (j, lb) in enumerate([1, 2, 2]):
+        con = scop.Linear("LB%s" % j, "inf", lb, ">=")
+        for i in range(len(workers)):
+            con.addTerms(1, varlist[i], jobs[j])
+        model.addConstraint(con)
+    con = scop.Linear("L")
+    for i in range(len(workers)):
+        for (j, job) in enumerate(jobs):
+            con.addTerms(cost[i][j], varlist[i], job)
+    model.addConstraint(con)
+    quad = scop.Quadratic("Q", 100)
+    for job in jobs:
+        quad.addTerms(1, varlist[0], job, varlist[2], job)
+    model.addConstraint(quad)
+    model.Params.TimeLimit = 1
+    return model
+
+
+def test_alldiff_keeps_the_order_and_skips_duplicates():
+    model = scop.Model()
+    x = model.addVariables(["x%d" % i for i in range(20000)], [0, 1])
+    con = scop.Alldiff("AD", x + x[:100])
+    assert con.variables == x
+    assert con.addVariable(x[5]) is False
+    con.addVariables([model.addVariable("y", [0, 1])])
+    assert [var.name for var in con.variables[-2:]] == ["x19999", "y"]
+    assert str(con).startswith("AD: weight= 1 type=alldiff  x0 x1 x2 ")
+
+
+def test_solve_cache_reuses_the_output(stubs):
+    model = assignment()
+    model.Params.Cache = str(stubs / "cache")
+    first = model.optimize()
+    assert model.stats.get("cached") is None
+    second = model.optimize()
+    assert model.stats["cached"] is True
+    assert first == second
+    model.Params.RandomSeed = 2
+    model.optimize()
+    assert model.stats.get("cached") is None
+
+
+def texts(model):
+    return [str(var) for var in model.variables] + [str(con) for con in model.constraints]
+
+
+def test_save_and_load_give_the_same_model(tmp_path):
+    model = assignment()
+    model.Params.TimeLimit = 7
+    model.save(str(tmp_path / "model.bin"))
+    loaded = scop.Model()
+    loaded.load(str(tmp_path / "model.bin"))
+    assert texts(loaded) == texts(model)
+    assert loaded.Params.TimeLimit == 7
+
+
+def test_save_and_load_keep_float_numbers(tmp_path):
+    model = assignment()
+    model.constraints[1].setRhs(2.5)
+    model.constraints[-1].setRhs(0.1)
+    model.constraints[-1].addTerms(1.5, model.variables[1], "Job1", model.variables[3], "Job2")
+    model.save(str(tmp_path / "model.bin"))
+    loaded = scop.Model()
+    loaded.load(str(tmp_path / "model.bin"))
+    assert texts(loaded) == texts(model)
+    assert loaded.constraints[1].rhs == 2.5
+    assert loaded.constraints[2].rhs == 2 and type(loaded.constraints[2].rhs) is int
+    assert loaded.constraints[-1].terms[-1][0] == 1.5
+
+
+def test_optimize_async_gives_the_solution_of_optimize(stubs):
+    model = assignment()
+    (sol, violated) = asyncio.run(model.optimizeAsync())
+    assert sol == {"A": "Job1", "B": "Job1", "C": "Job1", "D": "Job1", "E": "Job1"}
+    assert (sol, violated) == model.optimize()
+
+
+def test_deadline_stops_the_solver(stubs):
+    model = assignment()
+    (stubs / "scop").write_text("#!/bin/sh\nexec sleep 30\n")
+    begin = time.time()
+    assert model.optimize(deadline=1) == (None, None)
+    assert time.time() - begin < 2
+    assert model.Status == 9
+
+
+def test_stats_record_the_phases_and_the_sizes(stubs):
+    model = assignment()
+    model.optimize()
+    stats = model.stats
+    assert all(stats[phase] >= 0 for phase in ("update", "write", "start", "solve", "parse"))
+    assert stats["inputBytes"] == len((stubs / "scop_input.txt").read_bytes())
+    assert stats["outputBytes"] > 0
+    sizes = ("Status", "variables", "values", "constraints", "terms")
+    assert [stats[key] for key in sizes] == [0, 5, 15, 6, 38]
+
+
+def test_alldiff_checks_duplicates_in_constant_time():
+    model = scop.Model()
+    x = model.addVariables(["x%d" % i for i in range(100000)], [0, 1])
+    begin = time.time()
+    con = scop.Alldiff("AD", x + x)
+    con.addVariables(x[::-1])
+    assert time.time() - begin < 1
+    assert con.variables == x